@@ -3,8 +3,8 @@ nexus
 """
 
 from .src.build import VectorDBBuilder, GraphBuilder
-from .src.query import VectorQueryEngine, GraphQueryEngine
-from .src.state import GraphIndex
+from .src.query import VectorQueryEngine, GraphQueryEngine, HybridQueryEngine
+from .src.state import GraphIndex, GraphSnapshot
 from .config import VectorDBConfig, GraphConfig
 
 __version__ = "0.1"
@@ -13,7 +13,9 @@ __all__ = [
     'GraphBuilder',
     'VectorQueryEngine',
     'GraphQueryEngine',
+    'HybridQueryEngine',
     "GraphIndex",
+    "GraphSnapshot",
     "VectorDBConfig",
     "GraphConfig"
 ]
@@ -40,23 +40,43 @@ class VectorDBConfig:
     rebuild: bool = True
     stage_dir: Path = field(default_factory=lambda: Path(".nexus"))
     data_dir: Path = field(default_factory=lambda: Path(".data"))
-    index_type: str = field(default_factory=lambda: "hnsw")
+    index_type: str = field(default_factory=lambda: "hnsw") # "hnsw", "flat", "ivf" or "ivfpq"
     meta_index_path: Path = None # set in __post_init__
+    doc_store_dir: Path = None # set in __post_init__
+    chunk_cache_size: int = 4096 # chunk texts kept in memory by DocStore
+    embedding_cache: bool = True # reuse chunk embeddings across builds (keyed by model + text hash)
+    embedding_cache_dir: Path = None # set in __post_init__
     embed_model: str = field(default=None) # | TODO: add support for cloud embedding model
     max_tokens: int = 510 # safe for all-MiniLM-L6-v2 limit (two-token room)
     overlap: float = field(init=False)
     overlap_ratio: float = field(default_factory=lambda: 0.1)
+    chunker: Literal["tokens", "sentences", "paragraphs"] = "tokens" # sentences/paragraphs: packed whole, no overlap
     batch_size: int = 32
+    build_workers: int = 1 # chunking processes; 1 = sequential, e.g. os.cpu_count() - 1 to pipeline large corpora
+    build_queue_size: int = 16 # batches buffered between build stages
+    hash_workers: int = 8 # threads checksumming new or modified documents (I/O bound)
+    index_delta_ratio: float = 0.1 # saves append delta segments until they reach this fraction of the base, then merge; 0 = rewrite whole
+    mmap_index: bool = False # query/cluster engines map the saved index read-only instead of loading it (shared page cache)
 
     hnsw_m: int = 16
     hnsw_ef_construction: int = 200
     hnsw_ef_search: int = 50
 
+    ivf_nlist: int = 1024 # inverted lists (capped at ~39 training vectors per list)
+    ivf_nprobe: int = 16 # lists scanned per query
+    ivf_train_size: int = 65_536 # "ivf"/"ivfpq" stay exact (flat) until this many vectors, then train on a sample this size
+    pq_m: int = 16 # "ivfpq" sub-quantizers; must divide the embedding dimension
+    pq_nbits: int = 8 # bits per sub-quantizer code
+
     def __post_init__(self):
         self.overlap = int(self.max_tokens * self.overlap_ratio)
         self.stage_dir.mkdir(exist_ok=True)
         if self.meta_index_path is None:
             self.meta_index_path = self.stage_dir / "meta_vector.sqlite"
+        if self.doc_store_dir is None:
+            self.doc_store_dir = self.stage_dir / "docs"
+        if self.embedding_cache_dir is None:
+            self.embedding_cache_dir = self.stage_dir / "embedding_cache"
         if self.embed_model is None:
             self.embed_model = os.getenv("EMBED_MODEL") or "sentence-transformers/all-MiniLM-L6-v2"
 
@@ -66,8 +86,10 @@ class GraphConfig:
     stage_dir: Path = field(default_factory=lambda: Path(".nexus"))
     graph_index_path: Path = None # set in __post_init__
     graph_meta_path: Path = None # set in __post_init__
+    graph_snapshot_path: Path = None # set in __post_init__
 
-    max_tokens: int = 2056 # | TODO: chunking
+    max_tokens: int = 2056 # document tokens (embedder tokenizer) per extraction call; longer documents are split
+    extraction_chunker: Literal["tokens", "sentences", "paragraphs"] = "tokens" # extraction windows, see util.iter_chunks
 
     tuple_delimiter: str = "|"
     record_delimiter: str = "##"
@@ -95,12 +117,20 @@ class GraphConfig:
     system_prompt: str = "You are a helpful extraction assistant." # | TODO
 
     extraction_concurrency: Literal["sync", "async"] = "async"
-    extraction_batch_size: int = 10
+    extraction_batch_size: int = 10 # sync build: documents per GraphIndex commit
+    extraction_queue_size: int = 32 # documents read ahead of the async extraction workers
+    write_group_size: int = 500 # async build: entity + relationship records per GraphIndex commit
+    write_group_seconds: float = 2.0 # async build: max delay before a partial group is committed
+
+    embed_graph: bool = True # keep FAISS indexes of entity names / claims (find_similar_*)
 
     checksum_path: Path = None # set in __post_init__
     record_checksums: bool = True
     force_checksums: bool = True # if True, won't allow re-ingestion
 
+    llm_cache: bool = True # reuse LLM responses keyed by (model, system prompt, prompt); logs every call
+    llm_cache_path: Path = None # set in __post_init__
+
     def _load_extraction_templates(self):
         for domain in self.extraction_domains:
             try:
@@ -123,8 +153,12 @@ class GraphConfig:
             self.graph_index_path = self.stage_dir / "graph.sqlite"
         if self.graph_meta_path is None:
              self.graph_meta_path = self.stage_dir / "meta_graph.sqlite"
+        if self.graph_snapshot_path is None:
+            self.graph_snapshot_path = self.stage_dir / "graph_snapshot.npz"
         if self.checksum_path is None:
             self.checksum_path = self.stage_dir / "checksums.sqlite"
+        if self.llm_cache_path is None:
+            self.llm_cache_path = self.stage_dir / "llm_cache.sqlite"
         self._load_extraction_templates()
 
 
@@ -133,7 +167,15 @@ class LLMConfig:
     backend: Literal["openai", "openrouter", "local"] = "openrouter"
     sync_model: Optional[str] = "qwen/qwen3-235b-a22b-2507" # "qwen/qwen3-30b-a3b-2507"
     async_model: Optional[str] = "qwen/qwen3-235b-a22b-2507"
-    semaphore_rate: Optional[int] = 1
+    semaphore_rate: Optional[int] = 1 # initial async concurrency; adapts (AIMD) up to max_concurrency
+    max_concurrency: int = 32 # async LLM calls in flight at most (= async extraction workers)
+    requests_per_minute: Optional[float] = None # provider rate limits (None: unlimited)
+    tokens_per_minute: Optional[float] = None
+    retries: int = 3 # per call, on connection errors / timeouts / 408, 409, 429, 5xx (full-jitter backoff)
+    request_timeout: Optional[float] = 120.0 # s per call
+    breaker_threshold: int = 5 # consecutive failed calls that stop all calls for breaker_cooldown s (0: never)
+    breaker_cooldown: float = 30.0
+    breaker_max_wait: float = 600.0 # s a graph build call waits for an open circuit before its document is dead-lettered
     local_backend_url: Optional[str] = "http://localhost:1234/v1"
 
     price_million_input_tokens: Optional[float] = None # USD
@@ -1,8 +1,11 @@
 from .chunk import ChunkData
 from .doc import DocLike, Doc
 from .process import ProcessingStats
-from .claim import ClaimData
+from .claim import ClaimData, ClaimRecord
+from .entity import EntityRecord
 from .relationship import RelationshipRecord
+from .subgraph import Subgraph, SubgraphNode, SubgraphEdge
+from .hybrid import HybridResult
 from .error import (
     RelationshipCollisionError,
     AliasConflictError,
@@ -18,7 +21,13 @@ __all__ = [
     "Doc",
     "ProcessingStats",
     "ClaimData",
+    "ClaimRecord",
+    "EntityRecord",
     "RelationshipRecord",
+    "Subgraph",
+    "SubgraphNode",
+    "SubgraphEdge",
+    "HybridResult",
     "RelationshipCollisionError",
     "AliasConflictError",
     "EntityNotFoundError",
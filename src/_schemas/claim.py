@@ -1,6 +1,8 @@
 from dataclasses import dataclass, field
 from typing import Optional
 
+from .relationship import RelationshipRecord
+
 @dataclass
 class ClaimData:
     content: str
@@ -8,4 +10,16 @@ class ClaimData:
     date_added: str
     source_date: Optional[str] = None
     claim_date: Optional[str] = None
-    entities: list[str] = field(default_factory=list)
\ No newline at end of file
+    entities: list[str] = field(default_factory=list)
+
+
+@dataclass
+class ClaimRecord:
+    """Claim to be ingested; attach to exactly one of entity_name / relationship."""
+    content: str
+    source: Optional[str] = None
+    entity_name: Optional[str] = None
+    relationship: Optional[RelationshipRecord] = None
+    source_date: Optional[str] = None
+    claim_date: Optional[str] = None
+    document_id: Optional[int] = None # ingested document (DocLike.document_id)
@@ -0,0 +1,7 @@
+from dataclasses import dataclass
+from typing import Optional
+
+@dataclass
+class EntityRecord:
+    name: str
+    entity_type: Optional[str] = None
@@ -0,0 +1,13 @@
+from dataclasses import dataclass, field
+
+from .claim import ClaimData
+from .subgraph import Subgraph
+
+@dataclass
+class HybridResult:
+    """Fused result of one HybridQueryEngine.query() call."""
+    chunks: list[dict] = field(default_factory=list) # VectorQueryEngine.query() dicts + document_id, score
+    entities: list[tuple[str, float]] = field(default_factory=list) # (canonical name, fused score), best first
+    claims: list[ClaimData] = field(default_factory=list) # best first
+    subgraph: Subgraph = field(default_factory=Subgraph) # one-hop expansion around the seed entities
+    timings: dict[str, float] = field(default_factory=dict) # stage -> milliseconds
@@ -0,0 +1,25 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+@dataclass
+class SubgraphNode:
+    name: str # canonical
+    entity_type: Optional[str] = None
+    depth: int = 0 # hops from the seed
+    claim_count: int = 0 # entity claims, alias-entities included
+
+
+@dataclass
+class SubgraphEdge:
+    source_name: str # canonical
+    target_name: str # canonical
+    strength: Optional[float] = None
+    directed: bool = False
+    claim_count: int = 0 # relationship claims, alias-entities included
+
+
+@dataclass
+class Subgraph:
+    """Compact, alias-collapsed result of a graph traversal."""
+    nodes: list[SubgraphNode] = field(default_factory=list)
+    edges: list[SubgraphEdge] = field(default_factory=list)
@@ -5,20 +5,30 @@ Build orchestrators (vectorDB // graph)
 from __future__ import annotations
 from typing import Optional
 import asyncio
-from asyncio import Semaphore
+from itertools import islice
+from collections import Counter
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import multiprocessing as mp
+import threading
+import queue
+import time
 
 # - local -
 from ..config import log, VectorDBConfig, GraphConfig, LLMConfig, HEAD
-from .state import VectorIndex, MetaIndex, GraphIndex, Checksums
-from .embed import Embedder
-from .llm import SyncLLM, AsyncLLM
-from .util import fetch_doc, chunk, print_progress_bar
+from .state import VectorIndex, MetaIndex, DocStore, GraphIndex, GraphVectorIndex, Checksums, LLMCache
+from .embed import Embedder, Tokenizer
+from .llm import SyncLLM, AsyncLLM, RateLimiter, RetryPolicy, CircuitBreaker, CircuitOpenError
+from .util import fetch_doc, iter_chunks, print_progress_bar
 from ._schemas import (
     ChunkData,
     DocLike, Doc,
     ProcessingStats,
+    EntityRecord,
+    ClaimRecord,
     RelationshipRecord,
-    RelationshipCollisionError
 )
 
 
@@ -29,14 +39,26 @@ class VectorDBBuilder:
     
     def __init__(self, cfg: VectorDBConfig):
         self.cfg = cfg
-        self.embedder = Embedder(self.cfg.embed_model, self.cfg.batch_size)
+        self.embedder = Embedder(self.cfg.embed_model, self.cfg.batch_size,
+            cache_dir=self.cfg.embedding_cache_dir if self.cfg.embedding_cache else None)
         self.vector_index = VectorIndex(self.cfg, self.embedder.dim, self.cfg.rebuild)
         self.meta_index = MetaIndex(self.cfg.meta_index_path)
+        self.doc_store = DocStore(self.cfg.doc_store_dir, self.cfg.chunk_cache_size)
         self.stats = ProcessingStats()
+        self._tokenizer_factory = partial(Tokenizer, self.cfg.embed_model) # picklable, for chunking processes
+        self._checksums: dict[int, Optional[str]] = {} # document_id -> content checksum, this build
+        self._file_stats: dict[int, Optional[tuple[int, int]]] = {} # document_id -> (size, mtime_ns) hashed
         
     
     def build(self, docs: list[DocLike]):
-        """Build vectorDB from given documents"""
+        """
+        Build vectorDB from given documents.
+        With cfg.rebuild=False the build is incremental: documents whose
+        content checksum is unchanged are skipped, changed ones have their old
+        vectors replaced. Only files whose path, size or mtime differ from the
+        indexed ones are read and hashed. Documents not passed are left alone
+        (see delete_documents()).
+        """
         
         if not docs:
             log.warning("No documents to process")
@@ -44,43 +66,135 @@ class VectorDBBuilder:
         else:
             log.info("Preparing %s documents...", len(docs))
 
+        known = {} if self.cfg.rebuild else self.meta_index.document_checksums()
+        self._checksum_docs(docs, known)
+
         if self.cfg.rebuild:
             self.meta_index.drop()
-        for doc in docs:
-            try:
-                self._process_doc(doc, self.cfg.rebuild)
-            except Exception as e:
-                log.error("Failed to process %s: %s", doc.filepath, e)
+            self.doc_store.drop()
+        else:
+            docs = self._changed_docs(docs, known)
+            log.info("%s new or changed documents", len(docs))
+
+        if self.cfg.build_workers > 1 and len(docs) > 1:
+            self._build_parallel(docs)
+        else:
+            for doc in docs:
+                try:
+                    self._process_doc(doc)
+                except Exception as e:
+                    log.error("Failed to process %s: %s", doc.filepath, e)
             
         self.vector_index.save()
         log.info("Processing complete: %s", self.stats)
 
 
-    def _process_doc(self, doc: DocLike, rebuild: bool):
-        """Chunk, embed, and upsert a single document file."""
-        
-        if not rebuild: # don't re-process docs if not rebuilding
-            if self.meta_index.has_chunks(doc.document_id):
-                return
+    def delete_documents(self, document_ids: list[int]) -> int:
+        """Remove documents' chunks and vectors from the vector db. Returns the number of vectors removed."""
+        removed = self._remove_documents(document_ids)
+        self.vector_index.save()
+        log.info("Removed %s vectors of %s documents", removed, len(document_ids))
+        return removed
+
+
+    def _checksum_docs(self, docs: list[DocLike], known: dict[int, tuple]) -> None:
+        """
+        Helper: fill self._checksums / self._file_stats. A file whose path and
+        stat match its indexed row keeps the recorded checksum; the others are
+        hashed (cfg.hash_workers threads), so an unchanged corpus costs one
+        stat per document.
+        """
+        self._checksums, self._file_stats, todo = {}, {}, []
+        for doc in docs:
+            stat = _file_stat(doc.filepath)
+            self._file_stats[doc.document_id] = stat
+            row = known.get(doc.document_id)
+            if stat is not None and row is not None and row[1] == str(doc.filepath) and tuple(row[2:]) == stat:
+                self._checksums[doc.document_id] = row[0]
+            else:
+                todo.append(doc)
+        if todo:
+            log.info("Hashing %s new or modified files", len(todo))
+            with ThreadPoolExecutor(max_workers=max(1, self.cfg.hash_workers)) as pool: # hashing is I/O bound
+                self._checksums.update(zip(
+                    (doc.document_id for doc in todo), pool.map(_file_checksum, (doc.filepath for doc in todo))
+                ))
+
+
+    def _changed_docs(self, docs: list[DocLike], known: dict[int, tuple]) -> list[DocLike]:
+        """
+        Helper: documents whose checksum differs from the indexed one. Their
+        old chunks and vectors (and leftovers of failed builds) are removed.
+        """
+        todo = []
+        for doc in docs:
+            checksum, stat = self._checksums[doc.document_id], self._file_stats[doc.document_id] or (None, None)
+            row = known.get(doc.document_id)
+            if checksum is not None and row is not None and row[0] == checksum:
+                if tuple(row[1:]) != (str(doc.filepath), *stat): # touched or moved: record the new stat
+                    self.meta_index.set_document(doc.document_id, checksum, doc.filepath, *stat)
+                continue
+            if not known and self.meta_index.has_chunks(doc.document_id): # db predates checksums: adopt as is
+                self.meta_index.set_document(doc.document_id, checksum, doc.filepath, *stat)
+                continue
+            todo.append(doc)
+        self._remove_documents([doc.document_id for doc in todo])
+        return todo
+
+
+    def _remove_documents(self, document_ids: list[int]) -> int:
+        """Helper: delete documents from the meta index and doc store, and their vectors from the vector index."""
+        paths = self.meta_index.document_paths(document_ids)
+        removed = self.vector_index.remove_ids(self.meta_index.delete_documents(document_ids))
+        self.doc_store.remove(paths)
+        return removed
+
+
+    def _process_doc(self, doc: DocLike):
+        """
+        Chunk, embed, and upsert a single document file.
+        Chunks are streamed and embedded cfg.batch_size at a time, so memory
+        stays bounded by the batch, not the file.
+        """
 
         # chunk document
-        chunks_data, chunks_text = chunk(doc.filepath, doc.document_id,
-            self.embedder, self.cfg.max_tokens, self.cfg.overlap)
-        if not chunks_data or not chunks_text:
+        chunks = iter_chunks(doc.filepath, doc.document_id,
+            self.embedder, self.cfg.max_tokens, self.cfg.overlap, self.cfg.chunker)
+        n_chunks = 0
+        while batch := list(islice(chunks, self.cfg.batch_size)):
+            if not self._embed_batch(doc, batch):
+                self.stats.errors += 1
+                return
+            n_chunks += len(batch)
+
+        if n_chunks == 0:
             self.stats.errors += 1
             return
+        self._finish_doc(doc.document_id, doc.filepath)
 
+        # update statistics
+        self.stats.documents_processed += 1
+        self.stats.chunks_created += n_chunks
+        self.stats.embeddings_generated += n_chunks
+
+
+    def _embed_batch(self, doc: DocLike, batch: list[tuple[ChunkData, str]]) -> bool:
+        """Embed a batch of (chunk, text) and upsert it; False if embedding failed."""
         try: # generate embeddings
-            embeddings = self.embedder.embed(chunks_text)
+            embeddings = self.embedder.embed([text for _, text in batch])
             if embeddings.size == 0:
                 log.error("No embeddings generated for %s", doc.filepath)
-                self.stats.errors += 1
-                return
+                return False
         except Exception as e:
             log.error("Could not embed chunks for %s: %s", doc.filepath, e)
-            self.stats.errors += 1
-            return
+            return False
+
+        self._write_batch([c for c, _ in batch], embeddings)
+        return True
+
 
+    def _write_batch(self, chunks_data: list[ChunkData], embeddings) -> None:
+        """Add a batch of embeddings to the index and upsert its chunk rows."""
         embedding_ids = self.vector_index.add_vectors(embeddings)
     
         if len(chunks_data) != len(embedding_ids):
@@ -104,10 +218,204 @@ class VectorDBBuilder:
         ]
         self.meta_index.upsert(chunks)
 
-        # update statistics
-        self.stats.documents_processed += 1
-        self.stats.chunks_created += len(chunks_data)
-        self.stats.embeddings_generated += len(embedding_ids)
+
+    # --- pipelined build ---
+
+    def _build_parallel(self, docs: list[DocLike]):
+        """
+        Three-stage build:
+          chunk  - cfg.build_workers processes read and chunk documents
+          embed  - this thread packs chunks across documents into full batch_size batches
+          write  - a thread adds vectors to the index and upserts MetaIndex rows
+        Stages are joined by bounded queues (cfg.build_queue_size), so a slow
+        stage holds the others back instead of buffering the corpus.
+        """
+        ctx = mp.get_context("spawn") # no forking a process that holds torch / sqlite / faiss state
+        workers = min(self.cfg.build_workers, len(docs))
+        tasks, chunked = ctx.Queue(), ctx.Queue(maxsize=self.cfg.build_queue_size)
+        for doc in docs:
+            tasks.put((doc.document_id, str(doc.filepath)))
+        for _ in range(workers):
+            tasks.put(None)
+        procs = [
+            ctx.Process(target=_chunk_worker, daemon=True, args=(
+                tasks, chunked, self._tokenizer_factory,
+                self.cfg.max_tokens, self.cfg.overlap, self.cfg.chunker, self.cfg.batch_size,
+            ))
+            for _ in range(workers)
+        ]
+        for p in procs:
+            p.start()
+        log.info("Chunking with %s processes", workers)
+
+        writes: queue.Queue = queue.Queue(maxsize=self.cfg.build_queue_size)
+        failure: list[Exception] = []
+        writer = threading.Thread(target=self._write_stage, args=(writes, failure), daemon=True)
+        writer.start()
+        try:
+            self._embed_stage(chunked, writes, procs)
+        finally:
+            writes.put(None)
+            writer.join()
+            for p in procs:
+                if p.is_alive():
+                    p.terminate()
+                p.join()
+        if failure:
+            raise failure[0]
+
+
+    def _embed_stage(self, chunked, writes: queue.Queue, procs: list) -> None:
+        """
+        Helper: consume chunk batches from the workers, embed them in full
+        batch_size batches and hand them to the writer. A document's "done"
+        marker follows its last chunk, so the writer finishes it only once
+        all of its vectors are written.
+        """
+        batch_size = self.cfg.batch_size
+        pending: list[tuple[ChunkData, str]] = []
+        markers: list[tuple[int, str, int]] = [] # finished chunking, vectors not yet queued
+        failed: set[int] = set()
+
+        def flush(batch: list[tuple[ChunkData, str]]) -> None:
+            try:
+                embeddings = self.embedder.embed([text for _, text in batch])
+                if embeddings.size == 0:
+                    raise ValueError("no embeddings generated")
+            except Exception as e:
+                for document_id, path in dict.fromkeys((c.document_id, c.source_path) for c, _ in batch):
+                    if document_id not in failed:
+                        log.error("Could not embed chunks for %s: %s", path, e)
+                        failed.add(document_id)
+                        self.stats.errors += 1
+                return
+            writes.put(("batch", [c for c, _ in batch], embeddings))
+
+        def release() -> None:
+            waiting = {c.document_id for c, _ in pending}
+            for marker in [m for m in markers if m[0] not in waiting]:
+                markers.remove(marker)
+                if marker[0] not in failed:
+                    writes.put(("done", *marker))
+
+        finished = 0
+        while finished < len(procs):
+            try:
+                msg = chunked.get(timeout=1.0)
+            except queue.Empty:
+                if not any(p.is_alive() for p in procs):
+                    try: # the last messages may still be in flight
+                        msg = chunked.get(timeout=1.0)
+                    except queue.Empty:
+                        raise RuntimeError("Chunking processes exited unexpectedly")
+                else:
+                    continue
+            if msg is None:
+                finished += 1
+                continue
+
+            kind, document_id, filepath, payload = msg
+            if kind == "fatal":
+                raise RuntimeError(f"Chunking process failed: {payload}")
+            if document_id in failed:
+                continue
+            if kind == "chunks":
+                pending.extend(payload)
+                while len(pending) >= batch_size:
+                    flush(pending[:batch_size])
+                    del pending[:batch_size]
+                    release()
+            elif kind == "done":
+                if payload == 0: # no chunks
+                    self.stats.errors += 1
+                else:
+                    markers.append((document_id, filepath, payload))
+                    release()
+            elif kind == "error":
+                log.error("Failed to process %s: %s", filepath, payload)
+                failed.add(document_id)
+                self.stats.errors += 1
+                pending = [p for p in pending if p[0].document_id != document_id]
+
+        if pending:
+            flush(pending)
+            pending.clear()
+        release()
+
+
+    def _write_stage(self, writes: queue.Queue, failure: list[Exception]) -> None:
+        """Helper (writer thread): apply queued batches / document completions in order."""
+        while (item := writes.get()) is not None:
+            if failure: # keep draining so the embed stage never blocks
+                continue
+            try:
+                if item[0] == "batch":
+                    self._write_batch(item[1], item[2])
+                else:
+                    _, document_id, filepath, n_chunks = item
+                    self._finish_doc(document_id, filepath)
+                    self.stats.documents_processed += 1
+                    self.stats.chunks_created += n_chunks
+                    self.stats.embeddings_generated += n_chunks
+            except Exception as e:
+                log.error("Writer stage failed: %s", e)
+                failure.append(e)
+
+
+    def _finish_doc(self, document_id: int, filepath) -> None:
+        """Helper: a document's vectors are all written; store it and record its checksum."""
+        self.doc_store.add(filepath) # mmap-able copy for O(chunk) reads at query time
+        checksum = self._checksums.get(document_id)
+        if checksum is not None:
+            self.meta_index.set_document(document_id, checksum, filepath, *(self._file_stats.get(document_id) or ()))
+
+
+def _file_stat(filepath) -> Optional[tuple[int, int]]:
+    """(size, mtime_ns) of a file, None if it can't be stat'ed."""
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _file_checksum(filepath) -> Optional[str]:
+    """sha256 of a file's bytes, None if it can't be read."""
+    digest = hashlib.sha256()
+    try:
+        with open(filepath, "rb") as fh:
+            while block := fh.read(1 << 20):
+                digest.update(block)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def _chunk_worker(tasks, out, make_tokenizer, max_tokens, overlap, chunker, batch_size) -> None:
+    """
+    Chunking process for VectorDBBuilder._build_parallel: takes (document_id, path)
+    from tasks until None and puts ("chunks" | "done" | "error", document_id, path, payload)
+    on out, then None.
+    """
+    try:
+        tokenizer = make_tokenizer()
+    except Exception as e:
+        out.put(("fatal", None, None, repr(e)))
+        out.put(None)
+        return
+
+    while (task := tasks.get()) is not None:
+        document_id, filepath = task
+        n_chunks = 0
+        try:
+            chunks = iter_chunks(filepath, document_id, tokenizer, max_tokens, overlap, chunker)
+            while batch := list(islice(chunks, batch_size)):
+                out.put(("chunks", document_id, filepath, batch))
+                n_chunks += len(batch)
+            out.put(("done", document_id, filepath, n_chunks))
+        except Exception as e:
+            out.put(("error", document_id, filepath, repr(e)))
+    out.put(None)
 
 
 # === GRAPH BUILDER ===
@@ -129,6 +437,16 @@ class GraphBuilder:
             raise ValueError(f"Config missing required fields: {', '.join(missing)}")
 
         self.graph_index = GraphIndex(self.graph_config.graph_index_path)
+
+        self.graph_vectors = None
+        vector_config = VectorDBConfig(stage_dir=self.graph_config.stage_dir, rebuild=False)
+        if self.graph_config.embed_graph:
+            self.embedder = Embedder(vector_config.embed_model, vector_config.batch_size)
+            self.graph_vectors = GraphVectorIndex(self.graph_index, vector_config, self.embedder.dim)
+            self.tokenizer = self.embedder
+        else:
+            self.tokenizer = Tokenizer(vector_config.embed_model) # extraction windows
+        self._tokenizer_lock = threading.Lock()
         
         self.tuple_delimiter = self.graph_config.tuple_delimiter
         self.record_delimiter = self.graph_config.record_delimiter
@@ -147,18 +465,31 @@ class GraphBuilder:
         _backend = self.llm_config.backend
         _api_key = self.llm_config.api_key
         _url = self.llm_config.local_backend_url
+        _policy = RetryPolicy(retries=self.llm_config.retries, timeout=self.llm_config.request_timeout)
+        _breaker = CircuitBreaker(self.llm_config.breaker_threshold, self.llm_config.breaker_cooldown)
+        _cache = LLMCache(self.graph_config.llm_cache_path) if self.graph_config.llm_cache else None
         if self.extraction_concurrency == "sync":
             _model = self.llm_config.sync_model
-            self.llm = SyncLLM(backend=_backend, model=_model, api_key=_api_key, url=_url)
+            self.llm = SyncLLM(backend=_backend, model=_model, api_key=_api_key, url=_url,
+                cache=_cache, policy=_policy, breaker=_breaker)
         elif self.extraction_concurrency == "async":
             _model = self.llm_config.async_model
-            self.llm = AsyncLLM(backend=_backend, model=_model, api_key=_api_key, url=_url)
+            limiter = RateLimiter(
+                requests_per_minute=self.llm_config.requests_per_minute,
+                tokens_per_minute=self.llm_config.tokens_per_minute,
+                initial_concurrency=self.llm_config.semaphore_rate or 1,
+                max_concurrency=self.llm_config.max_concurrency,
+            )
+            self.llm = AsyncLLM(backend=_backend, model=_model, api_key=_api_key, url=_url,
+                cache=_cache, limiter=limiter, policy=_policy, breaker=_breaker)
         else:
             raise ValueError(f"graph_config.extraction_concurrency must be set to sync or async.")
         
         self.llm.set_system(self.graph_config.system_prompt)
-        self.semaphore_rate = self.llm_config.semaphore_rate
+        self.extraction_workers = self.llm_config.max_concurrency # AsyncLLM's limiter sets the actual concurrency
         self.batch_size = self.graph_config.extraction_batch_size
+        self.breaker_max_wait = self.llm_config.breaker_max_wait
+        self.dead_letters: list[tuple[Doc, Exception]] = [] # documents whose extraction failed in the last build
 
         self.debug = debug
 
@@ -166,7 +497,8 @@ class GraphBuilder:
     def build(self, docs: list[DocLike]):
         """
         Top-level graph builder entrypoint.
-        Dispatches to sync or async version.
+        Dispatches to sync or async version. Documents whose extraction fails
+        are skipped and collected in self.dead_letters (see retry_failed()).
         """
         total = len(docs)
         if total == 0:
@@ -174,10 +506,22 @@ class GraphBuilder:
         log.info(f"Now building graph with {total} document{'s' if total != 1 else ''}")
 
         docs = [Doc(**vars(doc)) if not isinstance(doc, Doc) else doc for doc in docs]
+        self.dead_letters = []
         if self.extraction_concurrency == "sync":
             self._build_sync(docs)
         else:
             asyncio.run(self._build_async(docs))
+        if self.dead_letters:
+            log.warning("%s document(s) failed extraction; see GraphBuilder.dead_letters", len(self.dead_letters))
+
+
+    def retry_failed(self) -> int:
+        """Rebuild the documents that failed in the last build; returns how many failed again."""
+        docs = [doc for doc, _ in self.dead_letters]
+        if not docs:
+            return 0
+        self.build(docs)
+        return len(self.dead_letters)
 
     
     def _build_sync(self, docs: list[DocLike]):
@@ -190,24 +534,30 @@ class GraphBuilder:
 
             for j, doc in enumerate(batch):
                 current = i + j + 1
-                doc_text = fetch_doc(doc.filepath)
-
-                checksum = self.checksums.compute(doc_text)
-                if self.force_checksums:
-                    if self.checksums.has(checksum):
+                try:
+                    doc_text = fetch_doc(doc.filepath)
+                    checksum = self.checksums.compute(doc_text)
+                    if self.force_checksums and self.checksums.has(checksum):
                         log.warning("document in current batch has already been ingested; skipping")
                         continue
 
-                prompt = self._build_extraction_prompt(
-                    document=doc_text,
-                    domain=doc.domain,
-                    context=doc.context,
-                )
-                response = self.llm.run(prompt)
-                if self.debug:
-                    log.info("LLM response: %s", response)
-                e, r = self._process_llm_response(response)
-                e, r = self._add_metadata(entities=e, relationships=r, date=doc.date, source=doc.source)
+                    extracted = []
+                    for window in self._windows(doc, doc_text):
+                        prompt = self._build_extraction_prompt(
+                            document=window,
+                            domain=doc.domain,
+                            context=doc.context,
+                        )
+                        response = self._run_llm(prompt)
+                        if self.debug:
+                            log.info("LLM response: %s", response)
+                        extracted.append(self._process_llm_response(response))
+                    e, r = self._merge_extractions(extracted)
+                except Exception as exc:
+                    log.error("Failed to extract %s: %s", doc.filepath, exc)
+                    self.dead_letters.append((doc, exc))
+                    continue
+                e, r = self._add_metadata(entities=e, relationships=r, date=doc.date, source=doc.source, document_id=doc.document_id)
 
                 if self.record_checksums:
                     self.checksums.add(checksum)
@@ -218,96 +568,273 @@ class GraphBuilder:
 
             self._upsert_entities(entities_batch)
             self._upsert_relationships(relationships_batch)
+            self._sync_vectors()
             
 
     async def _build_async(self, docs: list[DocLike]):
-        """"""
-        sem = Semaphore(self.semaphore_rate)
-        async def _process_doc(doc):
-            async with sem:
-                doc_text = await asyncio.to_thread(fetch_doc, doc.filepath)
-
-                checksum = await asyncio.to_thread(self.checksums.compute, doc_text)
-                if self.force_checksums:
-                    exists = await asyncio.to_thread(self.checksums.has, checksum)
-                    if exists:
-                        log.warning("document in current batch has already been ingested; skipping")
-                        return None
-                
-                prompt = self._build_extraction_prompt(
-                    document=doc_text,
-                    domain=doc.domain,
-                    context=doc.context,
-                )
-                response = await self.llm.run(prompt)
-                if self.debug:
-                    log.info("LLM response: %s", response)
-                e, r = await asyncio.to_thread(self._process_llm_response, response)
+        """
+        Streaming build:
+          extract - extraction_workers workers pull documents from a bounded queue
+                    (extraction_queue_size) and run LLM extraction; AsyncLLM's
+                    rate limiter decides how many calls are in flight
+          write   - a thread commits parsed records to GraphIndex in groups of
+                    write_group_size records, or write_group_seconds after
+                    the first record of a group arrives
+        A slow LLM call holds up only its own worker, and SQLite writes never
+        run on the event loop. Both queues are bounded (extraction_queue_size),
+        so a slow writer holds back extraction instead of piling up results;
+        once the writer fails, no further documents are read or extracted.
+        """
+        workers = max(1, self.extraction_workers)
+        todo: asyncio.Queue = asyncio.Queue(maxsize=self.graph_config.extraction_queue_size)
+        writes: queue.Queue = queue.Queue(maxsize=self.graph_config.extraction_queue_size)
+        failure: list[Exception] = []
+        writer = threading.Thread(target=self._write_stage, args=(writes, failure), daemon=True)
+        writer.start()
+
+        async def produce():
+            for doc in docs:
+                if failure:
+                    break
+                await todo.put(doc)
+            for _ in range(workers):
+                await todo.put(None)
+
+        async def extract():
+            while (doc := await todo.get()) is not None:
+                if failure: # keep draining so the producer never blocks
+                    continue
+                try:
+                    result = await self._extract_doc(doc)
+                except Exception as e:
+                    log.error("Failed to extract %s: %s", doc.filepath, e)
+                    self.dead_letters.append((doc, e))
+                    continue
+                if result is not None:
+                    await asyncio.to_thread(writes.put, result) # blocks while the writer is behind
 
-                if self.record_checksums:
-                    await asyncio.to_thread(self.checksums.add, checksum)
+        try:
+            await asyncio.gather(produce(), *(extract() for _ in range(workers)))
+        finally:
+            await asyncio.to_thread(writes.put, None)
+            await asyncio.to_thread(writer.join)
+        if failure:
+            raise failure[0]
+
+
+    async def _extract_doc(self, doc: Doc) -> Optional[tuple[list[dict], list[dict], str]]:
+        """Helper: (entities, relationships, checksum) extracted from a document; None if already ingested."""
+        doc_text = await asyncio.to_thread(fetch_doc, doc.filepath)
+
+        checksum = await asyncio.to_thread(self.checksums.compute, doc_text)
+        if self.force_checksums:
+            exists = await asyncio.to_thread(self.checksums.has, checksum)
+            if exists:
+                log.warning("document %s has already been ingested; skipping", doc.filepath)
+                return None
+
+        windows = await asyncio.to_thread(self._windows, doc, doc_text)
+        calls = [ # a long document's windows share the LLM concurrency budget
+            asyncio.ensure_future(self._run_llm_async(
+                self._build_extraction_prompt(document=window, domain=doc.domain, context=doc.context)))
+            for window in windows
+        ]
+        try:
+            responses = await asyncio.gather(*calls)
+        except BaseException: # the document has failed: don't spend calls on its other windows
+            for call in calls:
+                call.cancel()
+            raise
+        if self.debug:
+            for response in responses:
+                log.info("LLM response: %s", response)
+        extracted = await asyncio.to_thread(lambda: [self._process_llm_response(r) for r in responses])
+        e, r = self._merge_extractions(extracted)
+        e, r = self._add_metadata(
+            entities=e, relationships=r, date=doc.date, source=doc.source, document_id=doc.document_id
+        )
+        return e, r, checksum
 
-                return await asyncio.to_thread(self._add_metadata,
-                    entities=e, relationships=r, date=doc.date, source=doc.source
-                )
-        
-        for i in range(0, len(docs), self.batch_size):
-            batch = docs[i : i + self.batch_size]
-            results = [r for r in await asyncio.gather(*(_process_doc(doc) for doc in batch)) if r is not None]
 
-            entities_batch, relationships_batch = [], []
-            for e, r in results:
-                entities_batch.extend(e)
-                relationships_batch.extend(r)
+    def _run_llm(self, prompt: str) -> str:
+        """
+        Helper: one extraction call. While the LLM circuit is open the call
+        waits for it (up to breaker_max_wait s) instead of failing, so an
+        outage pauses the build rather than dead-lettering every document.
+        """
+        deadline = time.monotonic() + self.breaker_max_wait
+        while True:
+            try:
+                return self.llm.run(prompt)
+            except CircuitOpenError as e:
+                if time.monotonic() + e.retry_after > deadline:
+                    raise
+                time.sleep(e.retry_after)
 
-            self._upsert_entities(entities_batch)
-            self._upsert_relationships(relationships_batch)
+
+    async def _run_llm_async(self, prompt: str) -> str:
+        """Helper: _run_llm() for AsyncLLM."""
+        deadline = time.monotonic() + self.breaker_max_wait
+        while True:
+            try:
+                return await self.llm.run(prompt)
+            except CircuitOpenError as e:
+                if time.monotonic() + e.retry_after > deadline:
+                    raise
+                await asyncio.sleep(e.retry_after)
 
 
-    def _upsert_entities(self, entities: list[dict]):
-        """Upsert a batch of entities and their claims"""
-        for entity in entities:
-            entity_name = entity["entity_name"]
-            entity_type = entity["entity_type"]
-            source = entity.get("source", None)
-            source_date = entity.get("source_date", None)
-            claim = entity.get("entity_claim")
-            claim_date = entity.get("claim_date", None)
+    def _write_stage(self, writes: queue.Queue, failure: list[Exception]) -> None:
+        """
+        Helper (writer thread): commit queued extraction results in groups.
+        Checksums are recorded only once their document's records are committed.
+        """
+        group_size = self.graph_config.write_group_size
+        interval = self.graph_config.write_group_seconds
+        entities, relationships, checksums = [], [], []
+        deadline: Optional[float] = None # flush time of the current group
+
+        def flush() -> None:
+            nonlocal deadline
+            try:
+                self._upsert_entities(entities)
+                self._upsert_relationships(relationships)
+                self._sync_vectors()
+                if self.record_checksums:
+                    for checksum in checksums:
+                        self.checksums.add(checksum)
+            except Exception as e:
+                log.error("Writer stage failed: %s", e)
+                failure.append(e)
+            entities.clear()
+            relationships.clear()
+            checksums.clear()
+            deadline = None
+
+        while True:
+            try:
+                item = writes.get(timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+            except queue.Empty: # group is due
+                flush()
+                continue
+            if item is None:
+                break
+            if failure: # keep draining so the extraction workers never block
+                continue
+            e, r, checksum = item
+            entities.extend(e)
+            relationships.extend(r)
+            checksums.append(checksum)
+            if deadline is None:
+                deadline = time.monotonic() + interval
+            if len(entities) + len(relationships) >= group_size:
+                flush()
+        if not failure and checksums:
+            flush()
+
 
-            self.graph_index.upsert_entity(name=entity_name, entity_type=entity_type)
-            self.graph_index.upsert_claim(content=claim,source=source, entity_name=entity_name, source_date=source_date, claim_date=claim_date)
+    def _sync_vectors(self):
+        """Embed entities and claims upserted since the last sync (no-op if embed_graph is off)."""
+        if self.graph_vectors is not None:
+            self.graph_vectors.sync(self.embedder.embed)
+
+
+    def _upsert_entities(self, entities: list[dict]):
+        """Upsert a batch of entities and their claims (one transaction)"""
+        if not entities:
+            return
+        with self.graph_index.transaction():
+            self.graph_index.upsert_entities_bulk([
+                EntityRecord(name=e["entity_name"], entity_type=e["entity_type"])
+                for e in entities
+            ])
+            self.graph_index.upsert_claims_bulk([
+                ClaimRecord(
+                    content=e.get("entity_claim"),
+                    source=e.get("source", None),
+                    entity_name=e["entity_name"],
+                    source_date=e.get("source_date", None),
+                    claim_date=e.get("claim_date", None),
+                    document_id=e.get("document_id", None),
+                )
+                for e in entities
+            ])
 
 
     def _upsert_relationships(self, relationships: list[dict]):
-        """Upsert a batch of relationships and their claims"""
-        for relationship in relationships:
-            source_name = relationship["source_name"]
-            target_name = relationship["target_name"]
-            source = relationship.get("source", None)
-            source_date = relationship.get("source_date", None)
-            claim = relationship["relationship_claim"]
-            claim_date = relationship.get("claim_date", None)
-            
-            rel = RelationshipRecord(
-                source_name=source_name,
-                target_name=target_name,
-                directed=False # | TODO: manipulate directionality at ingest
+        """Upsert a batch of relationships and their claims (one transaction)"""
+        if not relationships:
+            return
+        # RelationshipCollisionError only arises when trying to relate an entity to itself,
+        # i.e. resolve_alias(source_name) == resolve_alias(target_name).
+        # For the time being we upsert such a relationship as a claim for the source entity
+        # (on_collision="source"), so as to not lose potentially useful content.
+        self.graph_index.upsert_claims_bulk([
+            ClaimRecord(
+                content=r["relationship_claim"],
+                source=r.get("source", None),
+                relationship=RelationshipRecord(
+                    source_name=r["source_name"],
+                    target_name=r["target_name"],
+                    directed=False # | TODO: manipulate directionality at ingest
+                ),
+                source_date=r.get("source_date", None),
+                claim_date=r.get("claim_date", None),
+                document_id=r.get("document_id", None),
             )
-            
-            try:
-                self.graph_index.upsert_relationship(source_name=source_name, target_name=target_name)
-            except RelationshipCollisionError:
-                # RelationshipCollisionError only raises when trying to relate an entity to itself,
-                # i.e. resolve_alias(source_name) == resolve_alias(target_name).
-                # For the time being we will upsert such a relationship as a claim for the canonical entity,
-                # so as to not lose potentially useful content. NOTE that upsert_claim() auto-resolves entity.
-                log.info("Self-referential relationship detected between %s and %s: upserting to %s",
-                    source_name, target_name, source_name # NOTE: not fully accurate... we upsert to _canon_ of source.
-                )
-                self.graph_index.upsert_claim(content=claim, source=source, entity_name=source_name, source_date=source_date, claim_date=claim_date)
-                continue
+            for r in relationships
+        ], on_collision="source")
+
 
-            self.graph_index.upsert_claim(content=claim, source=source, relationship=rel, source_date=source_date, claim_date=claim_date)
+    def _windows(self, doc: Doc, doc_text: str) -> list[str]:
+        """
+        Helper: the document's text in extraction windows of at most
+        graph_config.max_tokens tokens (embedder tokenizer), overlapping by
+        graph_config.overlap. A document that fits is one window, as is.
+        """
+        cfg = self.graph_config
+        if len(doc_text) <= cfg.max_tokens: # a token spans at least one character
+            return [doc_text]
+        with self._tokenizer_lock: # shared by the async workers' threads; HF tokenizers aren't thread-safe
+            windows = [text for _, text in iter_chunks(doc.filepath, doc.document_id, self.tokenizer,
+                cfg.max_tokens, cfg.overlap, cfg.extraction_chunker, doc_text=doc_text)]
+        if len(windows) > 1:
+            log.info("Extracting %s in %s windows", doc.filepath, len(windows))
+        return windows or [doc_text]
+
+
+    def _merge_extractions(self, extracted: list[tuple[list[dict], list[dict]]]) -> tuple[list[dict], list[dict]]:
+        """
+        Helper: merge per-window (entities, relationships). Names that differ
+        only in case / whitespace take their first spelling, each entity gets
+        its most frequent type, and claims repeated across (overlapping)
+        windows are kept once.
+        """
+        if len(extracted) == 1:
+            return extracted[0]
+
+        spelling: dict[str, str] = {}
+        types: dict[str, Counter] = {}
+        def canonical(name: str) -> str:
+            return spelling.setdefault(" ".join(name.split()).casefold(), name)
+
+        entities: dict[tuple, dict] = {}
+        relationships: dict[tuple, dict] = {}
+        for window_entities, window_relationships in extracted:
+            for e in window_entities:
+                name = canonical(e["entity_name"])
+                if e["entity_type"]:
+                    types.setdefault(name, Counter())[e["entity_type"]] += 1
+                entities.setdefault((name, e["entity_claim"]), {**e, "entity_name": name})
+            for r in window_relationships:
+                src, tgt = canonical(r["source_name"]), canonical(r["target_name"])
+                relationships.setdefault((src, tgt, r["relationship_claim"]),
+                    {**r, "source_name": src, "target_name": tgt})
+
+        for e in entities.values():
+            if e["entity_name"] in types:
+                e["entity_type"] = types[e["entity_name"]].most_common(1)[0][0]
+        return list(entities.values()), list(relationships.values())
 
 
     def _build_extraction_prompt(self,
@@ -386,8 +913,10 @@ class GraphBuilder:
 
     def _add_metadata(self,
         entities: list[dict], relationships: list[dict], date: Optional[str]=None, source: Optional[str]=None,
+        document_id: Optional[int]=None,
     ):
+        meta = {"source_date": date, "source": source, "document_id": document_id}
         return (
-            [{**e, "source_date": date, "source": source} for e in entities],
-            [{**r, "source_date": date, "source": source} for r in relationships]
+            [{**e, **meta} for e in entities],
+            [{**r, **meta} for r in relationships]
         )
@@ -17,10 +17,9 @@ import numpy as np
 
 # - local -
 from ..config import VectorDBConfig, log
-from .state import VectorIndex, MetaIndex
+from .state import VectorIndex, MetaIndex, DocStore
 from .embed import Embedder
 from .llm import SyncLLM
-from .util import fetch_doc
 
 
 # --- config ---
@@ -41,8 +40,9 @@ class ClusterEngine:
     def __init__(self, cfg: VectorDBConfig):
         self.cfg = cfg
         self.embedder = Embedder(self.cfg.embed_model, self.cfg.batch_size)
-        self.vector_index = VectorIndex(cfg, self.embedder.dim, rebuild=False)
-        self.meta_index = MetaIndex(self.cfg)
+        self.vector_index = VectorIndex(cfg, self.embedder.dim, rebuild=False, mmap=cfg.mmap_index)
+        self.meta_index = MetaIndex(self.cfg.meta_index_path)
+        self.doc_store = DocStore(self.cfg.doc_store_dir, self.cfg.chunk_cache_size)
         self.llm_model = SyncLLM()
 
         self.min_cluster_size = 7
@@ -62,7 +62,7 @@ class ClusterEngine:
         """
 
         # fetch embeds
-        embeddings = self.vector_index.index.reconstruct_n(0, self.vector_index.index_size)
+        ids, embeddings = self.vector_index.vectors()
     
         # apply HDBSCAN clustering
         clusterer = hdbscan.HDBSCAN(
@@ -80,7 +80,7 @@ class ClusterEngine:
         clusters = []
         for cluster_id in set(labels):
             if cluster_id != -1:
-                embedding_ids = [i for i, label in enumerate(labels) if label == cluster_id]
+                embedding_ids = ids[labels == cluster_id].tolist()
                 clusters.append(embedding_ids)
 
         return clusters
@@ -136,18 +136,16 @@ class ClusterEngine:
         sampled_embedding_ids = random.sample(cluster, sample_size)
         
         chunk_snippets = []
-        
+        meta = self.meta_index.resolve_many(sampled_embedding_ids)
+
         for e_id in sampled_embedding_ids:
+            if e_id not in meta:
+                log.warning("No chunk found for embedding_id: %s", e_id)
+                continue
             try:
-                # resolve embedding_id to chunk_id
-                c_id = self.meta_index.resolve(e_id)
-                if c_id is None:
-                    log.warning("No chunk found for embedding_id: %s", e_id)
-                    continue
-                    
-                # get chunk metadata and fetch chunk text
-                doc_path, start, end = self.meta_index.get_chunk_metadata(c_id)
-                chunk_text = fetch_doc(doc_path, start, end)
+                # fetch chunk text
+                _, doc_path, start, end = meta[e_id]
+                chunk_text = self.doc_store.fetch(doc_path, start, end)
                 chunk_text = chunk_text.replace('\n', ' ').replace('\r', ' ')
                 chunk_snippets.append(chunk_text)
                 
@@ -167,25 +165,16 @@ class ClusterEngine:
 
         doc_paths = set()
         docs = []
-        
+        meta = self.meta_index.resolve_many(cluster)
+
         for e_id in cluster:
-            try:
-                # resolve embedding_id to chunk_id
-                c_id = self.meta_index.resolve(e_id)
-                if c_id is None:
-                    log.warning("No chunk found for embedding_id: %s", e_id)
-                    continue
-                    
-                # get chunk metadata and fetch document text
-                doc_path, _, _ = self.meta_index.get_chunk_metadata(c_id)
-                doc_paths.add(doc_path)
-                
-            except Exception as e:
-                log.warning("Error processing embedding_id %s: %s", e_id, e)
+            if e_id not in meta:
+                log.warning("No chunk found for embedding_id: %s", e_id)
                 continue
+            doc_paths.add(meta[e_id][1])
         
         for doc_path in doc_paths:
-            doc_text = fetch_doc(doc_path)
+            doc_text = self.doc_store.fetch(doc_path)
             docs.append(doc_text)
         
         return list(doc_paths), docs
@@ -6,23 +6,59 @@ TODO: add support for cloud models (later version) & better async
 
 from __future__ import annotations
 
+from pathlib import Path
+from typing import Optional
+
 import numpy as np
 
 from ..config import log
+from .state import EmbeddingCache
+
+
+# === TOKENIZER ===
+
+class Tokenizer:
+    """
+    Just the embed model's tokenizer: what chunking needs, without loading the
+    SentenceTransformer (e.g. in VectorDBBuilder's chunking processes).
+    """
+    def __init__(self, embed_model: str):
+        from transformers import AutoTokenizer, logging as hf_logging
+
+        self.tokenizer = AutoTokenizer.from_pretrained(embed_model)
+        hf_logging.set_verbosity_error()
+
+
+    def encode(self, text) -> list[int]:
+        return self.tokenizer.encode(text, truncation=False, add_special_tokens=False)
+
+
+    def encode_offsets(self, text: str) -> tuple[list[int], list[tuple[int, int]]]:
+        """Token ids plus each token's (start_char, end_char) in text (fast tokenizers only)."""
+        enc = self.tokenizer(text, truncation=False, add_special_tokens=False, return_offsets_mapping=True)
+        return enc["input_ids"], enc["offset_mapping"]
+
+
+    def decode(self, encoding: list[int]) -> str:
+        return self.tokenizer.decode(encoding, skip_special_tokens=True).strip()
 
 
 # === EMBEDDER ===
 
 class Embedder:
-    def __init__(self, embed_model: str, batch_size: int):
+    def __init__(self, embed_model: str, batch_size: int, cache_dir: Optional[str | Path] = None):
+        """
+        cache_dir: if set, embeddings of lists of texts are cached there
+        (EmbeddingCache) and only misses are computed.
+        """
         from sentence_transformers import SentenceTransformer # NOTE: this takes ~1.5s, which is why it's here
-        from transformers import AutoTokenizer, logging as hf_logging
 
         self.model = SentenceTransformer(embed_model)
         self.dim = self.model.get_sentence_embedding_dimension()
-        self.tokenizer = AutoTokenizer.from_pretrained(embed_model)
+        self._tokens = Tokenizer(embed_model)
+        self.tokenizer = self._tokens.tokenizer
         self.batch_size = batch_size
-        hf_logging.set_verbosity_error()
+        self.cache = EmbeddingCache(cache_dir, embed_model, self.dim) if cache_dir is not None else None
         log.info("Initialized embedder with dimension %s", self.dim)
 
 
@@ -30,7 +66,28 @@ class Embedder:
         """
         texts: list of strings
         returns: np.ndarray of shape (len(batch), embed_dim), L2-normalized
+        A single string (a query) is embedded as a 1-d vector and never cached.
         """
+        if self.cache is None or isinstance(texts, str):
+            return self._encode(texts)
+
+        keys = [EmbeddingCache.key(t) for t in texts]
+        found = self.cache.get_many(list(set(keys)))
+        missing = list(dict.fromkeys(k for k in keys if k not in found)) # unique, in order
+        if missing:
+            text_of = dict(zip(keys, texts))
+            vectors = self._encode([text_of[k] for k in missing])
+            self.cache.put_many(missing, vectors)
+            found.update(zip(missing, vectors))
+
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, k in enumerate(keys):
+            out[i] = found[k]
+        return out
+
+
+    def _encode(self, texts: list[str] | str) -> np.ndarray:
+        """Helper: run the model."""
         embeddings = self.model.encode(
             texts,
             show_progress_bar=False,
@@ -43,11 +100,16 @@ class Embedder:
 
 
     def encode(self, text) -> list[int]:
-        return self.tokenizer.encode(text, truncation=False, add_special_tokens=False)
+        return self._tokens.encode(text)
+
+
+    def encode_offsets(self, text: str) -> tuple[list[int], list[tuple[int, int]]]:
+        """Token ids plus each token's (start_char, end_char) in text (fast tokenizers only)."""
+        return self._tokens.encode_offsets(text)
 
 
     def decode(self, encoding: list[int]) -> str:
-        return self.tokenizer.decode(encoding, skip_special_tokens=True).strip()
+        return self._tokens.decode(encoding)
 
 
 if __name__ == "__main__":
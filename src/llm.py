@@ -1,21 +1,310 @@
 """
 LLM primitives: SyncLLM and AsyncLLM
 
-TODO: add logging of every call (to .nexus)
+With an LLMCache, responses are reused across runs and every call is logged.
 """
 
 from __future__ import annotations
 
-from openai import OpenAI, AsyncOpenAI
+from openai import OpenAI, AsyncOpenAI, APIConnectionError, APIStatusError
 from typing import Literal, Optional
-from pathlib import Path
-import time, asyncio
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+import time, asyncio, random
 
 from ..config import log
+from .state import LLMCache
+
+
+# --- retries ---
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider that keeps failing (see CircuitBreaker)."""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after # s until a call may be let through again
+
+
+class RetryPolicy:
+    """
+    Which errors to retry and how long to wait.
+      retryable: connection errors / timeouts, HTTP 408, 409, 429 and 5xx;
+                 anything else (bad request, auth, parsing...) is fatal
+      delay:     full jitter, uniform(0, min(max_delay, base_delay * 2**attempt)),
+                 but never less than the response's Retry-After
+      timeout:   per-call timeout in seconds (None: the client's default)
+    """
+
+    RETRYABLE_STATUS = {408, 409, 429}
+
+    def __init__(self, retries: int = 3, base_delay: float = 1.0, max_delay: float = 30.0,
+                 timeout: Optional[float] = 120.0):
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+
+
+    def retryable(self, exc: Exception) -> bool:
+        if isinstance(exc, (APIConnectionError, TimeoutError, asyncio.TimeoutError)): # APITimeoutError included
+            return True
+        if isinstance(exc, APIStatusError):
+            return exc.status_code in self.RETRYABLE_STATUS or exc.status_code >= 500
+        return False
+
+
+    def delay(self, attempt: int, exc: Optional[Exception] = None) -> float:
+        """Seconds to wait before retry number attempt + 1."""
+        jitter = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(jitter, (_retry_after(exc) or 0.0) if exc is not None else 0.0)
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failed attempts (retryable errors
+    other than 429, which the rate limiter handles): calls then fail fast
+    with CircuitOpenError for `cooldown` seconds, after which one trial
+    call is let through; its success closes the circuit again. While the
+    trial is in flight, CircuitOpenError.retry_after is at most TRIAL_POLL,
+    so callers waiting it out learn the outcome soon after it is known.
+    """
+
+    TRIAL_POLL = 1.0 # s
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+
+
+    def check(self) -> None:
+        if self._opened_at is None:
+            return
+        remaining = self._opened_at + self.cooldown - time.monotonic()
+        if remaining > 0:
+            raise CircuitOpenError(f"LLM circuit open after {self.failures} consecutive failures; retry in {remaining:.0f}s",
+                retry_after=min(remaining, self.TRIAL_POLL) if self._trial else remaining)
+        self._opened_at = time.monotonic() # half-open: this call is the trial, others keep failing fast
+        self._trial = True
+
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._opened_at = None
+        self._trial = False
+
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.threshold and self.failures >= self.threshold:
+            if self._opened_at is None:
+                log.error("LLM circuit open after %s consecutive failures", self.failures)
+            self._opened_at = time.monotonic()
+            self._trial = False
+
+
+# --- rate limiting ---
+
+class TokenBucket:
+    """
+    Paces usage to `per_minute` units: refills continuously, holds at most
+    one second's worth. Requests larger than that wait for a full bucket;
+    debit() settles the difference once the real cost is known (the bucket
+    may go negative, delaying later requests).
+    """
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0 # units per second
+        self.capacity = max(self.rate, 1.0)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0: take them now)."""
+        self._refill()
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+
+    def debit(self, amount: float) -> None:
+        """Charge (or refund, if negative) units after the fact."""
+        self._refill()
+        self.level = min(self.capacity, self.level - amount)
+
+
+class RateLimiter:
+    """
+    Admission control for AsyncLLM calls:
+      - requests/minute and tokens/minute token buckets (None: unlimited)
+      - AIMD concurrency: the in-flight limit grows by ~1 per round trip of
+        successes and halves (at most once per round trip) on 429 / 5xx
+        responses or when latency rises past latency_factor x its best level
+      - Retry-After on a 429 / 503 pauses all new calls until it passes
+
+    Asyncio primitives are created per event loop, so one limiter can serve
+    successive asyncio.run() builds.
+    """
+
+    LATENCY_FLOOR = 0.05 # s; latency changes below this are noise
+
+    def __init__(self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        initial_concurrency: int = 1,
+        max_concurrency: int = 32,
+        min_concurrency: int = 1,
+        latency_factor: Optional[float] = 2.0,
+    ):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.limit = float(min(max(initial_concurrency, self.min_concurrency), self.max_concurrency))
+        self.latency_factor = latency_factor
+
+        self.in_flight = 0
+        self._latency: Optional[float] = None # EWMA of call latency (s)
+        self._best_latency: Optional[float] = None # lowest EWMA seen
+        self._last_decrease = 0.0
+        self._resume_at = 0.0 # monotonic time before which no call starts (Retry-After)
+        self._loop = None
+        self._cond: Optional[asyncio.Condition] = None
+
+
+    @asynccontextmanager
+    async def slot(self, tokens: int = 0):
+        """
+        Wait until a call costing ~`tokens` may start; report its outcome on exit.
+        Pass the real token count to settle() inside the block when known.
+        """
+        cond = self._condition()
+        async with cond:
+            while True:
+                delay = self._resume_at - time.monotonic()
+                if delay <= 0 and self.in_flight < int(self.limit):
+                    delay = max(
+                        self.requests.wait_time(1) if self.requests else 0.0,
+                        self.tokens.wait_time(tokens) if self.tokens else 0.0,
+                    )
+                    if delay <= 0:
+                        break
+                if delay > 0:
+                    try: # woken early if capacity frees up
+                        await asyncio.wait_for(cond.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    await cond.wait()
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(tokens)
+            self.in_flight += 1
+
+        start = time.monotonic()
+        try:
+            yield self
+        except Exception as exc:
+            self._on_error(exc)
+            raise
+        else:
+            self._on_success(time.monotonic() - start)
+        finally:
+            async with cond:
+                self.in_flight -= 1
+                cond.notify_all()
+
+
+    def settle(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Charge the tokens bucket for the difference between a call's estimated and real cost."""
+        if self.tokens and actual_tokens:
+            self.tokens.debit(actual_tokens - estimated_tokens)
+
+
+    def _condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._cond = loop, asyncio.Condition()
+            self.in_flight = 0
+        return self._cond
+
+
+    def _on_success(self, latency: float) -> None:
+        self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+        self._best_latency = self._latency if self._best_latency is None else min(self._best_latency, self._latency)
+        if self.latency_factor and self._latency > self.latency_factor * max(self._best_latency, self.LATENCY_FLOOR):
+            self._decrease("latency %.2fs (best %.2fs)" % (self._latency, self._best_latency))
+        else:
+            self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+
+
+    def _on_error(self, exc: Exception) -> None:
+        status = getattr(exc, "status_code", None)
+        if status is None or (status != 429 and status < 500):
+            return
+        retry_after = _retry_after(exc)
+        if retry_after:
+            self._resume_at = max(self._resume_at, time.monotonic() + retry_after)
+        self._decrease(f"HTTP {status}" + (f", retry after {retry_after:.1f}s" if retry_after else ""))
+
+
+    def _decrease(self, reason: str) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < (self._latency or 1.0): # one decrease per round trip
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_concurrency, self.limit / 2)
+        self._best_latency = self._latency # re-learn the baseline at the new concurrency
+        log.warning("LLM backoff (%s): concurrency limit now %s", reason, int(self.limit))
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    """Seconds from a Retry-After / retry-after-ms response header, if any."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try: # HTTP-date
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def _estimate_tokens(messages: list[dict]) -> int:
+    """Rough prompt size (~4 characters per token) for the tokens/minute bucket."""
+    return sum(len(m["content"]) for m in messages) // 4 + 1
 
 class _BaseLLM:
-    def __init__(self, system: Optional[list[dict]] = None):
+    def __init__(self, system: Optional[list[dict]] = None, policy: Optional[RetryPolicy] = None,
+                 breaker: Optional[CircuitBreaker] = None, cache: Optional[LLMCache] = None):
         self.system = system or []
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.cache = cache
 
     def set_system(self, content: str) -> None:
         self.system = [{"role": "system", "content": content}]
@@ -25,6 +314,41 @@ class _BaseLLM:
             raise ValueError("System prompt is not set.")
         return self.system
 
+    def _retry_delay(self, exc: Exception, attempt: int) -> float:
+        """Record a failed attempt; re-raise it if fatal or out of retries, else return the backoff delay."""
+        retryable = self.policy.retryable(exc)
+        if retryable and getattr(exc, "status_code", None) != 429:
+            self.breaker.record_failure()
+        if not retryable or attempt >= self.policy.retries:
+            raise exc
+        delay = self.policy.delay(attempt, exc)
+        log.warning("Encountered %s exception during attempt %s: [%s]: %s; retrying in %.1fs",
+            type(self).__name__, attempt, type(exc).__name__, exc, delay)
+        return delay
+
+    def _lookup(self, key: Optional[bytes]) -> Optional[str]:
+        """Cached response for key (logged as a cached call); None on a miss or without a cache."""
+        if key is None:
+            return None
+        output = self.cache.get(key)
+        if output is not None:
+            self.cache.log_call(time.time(), key, self.model, cached=True)
+        return output
+
+    def _record(self, key: Optional[bytes], started: float, output: Optional[str] = None,
+                usage=None, exc: Optional[Exception] = None) -> None:
+        """Log a network call started at `started` (perf_counter) and cache its output."""
+        if key is None:
+            return
+        seconds = time.perf_counter() - started
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        if output is not None:
+            self.cache.put(key, self.model, output, prompt_tokens, completion_tokens)
+        self.cache.log_call(time.time() - seconds, key, self.model, cached=False, seconds=seconds,
+            prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+            error=f"{type(exc).__name__}: {exc}" if exc is not None else None)
+
 
 class SyncLLM(_BaseLLM):
     """"""
@@ -34,103 +358,126 @@ class SyncLLM(_BaseLLM):
         model: str,
         api_key: str,
         url: Optional[str],
-        log_path: Optional[Path] = None, # | TODO
-        retries: int = 0,
+        cache: Optional[LLMCache] = None,
+        retries: Optional[int] = None,
+        policy: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
     ):
-        super().__init__()
+        super().__init__(policy=policy or (RetryPolicy(retries=retries) if retries is not None else None),
+            breaker=breaker, cache=cache)
         self.backend = backend
         if self.backend == "openai":
             try:
-                self.client = OpenAI(api_key=api_key)
+                self.client = OpenAI(api_key=api_key, max_retries=0)
             except:
                 raise ValueError("OpenAI API key is not set in nexus/.env.")
         elif self.backend == "openrouter":
             try:
                 self.client = OpenAI(
                     base_url="https://openrouter.ai/api/v1",
-                    api_key=api_key
+                    api_key=api_key,
+                    max_retries=0,
                 )
             except:
                 raise ValueError("OpenRouter API key is not set in nexus/.env.")
         elif self.backend == "local":
             if url is None:
                 raise ValueError("Local LLM client url is not set in nexus/config.py")
-            self.client = OpenAI(base_url=url, api_key="local")
+            self.client = OpenAI(base_url=url, api_key="local", max_retries=0)
         self.model = model
-        self.log_path = log_path
-        self.retries = retries
 
 
     def run(self, prompt: str) -> str:
         messages = self._guard_system() + [{"role": "user", "content": prompt}]
-        for attempt in range(self.retries + 1):
+        key = LLMCache.key(self.model, messages) if self.cache is not None else None
+        if (output := self._lookup(key)) is not None:
+            return output
+        for attempt in range(self.policy.retries + 1):
+            self.breaker.check()
+            started = time.perf_counter()
             try:
                 response = self.client.chat.completions.create(
                     model=self.model,
-                    messages=messages
+                    messages=messages,
+                    timeout=self.policy.timeout,
                 )
-                output = response.choices[0].message.content.strip()
-                return output
             except Exception as exc:
-                if attempt < self.retries - 1:
-                    log.warning("Encountered SyncLLM exception during attempt %s: [%s]: %s",
-                        attempt, type(exc).__name__, exc)
-                    wait_time = min(2 ** attempt, 30)
-                    time.sleep(wait_time)
-                else:
-                    raise exc
+                self._record(key, started, exc=exc)
+                time.sleep(self._retry_delay(exc, attempt))
+                continue
+            self.breaker.record_success()
+            output = response.choices[0].message.content.strip()
+            self._record(key, started, output, getattr(response, "usage", None))
+            return output
 
 
 class AsyncLLM(_BaseLLM):
-    """"""
+    """
+    Async chat client. Every call goes through `limiter` (a RateLimiter;
+    by default unlimited rates and AIMD concurrency from 1 to 32). The
+    OpenAI client's own retries are off so 429s reach the limiter.
+    """
 
     def __init__(self,
         backend: Literal["openai", "openrouter", "local"],
         model: str,
         api_key: str,
         url: Optional[str],
-        log_path: Optional[Path] = None, # | TODO
-        retries: int = 0,
+        cache: Optional[LLMCache] = None,
+        retries: Optional[int] = None,
+        limiter: Optional[RateLimiter] = None,
+        policy: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
     ):
-        super().__init__()
+        super().__init__(policy=policy or (RetryPolicy(retries=retries) if retries is not None else None),
+            breaker=breaker, cache=cache)
         self.backend = backend
         if self.backend == "openai":
             try:
-                self.client = AsyncOpenAI(api_key=api_key)
+                self.client = AsyncOpenAI(api_key=api_key, max_retries=0)
             except:
                 raise ValueError("OpenAI API key is not set in nexus/.env.")
         elif self.backend == "openrouter":
             try:
                 self.client = AsyncOpenAI(
                     base_url="https://openrouter.ai/api/v1",
-                    api_key=api_key
+                    api_key=api_key,
+                    max_retries=0,
                 )
             except:
                 raise ValueError("OpenRouter API key is not set in nexus/.env.")
         elif self.backend == "local":
             if url is None:
                 raise ValueError("Local LLM client url is not set in nexus/config.py")
-            self.client = AsyncOpenAI(base_url=url, api_key="local")
+            self.client = AsyncOpenAI(base_url=url, api_key="local", max_retries=0)
         self.model = model
-        self.log_path = log_path
-        self.retries = retries
+        self.limiter = limiter or RateLimiter()
 
 
     async def run(self, prompt: str) -> str:
         messages = self._guard_system() + [{"role": "user", "content": prompt}]
-        for attempt in range(self.retries + 1):
+        key = LLMCache.key(self.model, messages) if self.cache is not None else None
+        if key is not None and (output := await asyncio.to_thread(self._lookup, key)) is not None:
+            return output # no rate limiter slot: cached calls are local
+        estimate = _estimate_tokens(messages)
+        for attempt in range(self.policy.retries + 1):
+            self.breaker.check()
+            started = time.perf_counter()
             try:
-                response = await self.client.chat.completions.create(
-                    model=self.model,
-                    messages=messages
-                )
-                output = response.choices[0].message.content.strip()
-                return output
+                async with self.limiter.slot(estimate):
+                    started = time.perf_counter() # network time only, not the wait for a slot
+                    response = await self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        timeout=self.policy.timeout,
+                    )
+                    if getattr(response, "usage", None) is not None:
+                        self.limiter.settle(estimate, response.usage.total_tokens)
             except Exception as exc:
-                if attempt < self.retries - 1:
-                    log.warning("Encountered AsyncLLM exception during attempt %s: [%s]: %s",
-                        attempt, type(exc).__name__, exc)
-                    wait_time = min(2 ** attempt, 30)
-                    await asyncio.sleep(wait_time)
-                else:
-                    raise exc
+                await asyncio.to_thread(self._record, key, started, exc=exc)
+                await asyncio.sleep(self._retry_delay(exc, attempt))
+                continue
+            self.breaker.record_success()
+            output = response.choices[0].message.content.strip()
+            await asyncio.to_thread(self._record, key, started, output, getattr(response, "usage", None))
+            return output
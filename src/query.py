@@ -1,28 +1,31 @@
 """
-Query engines: VectorQueryEngine // GraphQueryEngine
+Query engines: VectorQueryEngine // GraphQueryEngine // HybridQueryEngine
 """
 
 from __future__ import annotations
 
 # - util -
+import time
 import numpy as np
 from typing import Optional
 from pathlib import Path
+from contextlib import contextmanager
 
 # - local -
 from ..config import log, VectorDBConfig, GraphConfig
-from .state import VectorIndex, MetaIndex
+from .state import VectorIndex, MetaIndex, DocStore
 from .graph import Entity, Relationship
 from .embed import Embedder
-from .util import fetch_doc
 
 from ._schemas import (
     ClaimData,
     RelationshipRecord,
-    RelationshipCollisionError
+    RelationshipCollisionError,
+    Subgraph,
+    HybridResult
 )
 
-from .state import GraphIndex
+from .state import GraphIndex, GraphSnapshot, GraphVectorIndex
 
 
 
@@ -34,8 +37,9 @@ class VectorQueryEngine:
     def __init__(self, cfg: VectorDBConfig):
         self.cfg = cfg
         self.embedder = Embedder(self.cfg.embed_model, self.cfg.batch_size)
-        self.vector_index = VectorIndex(self.cfg, self.embedder.dim, rebuild=False)
+        self.vector_index = VectorIndex(self.cfg, self.embedder.dim, rebuild=False, mmap=self.cfg.mmap_index)
         self.meta_index = MetaIndex(self.cfg.meta_index_path)
+        self.doc_store = DocStore(self.cfg.doc_store_dir, self.cfg.chunk_cache_size)
 
 
     def run_query_engine(self):
@@ -68,70 +72,52 @@ class VectorQueryEngine:
         
         # TODO: make a single-chunk-per-doc mode (unique retrieval OR oversampling)
         """
-        
-        query_text = query_text[:800]
-        query_vector = self.embedder.embed(query_text)
-        
-        # search
-        distances, indices = self.search(query_vector=query_vector, k=k)
-        
-        # filter
-        valid_results = [(dist, idx) for dist, idx in zip(distances, indices) if idx != -1]
-        if not valid_results:
-            log.warning("No valid search results found")
-            return []
-        
-        embedding_ids, similarity_scores = [], []
-        # convert distances to similarity scores
-        for distance, embedding_id in valid_results:
-            # distance == squared L2
-            similarity = 1.0 - (distance / 2.0)
-            
-            if similarity >= min_score:
-                embedding_ids.append(int(embedding_id))
-                similarity_scores.append(float(similarity))
-        
-        if not embedding_ids:
-            log.info("No results above minimum score threshold %s", min_score)
+        return self.query_batch([query_text], k=k, min_score=min_score)[0]
+
+
+    def query_batch(self, query_texts: list[str], k: int = 10, min_score: float = 0.0) -> list[list[dict]]:
+        """
+        Search for many queries at once: one embed call, one FAISS search over
+        the whole query matrix and one metadata lookup for all hits; chunk
+        texts come from the DocStore.
+
+        Returns:
+            One result list per query, in the same shape as query()
+        """
+        if not query_texts:
             return []
-        
+        query_vectors = self.embedder.embed([text[:800] for text in query_texts])
+
+        # search
+        distances, indices = self.search_batch(query_vectors=query_vectors, k=k)
+
+        # filter; distance == squared L2
+        hits = [
+            [(int(idx), float(1.0 - dist / 2.0)) for dist, idx in zip(row_d, row_i)
+             if idx != -1 and 1.0 - dist / 2.0 >= min_score]
+            for row_d, row_i in zip(distances, indices)
+        ]
+
         # fetch metadata
-        chunks = []
-        for e_id in embedding_ids:
-            c_id = self.meta_index.resolve(e_id)
-            if c_id is None:
-                log.warning("No chunk found for embedding_id: %s", e_id)
-                continue
-            doc_path, start, end = self.meta_index.get_chunk_metadata(c_id)
-            chunk_text = fetch_doc(doc_path, start, end)
-
-            chunk = {
-                "embedding_id": e_id,
-                "text": chunk_text,
-            }
-            chunks.append(chunk)
-
-        if not chunks:
-            log.warning("No chunk metadata found for embedding IDs")
-            return []
-        
-        # create mapping of embedding_id to similarity score
-        score_map = dict(zip(embedding_ids, similarity_scores))
-        
-        # build search results
+        meta = self.meta_index.resolve_many(list({e_id for row in hits for e_id, _ in row}))
+
         results = []
-        for chunk in chunks:
-            embedding_id = chunk['embedding_id']
-            similarity_score = score_map.get(embedding_id, 0.0)
-            result = {
-                **chunk,
-                "similarity_score": similarity_score
-            }
-            results.append(result)
-        
-        # sort by similarity score (descending)
-        results.sort(key=lambda x: x["similarity_score"], reverse=True)
-        return results[:k]
+        for row in hits:
+            chunks = []
+            for e_id, similarity_score in row:
+                if e_id not in meta:
+                    log.warning("No chunk found for embedding_id: %s", e_id)
+                    continue
+                _, doc_path, start, end = meta[e_id]
+                chunks.append({
+                    "embedding_id": e_id,
+                    "text": self.doc_store.fetch(doc_path, start, end),
+                    "similarity_score": similarity_score,
+                })
+            # sort by similarity score (descending)
+            chunks.sort(key=lambda x: x["similarity_score"], reverse=True)
+            results.append(chunks[:k])
+        return results
 
 
     def search(self, query_vector: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
@@ -143,17 +129,24 @@ class VectorQueryEngine:
         Returns:
             Tuple of (distances, indices)
         """
-        if self.vector_index.index is None:
-            raise RuntimeError("Index not initialized")
-        
         if len(query_vector.shape) == 1:
             query_vector = query_vector.reshape(1, -1)
-        
-        n = self.vector_index.index.ntotal
-        distances, indices = self.vector_index.index.search(query_vector, min(k, n))
+        distances, indices = self.search_batch(query_vector, k)
         return distances[0], indices[0]
 
 
+    def search_batch(self, query_vectors: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Search for the k nearest neighbors of every row.
+        Args:
+            query_vectors: Query matrix of shape (n, dimension)
+            k: Number of neighbors to return
+        Returns:
+            Tuple of (distances, indices), each of shape (n, min(k, ntotal))
+        """
+        return self.vector_index.search(query_vectors, k)
+
+
 # === GRAPH QUERY ENGINE ===
 
 class GraphQueryEngine:
@@ -162,6 +155,8 @@ class GraphQueryEngine:
     def __init__(self):
         self.graph_config = GraphConfig()
         self.index = GraphIndex(index_path=self.graph_config.graph_index_path)
+        self._embedder: Optional[Embedder] = None # loaded on first similarity query
+        self._graph_vectors: Optional[GraphVectorIndex] = None
 
 
     def Entity(self, name: str) -> Entity:
@@ -188,6 +183,58 @@ class GraphQueryEngine:
         return self.index.list_all_aliases(entity_name)
 
 
+    def neighborhood(self,
+        name: str,
+        depth: int = 1,
+        min_strength: Optional[float] = None,
+        directed: Optional[bool] = None,
+        limit: Optional[int] = None
+    ) -> Subgraph:
+        """
+        Alias-collapsed subgraph within `depth` hops of an entity.
+        See GraphIndex.load_neighborhood().
+        """
+        return self.index.load_neighborhood(name, depth, min_strength, directed, limit)
+
+
+    def shortest_path(self,
+        a: str, b: str,
+        max_depth: int = 4,
+        min_strength: Optional[float] = None,
+        directed: Optional[bool] = None
+    ) -> Optional[Subgraph]:
+        """
+        Shortest path from a to b as a Subgraph, or None if none within max_depth hops.
+        See GraphIndex.load_shortest_path().
+        """
+        return self.index.load_shortest_path(a, b, max_depth, min_strength, directed)
+
+
+    def search_claims(self,
+        text: str,
+        limit: int = 10,
+        entity: Optional[str] = None,
+        date_range: Optional[tuple[str, str]] = None
+    ) -> list[ClaimData]:
+        """
+        BM25-ranked keyword search over claims. See GraphIndex.search_claims().
+        """
+        return self.index.search_claims(text, limit, entity, date_range)
+
+
+    def snapshot(self, refresh: bool = False) -> GraphSnapshot:
+        """
+        Array-backed graph snapshot for analytics, cached as an .npz in the stage dir.
+        refresh=True rebuilds it from the index (do this after the graph changes).
+        """
+        path = self.graph_config.graph_snapshot_path
+        if not refresh and path.exists():
+            return GraphSnapshot.load(path)
+        snapshot = self.index.snapshot()
+        snapshot.save(path)
+        return snapshot
+
+
     def query(self, query: str):
         """
         TODO: not implemented
@@ -195,17 +242,213 @@ class GraphQueryEngine:
         raise NotImplementedError()
 
 
-    def find_similar_entities(self, name: str) -> list[str]:
+    def find_similar_entities(self, name: str, k: int = 10, min_score: float = 0.0) -> list[str]:
         """
-        | TODO: not implemented.
+        Canonical entities whose names embed closest to `name`, best first.
+        The entity itself (and its aliases) is left out. Useful for alias suggestions.
         """
-        raise NotImplementedError("find_similar_entities requires vector integration")
+        own = self.index.resolve_alias(name)
+        def similar(resolved: dict[int, str]) -> list[str]:
+            return list(dict.fromkeys(n for n in resolved.values() if n != own))
+
+        resolved = self._search_vectors("entity", name, k, min_score,
+            resolve=self.index.resolve_entity_vectors,
+            enough=lambda resolved: len(similar(resolved)) >= k,
+        )
+        return similar(resolved)[:k]
+
 
+    def find_similar_claims(self, content: str, k: int = 10, min_score: float = 0.0) -> list[ClaimData]:
+        """Claims whose content embeds closest to `content`, best first."""
+        resolved = self._search_vectors("claim", content, k, min_score,
+            resolve=self.index.resolve_claim_vectors,
+            enough=lambda resolved: len(resolved) >= k,
+        )
+        return list(resolved.values())[:k]
 
-    def find_similar_claims(self, content: str) -> list[ClaimData]:
+
+    def sync_vectors(self) -> dict[str, int]:
         """
-        | TODO: not implemented.
+        Embed entities and claims written without vectors (e.g. built with
+        embed_graph off, or upserted directly through GraphIndex).
         """
-        raise NotImplementedError("find_similar_claims requires vector integration")
-    
+        embedder, graph_vectors = self._vectors()
+        return graph_vectors.sync(embedder.embed)
+
+
+    def _search_vectors(self, kind, text, k, min_score, resolve, enough) -> dict:
+        """
+        Helper: embed `text` and search the graph's `kind` index, widening the
+        search until enough(resolved) holds; deleted rows and alias duplicates
+        can make the first k vectors resolve to fewer than k results.
+        Returns {vector_id: row}, best first.
+        """
+        embedder, graph_vectors = self._vectors()
+        query_vector = embedder.embed([text])[0]
+
+        fetch = 2 * k + 1
+        while True:
+            hits = [i for i, score in graph_vectors.search(kind, query_vector, fetch) if score >= min_score]
+            found = resolve(hits)
+            resolved = {i: found[i] for i in hits if i in found}
+            if enough(resolved) or len(hits) < fetch or fetch >= graph_vectors.size(kind):
+                return resolved
+            fetch *= 4
+
+
+    def _vectors(self) -> tuple[Embedder, GraphVectorIndex]:
+        """Helper: load the embedder and the graph's vector indexes on first use."""
+        if self._graph_vectors is None:
+            vector_config = VectorDBConfig(stage_dir=self.graph_config.stage_dir, rebuild=False)
+            self._embedder = Embedder(vector_config.embed_model, vector_config.batch_size)
+            self._graph_vectors = GraphVectorIndex(self.index, vector_config, self._embedder.dim)
+        return self._embedder, self._graph_vectors
+
+
+
+# === HYBRID QUERY ENGINE ===
+
+class HybridQueryEngine:
+    """
+    Chunk retrieval and the graph in one call: the query is embedded once,
+    ANN hits are mapped to the entities extracted from their documents
+    (claims.document_id), those are expanded one hop in the graph, and
+    chunks, entities and claims are re-ranked by reciprocal-rank fusion.
+    Every stage is bounded by k_chunks / max_seeds / max_nodes.
+    """
+
+    def __init__(self, cfg: VectorDBConfig):
+        self.vectors = VectorQueryEngine(cfg)
+        self.graph = GraphQueryEngine()
+
+
+    def query(self,
+        query_text: str,
+        k: int = 10,
+        k_chunks: int = 50,
+        depth: int = 1,
+        max_seeds: int = 20,
+        max_nodes: int = 200,
+        k_claims: int = 10,
+        min_score: float = 0.0,
+        rrf_k: int = 60
+    ) -> HybridResult:
+        """
+        Args:
+            query_text: Text to search for
+            k: Number of chunks and entities to return
+            k_chunks: ANN candidates (before fusion)
+            depth: Neighborhood hops around the seed entities
+            max_seeds: Seed entities taken from the candidate documents
+            max_nodes: Cap on the expanded neighborhood
+            k_claims: Number of claims to return
+            min_score: Minimum chunk similarity
+            rrf_k: RRF constant, score = sum(1 / (rrf_k + rank))
+
+        Returns:
+            HybridResult with timings in ms per stage
+        """
+        result = HybridResult()
+        timings = result.timings
+
+        with _timed(timings, "embed"):
+            query_vector = self.vectors.embedder.embed(query_text[:800])
+
+        with _timed(timings, "ann"):
+            distances, indices = self.vectors.search(query_vector=query_vector, k=k_chunks)
+            hits = [
+                (int(i), float(1.0 - d / 2.0)) # squared L2 -> cosine
+                for d, i in zip(distances, indices) if i != -1 and 1.0 - d / 2.0 >= min_score
+            ]
+
+        with _timed(timings, "chunks"):
+            meta = self.vectors.meta_index.resolve_many([i for i, _ in hits])
+            hits = [(i, score) for i, score in hits if i in meta]
+            doc_ranks: dict[int, int] = {} # document -> best chunk rank
+            for rank, (i, _) in enumerate(hits):
+                doc_ranks.setdefault(meta[i][0], rank)
+        if not hits:
+            log.warning("No valid search results found")
+            return result
+
+        with _timed(timings, "entities"):
+            doc_entities = self.graph.index.load_document_entities(list(doc_ranks))
+            seed_ranks: dict[str, tuple[int, int]] = {} # entity -> (best doc rank, -claims)
+            for document_id, counts in doc_entities.items():
+                for name, count in counts.items():
+                    key = (doc_ranks[document_id], -count)
+                    seed_ranks[name] = min(seed_ranks.get(name, key), key)
+            seeds = sorted(seed_ranks, key=seed_ranks.__getitem__)[:max_seeds]
+
+        with _timed(timings, "expand"):
+            if seeds:
+                result.subgraph = self.graph.index.load_neighborhood(seeds, depth, limit=max_nodes)
+
+        with _timed(timings, "rerank"):
+            # entities: retrieval order of the seeds x graph evidence in the neighborhood
+            evidence = {node.name: node.claim_count for node in result.subgraph.nodes}
+            for edge in result.subgraph.edges:
+                for name in (edge.source_name, edge.target_name):
+                    evidence[name] = evidence.get(name, 0) + edge.claim_count
+            entity_scores = _rrf([seeds, sorted(evidence, key=lambda n: -evidence[n])], rrf_k)
+            entity_rank = {name: rank for rank, name in enumerate(entity_scores)}
+            result.entities = list(entity_scores.items())[:k]
+
+            # chunks: ANN order x best entity of the chunk's document
+            unranked = len(entity_rank)
+            def support(document_id: int) -> int:
+                return min((entity_rank.get(n, unranked) for n in doc_entities.get(document_id, ())), default=unranked)
+
+            chunk_scores = _rrf([
+                [i for i, _ in hits],
+                [i for i, _ in sorted(hits, key=lambda h: support(meta[h[0]][0]))],
+            ], rrf_k)
+            top_chunks = list(chunk_scores)[:k]
+
+        with _timed(timings, "claims"):
+            top_docs = list(dict.fromkeys(meta[i][0] for i in top_chunks))
+            doc_claims = self.graph.index.load_document_claims(top_docs, limit_per_document=k_claims)
+            candidates = [
+                (doc_ranks[document_id], min((entity_rank.get(n, unranked) for n in c.entities), default=unranked), c)
+                for document_id, claims in doc_claims.items() for c in claims
+            ]
+            claim_scores = _rrf([
+                sorted(range(len(candidates)), key=lambda j: candidates[j][0]),
+                sorted(range(len(candidates)), key=lambda j: candidates[j][1]),
+            ], rrf_k)
+            result.claims = [candidates[j][2] for j in list(claim_scores)[:k_claims]]
+
+        with _timed(timings, "fetch"):
+            similarity = dict(hits)
+            for i in top_chunks:
+                document_id, doc_path, start, end = meta[i]
+                result.chunks.append({
+                    "embedding_id": i,
+                    "text": self.vectors.doc_store.fetch(doc_path, start, end),
+                    "similarity_score": similarity[i],
+                    "document_id": document_id,
+                    "score": chunk_scores[i],
+                })
+
+        timings["total"] = sum(timings.values())
+        return result
+
+
+def _rrf(rankings: list[list], rrf_k: int) -> dict:
+    """Reciprocal-rank fusion: {item: sum(1 / (rrf_k + rank))}, best first."""
+    scores: dict = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (rrf_k + rank + 1)
+    return dict(sorted(scores.items(), key=lambda kv: -kv[1]))
+
+
+@contextmanager
+def _timed(timings: dict[str, float], stage: str):
+    """Record the wall time of a block in ms under timings[stage]."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = (time.perf_counter() - start) * 1000.0
 
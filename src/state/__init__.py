@@ -1,7 +1,12 @@
 from .vector_index import VectorIndex
 from .meta_index import MetaIndex
+from .doc_store import DocStore
+from .embedding_cache import EmbeddingCache
 from .graph_index import GraphIndex
+from .graph_snapshot import GraphSnapshot
+from .graph_vector_index import GraphVectorIndex
 from .cluster_index import ClusterIndex
 from .checksums import Checksums
+from .llm_cache import LLMCache
 
-__all__ = ["VectorIndex", "MetaIndex", "GraphIndex", "ClusterIndex", "Checksums"]
\ No newline at end of file
+__all__ = ["VectorIndex", "MetaIndex", "DocStore", "EmbeddingCache", "GraphIndex", "GraphSnapshot", "GraphVectorIndex", "ClusterIndex", "Checksums", "LLMCache"]
\ No newline at end of file
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator
+import sqlite3
+import threading
+import os
+
+
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL;",
+    "PRAGMA foreign_keys=ON;",
+    "PRAGMA busy_timeout=5000;",
+)
+
+
+class ConnectionPool:
+    """
+    Thread-local SQLite connection manager shared by the state handlers.
+
+    - one long-lived connection per thread (per process), PRAGMAs applied once
+    - sqlite3's per-connection statement cache gives prepared-statement reuse
+    - nested scopes share the outermost connection and its single commit;
+      inner scopes are isolated with SAVEPOINTs so a failing inner call only
+      rolls back its own writes
+
+    persistent=False restores the legacy open/close-per-scope behaviour
+    (kept for benchmarking and for callers that must not hold file handles).
+    """
+
+    def __init__(self,
+        path: str | Path,
+        persistent: bool = True,
+        cached_statements: int = 256,
+    ):
+        self.path = Path(path)
+        self.persistent = persistent
+        self.cached_statements = cached_statements
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._open: list[sqlite3.Connection] = []
+        self._pid = os.getpid()
+        self._rollback_hooks: list[Callable[[], None]] = []
+        self._commit_hooks: list[Callable[[], None]] = []
+
+
+    def on_rollback(self, hook: Callable[[], None]) -> None:
+        """Register a callback fired whenever a scope rolls back real writes."""
+        self._rollback_hooks.append(hook)
+
+
+    def on_commit(self, hook: Callable[[], None]) -> None:
+        """Register a callback fired (in the committing thread) after the outermost scope commits writes."""
+        self._commit_hooks.append(hook)
+
+
+    def in_transaction(self) -> bool:
+        """True inside a scope of this thread with an open transaction, whose writes only it can see."""
+        state = self._state()
+        return state.depth > 0 and state.con is not None and state.con.in_transaction
+
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        for pragma in _PRAGMAS:
+            con.execute(pragma)
+        con.row_factory = sqlite3.Row
+        return con
+
+
+    def _state(self) -> threading.local:
+        """Per-thread state; connections never survive a fork."""
+        if os.getpid() != self._pid:
+            self._local = threading.local()
+            with self._lock:
+                self._open = []
+            self._pid = os.getpid()
+        local = self._local
+        if not hasattr(local, "depth"):
+            local.con = None
+            local.depth = 0
+        return local
+
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Yield this thread's connection.
+        The outermost scope commits on success and rolls back on error.
+        """
+        state = self._state()
+        if state.depth > 0:
+            with self._nested(state.con, state) as con:
+                yield con
+            return
+
+        if state.con is None:
+            state.con = self._connect()
+            if self.persistent:
+                with self._lock:
+                    self._open.append(state.con)
+
+        con = state.con
+        state.depth = 1
+        try:
+            yield con
+            committed = con.in_transaction
+            con.commit()
+        except BaseException:
+            self._rollback(con)
+            raise
+        finally:
+            state.depth = 0
+            if not self.persistent:
+                con.close()
+                state.con = None
+        if committed:
+            for hook in self._commit_hooks:
+                hook()
+
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Explicit write scope: every call made inside shares one connection
+        and one commit. Takes the write lock up front (BEGIN IMMEDIATE) so
+        read-then-write sequences cannot fail on lock upgrade.
+        """
+        with self.connection() as con:
+            if not con.in_transaction:
+                con.execute("BEGIN IMMEDIATE;")
+            yield con
+
+
+    @contextmanager
+    def _nested(self, con: sqlite3.Connection, state) -> Iterator[sqlite3.Connection]:
+        # only protect work when there is an open transaction to protect
+        name = f"sp_{state.depth}"
+        savepoint = con.in_transaction
+        if savepoint:
+            con.execute(f"SAVEPOINT {name};")
+        state.depth += 1
+        try:
+            yield con
+        except BaseException:
+            if savepoint:
+                con.execute(f"ROLLBACK TO {name};")
+                con.execute(f"RELEASE {name};")
+                self._fire_rollback()
+            elif con.in_transaction:
+                # everything pending was written by this scope
+                self._rollback(con)
+            raise
+        else:
+            if savepoint:
+                con.execute(f"RELEASE {name};")
+        finally:
+            state.depth -= 1
+
+
+    def _rollback(self, con: sqlite3.Connection) -> None:
+        had_writes = con.in_transaction
+        con.rollback()
+        if had_writes:
+            self._fire_rollback()
+
+
+    def _fire_rollback(self) -> None:
+        for hook in self._rollback_hooks:
+            hook()
+
+
+    def close(self) -> None:
+        """Close every pooled connection (all threads)."""
+        with self._lock:
+            open_cons, self._open = self._open, []
+        for con in open_cons:
+            try:
+                con.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
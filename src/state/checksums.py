@@ -1,10 +1,10 @@
 from __future__ import annotations
 
-from contextlib import contextmanager
 from pathlib import Path
-import sqlite3
 import hashlib
 
+from ._connection import ConnectionPool
+
 
 def debug_only(func):
     """Marks a function as debug/internal use only"""
@@ -15,27 +15,26 @@ def debug_only(func):
 class Checksums:
     def __init__(self, index_path: str | Path):
         self.index_path = Path(index_path)
+        self._pool = ConnectionPool(self.index_path)
         self._initialize()
 
 
-    @contextmanager
     def _conn(self):
         """
-        Helper to open a SQLite connection with row access by column name.
+        Helper to borrow this thread's pooled SQLite connection (row access by column name).
+        Nested calls share the outermost connection and commit.
         """
-        con = sqlite3.connect(self.index_path, check_same_thread=False)
-        con.execute("PRAGMA journal_mode=WAL;")
-        con.execute("PRAGMA foreign_keys=ON;")
-        con.execute("PRAGMA busy_timeout=5000;")
-        con.row_factory = sqlite3.Row
-        try:
-            yield con
-            con.commit()
-        except Exception:
-            con.rollback()
-            raise
-        finally:
-            con.close()
+        return self._pool.connection()
+
+
+    def transaction(self):
+        """Group several calls into one connection scope and one commit."""
+        return self._pool.transaction()
+
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self._pool.close()
 
 
     def _initialize(self) -> None:
@@ -1,13 +1,12 @@
 from __future__ import annotations
 
-from contextlib import contextmanager
 from pathlib import Path
-import sqlite3
 import shutil
 
 import numpy as np
 
 from ...config import log
+from ._connection import ConnectionPool
 
 
 def debug_only(func):
@@ -26,29 +25,27 @@ class ClusterIndex:
         self.artifacts_path = self.stage_dir / "artifacts"
         self.sim_threshold = 0.9
 
-        
+        self._pool = ConnectionPool(self.index_path)
 
         self._initialize()
 
 
-    @contextmanager
     def _conn(self):
         """
-        Helper to open a SQLite connection with row access by column name.
+        Helper to borrow this thread's pooled SQLite connection (row access by column name).
+        Nested calls share the outermost connection and commit.
         """
-        con = sqlite3.connect(self.index_path)
-        con.execute("PRAGMA journal_mode=WAL;")
-        con.execute("PRAGMA foreign_keys=ON;")
-        con.execute("PRAGMA busy_timeout=5000;")
-        con.row_factory = sqlite3.Row
-        try:
-            yield con
-            con.commit()
-        except Exception:
-            con.rollback()
-            raise
-        finally:
-            con.close()
+        return self._pool.connection()
+
+
+    def transaction(self):
+        """Group several calls into one connection scope and one commit."""
+        return self._pool.transaction()
+
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self._pool.close()
 
 
     def _initialize(self) -> None:
@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+import hashlib
+import mmap
+import shutil
+import threading
+import os
+
+import numpy as np
+
+from ._connection import ConnectionPool
+
+
+class DocStore:
+    """
+    Content-addressed, memory-mapped copies of ingested documents.
+
+    Each document is stored once as UTF-8 under <root>/<sha[:2]>/<sha>.txt,
+    next to an offset table (<sha>.offsets.npy) holding the byte offset of
+    every STRIDE-th character. A [start_char:end_char] slice then decodes at
+    most one stride of extra text on each side, instead of the whole file.
+    documents.sqlite maps source paths to their current copy; an LRU of hot
+    chunk texts sits in front. Copies no longer referenced by any path are
+    deleted (remove(), drop(), or add() re-pointing a path).
+    """
+
+    STRIDE = 1024 # chars between offset-table entries
+
+    def __init__(self, root: str | Path, cache_size: int = 4096, max_open: int = 256):
+        """
+        Args:
+            root: store directory (created if missing).
+            cache_size: chunk texts kept in the LRU.
+            max_open: documents kept memory-mapped at once.
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._pool = ConnectionPool(self.root / "documents.sqlite")
+        self.cache_size = cache_size
+        self.max_open = max_open
+
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock() # add() vs deleting unreferenced copies
+        self._versions: dict[int, int] = {} # id(connection) -> PRAGMA data_version the memos match
+        self._chunks: OrderedDict[tuple[str, int, int], str] = OrderedDict()
+        self._maps: OrderedDict[str, tuple[mmap.mmap | bytes, np.ndarray]] = OrderedDict()
+        self._paths: dict[str, Optional[str]] = {} # source_path -> sha (None: not stored)
+        self._initialize()
+
+
+    def _initialize(self) -> None:
+        with self._pool.connection() as con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    source_path     TEXT PRIMARY KEY,
+                    sha256          TEXT NOT NULL,
+                    n_chars         INTEGER NOT NULL
+                )
+            """)
+            con.execute("CREATE INDEX IF NOT EXISTS idx_documents_sha ON documents(sha256)")
+
+
+    def close(self) -> None:
+        """Unmap documents and close pooled connections."""
+        with self._lock:
+            for data, _ in self._maps.values():
+                if isinstance(data, mmap.mmap):
+                    data.close()
+            self._maps.clear()
+            self._versions.clear()
+        self._pool.close()
+
+
+    # --- write ---
+
+    def add(self, source_path: str | Path) -> str:
+        """
+        Copy a document into the store (streamed, STRIDE chars at a time) and
+        point source_path at it. Identical content is stored once.
+        Returns the content hash.
+        """
+        source_path = str(source_path)
+        tmp = self.root / f".{os.getpid()}.{threading.get_ident()}.tmp"
+        digest, offsets, n_chars, pos = hashlib.sha256(), [0], 0, 0
+        try:
+            with open(source_path, encoding="utf-8") as fh, tmp.open("wb") as out:
+                while block := fh.read(self.STRIDE):
+                    data = block.encode("utf-8")
+                    digest.update(data)
+                    out.write(data)
+                    n_chars += len(block)
+                    pos += len(data)
+                    offsets.append(pos)
+        except OSError as e:
+            tmp.unlink(missing_ok=True)
+            raise RuntimeError(f"cannot open {source_path}: {e}")
+
+        sha = digest.hexdigest()
+        text_path, offsets_path = self._files(sha)
+        with self._write_lock:
+            if text_path.exists():
+                tmp.unlink()
+            else:
+                text_path.parent.mkdir(exist_ok=True)
+                np.save(offsets_path, np.asarray(offsets, dtype=np.int64))
+                tmp.replace(text_path) # the text appears last: present means complete
+
+            with self._pool.connection() as con:
+                row = con.execute("SELECT sha256 FROM documents WHERE source_path = ?", (source_path,)).fetchone()
+                con.execute("""
+                    INSERT INTO documents (source_path, sha256, n_chars) VALUES (?, ?, ?)
+                    ON CONFLICT(source_path) DO UPDATE SET
+                        sha256 = excluded.sha256,
+                        n_chars = excluded.n_chars
+                """, (source_path, sha, n_chars))
+            if row is not None and row["sha256"] != sha:
+                self._collect([row["sha256"]])
+        with self._lock:
+            if self._paths.get(source_path) != sha: # content changed: drop stale chunks
+                self._forget(source_path)
+            self._paths[source_path] = sha
+        return sha
+
+
+    def remove(self, source_paths: list[str | Path]) -> int:
+        """
+        Forget documents and delete the copies no other path refers to.
+        Returns the number of copies deleted.
+        """
+        source_paths = list(dict.fromkeys(str(p) for p in source_paths))
+        if not source_paths:
+            return 0
+        with self._write_lock:
+            with self._pool.connection() as con:
+                shas = set()
+                for source_path in source_paths:
+                    row = con.execute("SELECT sha256 FROM documents WHERE source_path = ?", (source_path,)).fetchone()
+                    if row is not None:
+                        shas.add(row["sha256"])
+                        con.execute("DELETE FROM documents WHERE source_path = ?", (source_path,))
+            removed = self._collect(shas)
+        with self._lock:
+            for source_path in source_paths:
+                self._forget(source_path)
+                self._paths[source_path] = None
+        return removed
+
+
+    def drop(self) -> None:
+        """Forget every document and delete all stored copies."""
+        with self._write_lock:
+            with self._pool.connection() as con:
+                con.execute("DELETE FROM documents")
+            for folder in [p for p in self.root.iterdir() if p.is_dir()]:
+                shutil.rmtree(folder)
+            for tmp in self.root.glob(".*.tmp"): # leftovers of interrupted adds
+                tmp.unlink(missing_ok=True)
+        with self._lock:
+            self._chunks.clear()
+            self._maps.clear() # open maps are unmapped once no reader holds them
+            self._paths.clear()
+
+
+    def _collect(self, shas) -> int:
+        """Helper (under _write_lock): delete the copies of shas that no path refers to any more."""
+        removed = 0
+        with self._pool.connection() as con:
+            for sha in shas:
+                if con.execute("SELECT 1 FROM documents WHERE sha256 = ? LIMIT 1", (sha,)).fetchone() is not None:
+                    continue
+                text_path, offsets_path = self._files(sha)
+                if text_path.exists():
+                    removed += 1
+                text_path.unlink(missing_ok=True) # the text goes first: absent means gone
+                offsets_path.unlink(missing_ok=True)
+                with self._lock:
+                    self._maps.pop(sha, None)
+        return removed
+
+
+    def _forget(self, source_path: str) -> None:
+        """Helper (under _lock): drop the cached chunks of source_path."""
+        for key in [k for k in self._chunks if k[0] == source_path]:
+            del self._chunks[key]
+
+
+    # --- read ---
+
+    def has(self, source_path: str | Path) -> bool:
+        self._sync()
+        return self._sha(str(source_path)) is not None
+
+
+    def fetch(self, source_path: str | Path, start_char: int | None = None, end_char: int | None = None) -> str:
+        """
+        Same contract as util.fetch_doc (clamped slice, or the whole text when
+        no valid range is given), served from the store in O(chunk).
+        Documents that were never added are read from source_path.
+        """
+        source_path = str(source_path)
+        if start_char is None or end_char is None or start_char >= end_char:
+            start_char, end_char = 0, None
+
+        key = (source_path, start_char, end_char)
+        self._sync()
+        with self._lock:
+            text = self._chunks.get(key)
+            if text is not None:
+                self._chunks.move_to_end(key)
+                return text
+
+        sha = self._sha(source_path)
+        if sha is None:
+            from ..util import fetch_doc
+            text = fetch_doc(source_path, start_char, end_char)
+        else:
+            text = self._slice(sha, start_char, end_char)
+
+        with self._lock:
+            self._chunks[key] = text
+            while len(self._chunks) > self.cache_size:
+                self._chunks.popitem(last=False)
+        return text
+
+
+    def _slice(self, sha: str, start_char: int, end_char: Optional[int]) -> str:
+        """Helper: decode only the offset-table blocks covering [start_char, end_char)."""
+        data, offsets = self._open(sha)
+        last = len(offsets) - 1 # offsets[last] == byte length
+        first_block = min(max(start_char, 0) // self.STRIDE, last)
+        end_block = last if end_char is None else min(-(-end_char // self.STRIDE), last)
+        end_block = max(end_block, first_block)
+        text = bytes(data[offsets[first_block]:offsets[end_block]]).decode("utf-8")
+
+        start = max(0, start_char - first_block * self.STRIDE)
+        end = len(text) if end_char is None else max(start, end_char - first_block * self.STRIDE)
+        return text[start:end]
+
+
+    def _open(self, sha: str) -> tuple[mmap.mmap | bytes, np.ndarray]:
+        """Helper: memory-map a stored document and load its offset table (LRU of open maps)."""
+        with self._lock:
+            entry = self._maps.get(sha)
+            if entry is not None:
+                self._maps.move_to_end(sha)
+                return entry
+
+        text_path, offsets_path = self._files(sha)
+        offsets = np.load(offsets_path)
+        with text_path.open("rb") as fh:
+            # mmap can't map empty files
+            data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) if offsets[-1] else b""
+
+        with self._lock:
+            entry = self._maps.setdefault(sha, (data, offsets))
+            while len(self._maps) > self.max_open:
+                self._maps.popitem(last=False) # unmapped once no reader holds it
+            return entry
+
+
+    def _sync(self) -> None:
+        """
+        Helper: drop the path memo and chunk LRU once another connection (a
+        builder in another thread or process) has changed documents.sqlite.
+        PRAGMA data_version is per-connection and costs no I/O.
+        """
+        with self._pool.connection() as con:
+            version = con.execute("PRAGMA data_version;").fetchone()[0]
+            if self._versions.get(id(con)) == version:
+                return
+            with self._lock:
+                self._paths.clear()
+                self._chunks.clear()
+                self._versions[id(con)] = version
+
+
+    def _sha(self, source_path: str) -> Optional[str]:
+        """Helper: content hash stored for source_path (memoized, see _sync)."""
+        with self._lock:
+            if source_path in self._paths:
+                return self._paths[source_path]
+        with self._pool.connection() as con:
+            row = con.execute("SELECT sha256 FROM documents WHERE source_path = ?", (source_path,)).fetchone()
+        sha = row["sha256"] if row is not None else None
+        if sha is not None and not self._files(sha)[0].exists():
+            sha = None
+        with self._lock:
+            self._paths[source_path] = sha
+        return sha
+
+
+    def _files(self, sha: str) -> tuple[Path, Path]:
+        folder = self.root / sha[:2]
+        return folder / f"{sha}.txt", folder / f"{sha}.offsets.npy"
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional
+import hashlib
+import threading
+import re
+
+import numpy as np
+
+from ._connection import ConnectionPool
+
+
+class EmbeddingCache:
+    """
+    Persistent embeddings keyed by (model, sha256 of the text).
+
+    Vectors are appended to one raw float32 matrix per model
+    (<root>/<model>.f32, row i at byte 4 * dim * i); keys.sqlite maps
+    (model, sha256) -> row. Rows are written before their keys, so a crash
+    leaves at worst unreferenced rows, never a key pointing past the file.
+    """
+
+    _IN_LIST_MAX = 500
+
+    def __init__(self, root: str | Path, model: str, dim: int):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.model = model
+        self.dim = dim
+        self.matrix_path = self.root / (re.sub(r"[^\w.-]+", "_", model) + ".f32")
+        self._pool = ConnectionPool(self.root / "keys.sqlite")
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.memmap] = None # read view; reopened when the file grows
+        self._initialize()
+
+
+    def _initialize(self) -> None:
+        with self._pool.connection() as con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS keys (
+                    model       TEXT NOT NULL,
+                    sha256      BLOB NOT NULL,
+                    row         INTEGER NOT NULL,
+                    PRIMARY KEY (model, sha256)
+                ) WITHOUT ROWID
+            """)
+
+
+    def close(self) -> None:
+        self._matrix = None
+        self._pool.close()
+
+
+    @staticmethod
+    def key(text: str) -> bytes:
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+    def get_many(self, keys: list[bytes]) -> dict[bytes, np.ndarray]:
+        """Cached vectors for the given keys (misses are left out)."""
+        rows: dict[bytes, int] = {}
+        with self._pool.connection() as con:
+            for i in range(0, len(keys), self._IN_LIST_MAX):
+                part = keys[i:i + self._IN_LIST_MAX]
+                rows.update(con.execute(
+                    f"SELECT sha256, row FROM keys WHERE model = ? AND sha256 IN ({','.join('?' * len(part))})",
+                    [self.model, *part],
+                ).fetchall())
+        if not rows:
+            return {}
+        matrix = self._view(max(rows.values()) + 1)
+        return {k: np.array(matrix[row]) for k, row in rows.items()}
+
+
+    def put_many(self, keys: list[bytes], vectors: np.ndarray) -> None:
+        """Append vectors and index them under keys (keys already cached are kept)."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(keys), self.dim)
+        if not keys:
+            return
+        with self._lock:
+            with self.matrix_path.open("ab") as fh:
+                start = fh.tell() // (4 * self.dim)
+                fh.seek(start * 4 * self.dim) # drop a torn partial row
+                fh.truncate()
+                fh.write(vectors.tobytes())
+            with self._pool.connection() as con:
+                con.executemany(
+                    "INSERT OR IGNORE INTO keys (model, sha256, row) VALUES (?, ?, ?)",
+                    [(self.model, k, start + i) for i, k in enumerate(keys)],
+                )
+
+
+    def size(self) -> int:
+        """Rows in the matrix file."""
+        return self.matrix_path.stat().st_size // (4 * self.dim) if self.matrix_path.exists() else 0
+
+
+    def _view(self, min_rows: int) -> np.memmap:
+        """Helper: memory-mapped (rows, dim) view with at least min_rows rows."""
+        with self._lock:
+            if self._matrix is None or len(self._matrix) < min_rows:
+                self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(self.size(), self.dim))
+            return self._matrix
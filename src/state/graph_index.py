@@ -1,15 +1,25 @@
 from __future__ import annotations
 
-from contextlib import contextmanager
 from pathlib import Path
+import re
 import sqlite3
+import threading
 from datetime import datetime, timezone
-from typing import Optional, Literal
+from typing import Iterable, Optional, Literal
+
+import numpy as np
 
 from ...config import log
+from ._connection import ConnectionPool
+from .graph_snapshot import GraphSnapshot
 from .._schemas import (
     RelationshipRecord,
+    EntityRecord,
     ClaimData,
+    ClaimRecord,
+    Subgraph,
+    SubgraphNode,
+    SubgraphEdge,
     AliasConflictError,
     EntityNotFoundError,
     RelationshipCollisionError,
@@ -24,32 +34,82 @@ def debug_only(func):
     return func
 
 
+def _norm_date(val: Optional[str], default_to_now: bool) -> Optional[str]:
+    """Normalize an LLM-provided date string to '%Y-%m-%d %H:%M:%S' (UTC)."""
+    def _default():
+        return (
+            datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+            if default_to_now
+            else None
+        )
+
+    if val is None:
+        return _default()
+
+    s = val.strip().replace("—", "-") # handle LLM relics
+    if len(s) == 4 and s.isdigit():
+        try:
+            dt = datetime(int(s), 1, 1, tzinfo=timezone.utc)
+            return dt.strftime("%Y-%m-%d %H:%M:%S")
+        except Exception:
+            return _default()
+    if len(s) == 7 and s[4] == "-" and s[:4].isdigit() and s[5:7].isdigit():
+        try:
+            dt = datetime(int(s[:4]), int(s[5:7]), 1, tzinfo=timezone.utc)
+            return dt.strftime("%Y-%m-%d %H:%M:%S")
+        except Exception:
+            return _default()
+
+    try:
+        dt = datetime.fromisoformat(s)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.strftime("%Y-%m-%d %H:%M:%S")
+    except Exception:
+        return _default()
+
+
 class GraphIndex:
     """Graph Index handler"""
 
-    def __init__(self, index_path: str | Path):
+    def __init__(self, index_path: str | Path, persistent: bool = True):
         self.index_path = Path(index_path)
+        self._pool = ConnectionPool(self.index_path, persistent=persistent)
+
+        # alias cache: whole alias table + entity name<->id maps (see _sync_alias_cache),
+        # committed state only; writes inside a transaction wait in _pending until it commits
+        self._cache_lock = threading.RLock()
+        self._cache_loaded = False
+        self._cache_generation = -1
+        self._cache_versions: dict[int, int] = {} # id(connection) -> PRAGMA data_version
+        self._alias_ids: dict[str, int] = {} # alias -> entity_id
+        self._aliases_of: dict[int, list[str]] = {} # entity_id -> aliases
+        self._entity_ids: dict[str, int] = {} # name -> id
+        self._entity_names: dict[int, str] = {} # id -> name
+        self._pending = threading.local()
+        self._pool.on_commit(self._publish_pending_cache)
+        self._pool.on_rollback(self._drop_pending_cache)
+
         self._initialize()
 
 
-    @contextmanager
     def _conn(self):
         """
-        Helper to open a SQLite connection with row access by column name.
+        Helper to borrow this thread's pooled SQLite connection (row access by column name).
+        Nested calls share the outermost connection and commit.
         """
-        con = sqlite3.connect(self.index_path)
-        con.execute("PRAGMA journal_mode=WAL;")
-        con.execute("PRAGMA foreign_keys=ON;")
-        con.execute("PRAGMA busy_timeout=5000;")
-        con.row_factory = sqlite3.Row
-        try:
-            yield con
-            con.commit()
-        except Exception:
-            con.rollback()
-            raise
-        finally:
-            con.close()
+        return self._pool.connection()
+
+
+    def transaction(self):
+        """Group several calls into one connection scope and one commit."""
+        return self._pool.transaction()
+
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self._pool.close()
+        self._cache_versions.clear()
 
 
     def _initialize(self) -> None:
@@ -97,17 +157,158 @@ class GraphIndex:
                     source_date TEXT,
                     claim_date TEXT,
                     tags TEXT,
+                    document_id INTEGER,
                     CHECK ((entity_id IS NULL) <> (relationship_id IS NULL)),
                     FOREIGN KEY(entity_id) REFERENCES entities(id),
                     FOREIGN KEY(relationship_id) REFERENCES relationships(id)
                 );
             """)
 
+            # migration: claims.document_id (provenance for hybrid retrieval)
+            if "document_id" not in {row[1] for row in con.execute("PRAGMA table_info(claims);")}:
+                con.execute("ALTER TABLE claims ADD COLUMN document_id INTEGER;")
+
             # indexes
             con.execute("CREATE INDEX IF NOT EXISTS idx_rel_source ON relationships(source_id);")
             con.execute("CREATE INDEX IF NOT EXISTS idx_rel_target ON relationships(target_id);")
             con.execute("CREATE INDEX IF NOT EXISTS idx_claims_entity ON claims(entity_id);")
             con.execute("CREATE INDEX IF NOT EXISTS idx_claims_relationship ON claims(relationship_id);")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_aliases_entity ON aliases(entity_id);")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_claims_document ON claims(document_id);")
+
+            # generation counter: bumped by any write that can change alias resolution
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS alias_generation (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    value INTEGER NOT NULL
+                );
+            """)
+            con.execute("INSERT OR IGNORE INTO alias_generation (id, value) VALUES (0, 0);")
+            for trigger, event in (
+                ("trg_aliases_insert", "AFTER INSERT ON aliases"),
+                ("trg_aliases_update", "AFTER UPDATE ON aliases"),
+                ("trg_aliases_delete", "AFTER DELETE ON aliases"),
+                ("trg_entities_rename", "AFTER UPDATE OF name ON entities"),
+                ("trg_entities_delete", "AFTER DELETE ON entities"),
+            ):
+                con.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {trigger} {event}
+                    BEGIN
+                        UPDATE alias_generation SET value = value + 1 WHERE id = 0;
+                    END;
+                """)
+
+            # vector id -> row maps for GraphVectorIndex; rows whose text changes lose their vector,
+            # which is queued in vector_orphans until GraphVectorIndex.sync() removes it from FAISS.
+            # Rows that need a (new) vector are queued in vector_pending, so a sync costs O(new rows).
+            for table, column, parent in (("entity_vectors", "entity_id", "entities"), ("claim_vectors", "claim_id", "claims")):
+                con.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        vector_id INTEGER PRIMARY KEY,
+                        {column} INTEGER UNIQUE NOT NULL,
+                        FOREIGN KEY({column}) REFERENCES {parent}(id)
+                    );
+                """)
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS vector_orphans (
+                    kind        TEXT NOT NULL,
+                    vector_id   INTEGER NOT NULL,
+                    PRIMARY KEY (kind, vector_id)
+                ) WITHOUT ROWID;
+            """)
+            if not con.execute("SELECT 1 FROM sqlite_master WHERE name = 'vector_pending';").fetchone():
+                con.execute("""
+                    CREATE TABLE vector_pending (
+                        kind        TEXT NOT NULL,
+                        row_id      INTEGER NOT NULL,
+                        PRIMARY KEY (kind, row_id)
+                    ) WITHOUT ROWID;
+                """)
+                for kind in ("entity", "claim"): # backfill rows of databases that predate the queue
+                    table, column, parent, _ = self._vector_table(kind)
+                    con.execute(f"""
+                        INSERT INTO vector_pending (kind, row_id)
+                        SELECT '{kind}', p.id FROM {parent} p
+                        WHERE NOT EXISTS (SELECT 1 FROM {table} v WHERE v.{column} = p.id);
+                    """)
+            for trigger in ("trg_entity_vectors_delete", "trg_entity_vectors_rename", # pre-orphan versions
+                            "trg_claim_vectors_delete", "trg_claim_vectors_update",
+                            "trg_entity_vectors_unlink_rename", "trg_claim_vectors_unlink_update"): # pre-queue versions
+                con.execute(f"DROP TRIGGER IF EXISTS {trigger};")
+            unlink = lambda kind, table, column: f"""
+                INSERT OR IGNORE INTO vector_orphans (kind, vector_id)
+                SELECT '{kind}', vector_id FROM {table} WHERE {column} = old.id;
+                DELETE FROM {table} WHERE {column} = old.id;
+            """
+            enqueue = lambda kind: f"INSERT OR IGNORE INTO vector_pending (kind, row_id) VALUES ('{kind}', new.id);"
+            dequeue = lambda kind: f"DELETE FROM vector_pending WHERE kind = '{kind}' AND row_id = old.id;"
+            for trigger, event, body in (
+                ("trg_entity_vectors_queue_insert", "AFTER INSERT ON entities", enqueue("entity")),
+                ("trg_entity_vectors_unlink_delete", "AFTER DELETE ON entities",
+                    unlink("entity", "entity_vectors", "entity_id") + dequeue("entity")),
+                ("trg_entity_vectors_requeue_rename", "AFTER UPDATE OF name ON entities",
+                    unlink("entity", "entity_vectors", "entity_id") + enqueue("entity")),
+                ("trg_claim_vectors_queue_insert", "AFTER INSERT ON claims", enqueue("claim")),
+                ("trg_claim_vectors_unlink_delete", "AFTER DELETE ON claims",
+                    unlink("claim", "claim_vectors", "claim_id") + dequeue("claim")),
+                ("trg_claim_vectors_requeue_update", "AFTER UPDATE OF content ON claims",
+                    unlink("claim", "claim_vectors", "claim_id") + enqueue("claim")),
+            ):
+                con.execute(f"CREATE TRIGGER IF NOT EXISTS {trigger} {event} BEGIN {body} END;")
+
+            # full-text index over claim content + attached entity names, kept in sync by triggers
+            if not con.execute("SELECT 1 FROM sqlite_master WHERE name = 'claims_fts';").fetchone():
+                con.execute("""
+                    CREATE VIRTUAL TABLE claims_fts USING fts5(
+                        content,
+                        entities,
+                        tokenize = 'porter unicode61'
+                    );
+                """)
+                # default ranking: BM25, name matches count half as much as content matches
+                con.execute("INSERT INTO claims_fts (claims_fts, rank) VALUES ('rank', 'bm25(1.0, 0.5)');")
+                con.execute(f"""
+                    INSERT INTO claims_fts (rowid, content, entities)
+                    SELECT c.id, c.content, {self._claim_entities_sql("c")} FROM claims c;
+                """) # backfill pre-existing claims
+            # bulk writers set deferred = 1 inside their transaction and index the batch set-wise
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS claims_fts_state (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    deferred INTEGER NOT NULL
+                );
+            """)
+            con.execute("INSERT OR IGNORE INTO claims_fts_state (id, deferred) VALUES (0, 0);")
+            refresh = f"""
+                UPDATE claims_fts
+                SET entities = (SELECT {self._claim_entities_sql("c")} FROM claims c WHERE c.id = claims_fts.rowid)
+            """
+            for trigger, event, body in (
+                ("trg_claims_fts_insert", "AFTER INSERT ON claims WHEN NOT (SELECT deferred FROM claims_fts_state)", f"""
+                    INSERT INTO claims_fts (rowid, content, entities)
+                    VALUES (new.id, new.content, {self._claim_entities_sql("new")});
+                """),
+                ("trg_claims_fts_delete", "AFTER DELETE ON claims", """
+                    DELETE FROM claims_fts WHERE rowid = old.id;
+                """),
+                ("trg_claims_fts_update", "AFTER UPDATE OF content, entity_id, relationship_id ON claims", f"""
+                    UPDATE claims_fts
+                    SET content = new.content, entities = {self._claim_entities_sql("new")}
+                    WHERE rowid = old.id;
+                """),
+                ("trg_relationships_fts_update", "AFTER UPDATE OF source_id, target_id ON relationships", f"""
+                    {refresh} WHERE rowid IN (SELECT id FROM claims WHERE relationship_id = new.id);
+                """),
+                ("trg_entities_fts_rename", "AFTER UPDATE OF name ON entities", f"""
+                    {refresh} WHERE rowid IN (
+                        SELECT id FROM claims WHERE entity_id = new.id
+                        UNION
+                        SELECT c.id FROM relationships r JOIN claims c ON c.relationship_id = r.id
+                        WHERE r.source_id = new.id OR r.target_id = new.id
+                    );
+                """),
+            ):
+                con.execute(f"CREATE TRIGGER IF NOT EXISTS {trigger} {event} BEGIN {body} END;")
 
 
 
@@ -121,7 +322,9 @@ class GraphIndex:
                 DO UPDATE SET entity_type = COALESCE(excluded.entity_type, entities.entity_type)
                 RETURNING id;
             """, (name, entity_type))
-            return cur.fetchone()[0]
+            entity_id = cur.fetchone()[0]
+        self._cache_entity(name, entity_id)
+        return entity_id
 
 
     def upsert_relationship(self,
@@ -142,13 +345,13 @@ class GraphIndex:
         if source_canonical == target_canonical:
             raise RelationshipCollisionError(source_name, target_name)
     
-        source_id = self.upsert_entity(source_canonical)
-        target_id = self.upsert_entity(target_canonical)
+        with self.transaction() as con:
+            source_id = self.upsert_entity(source_canonical)
+            target_id = self.upsert_entity(target_canonical)
 
-        # normalize for undirected relationships
-        source_id, target_id, directed = self._normalize_pair(source_id, target_id, directed)
+            # normalize for undirected relationships
+            source_id, target_id, directed = self._normalize_pair(source_id, target_id, directed)
 
-        with self._conn() as con:
             cur = con.execute("""
                 INSERT INTO relationships (source_id, target_id, strength, directed, date_added)
                 VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
@@ -186,9 +389,10 @@ class GraphIndex:
             )
             raise AliasConflictError(entity_name, canonical, alias, message=msg)
         
-        entity_id = self.upsert_entity(entity_name)
-        
-        with self._conn() as con:
+        with self.transaction() as con:
+            self._sync_alias_cache()
+            entity_id = self.upsert_entity(entity_name)
+
             # check: don't upsert an alias that belongs to another entity
             alias_is_existing_alias = con.execute(
                 "SELECT entity_id FROM aliases WHERE alias = ?;", 
@@ -206,6 +410,9 @@ class GraphIndex:
                 VALUES (?, ?, CURRENT_TIMESTAMP)
                 ON CONFLICT(alias) DO NOTHING;
             """, (entity_id, alias))
+            if not alias_is_existing_alias:
+                self._cache_set_alias(alias, entity_id)
+                self._cache_commit_generation(con)
             
             cur = con.execute("SELECT id FROM aliases WHERE alias = ?;", (alias,))
             return cur.fetchone()[0]
@@ -218,6 +425,7 @@ class GraphIndex:
         relationship: Optional[RelationshipRecord] = None,
         source_date: Optional[str] = None,
         claim_date: Optional[str] = None,
+        document_id: Optional[int] = None,
     ) -> int:
         """Insert a claim associated with either an entity or a relationship."""
         if entity_name and relationship:
@@ -225,74 +433,143 @@ class GraphIndex:
         if not entity_name and not relationship:
             raise ValueError("Claim must be associated with either entity or relationship")
 
-        entity_id = None
-        relationship_id = None
-        
-        if entity_name:
-            entity_id = self.upsert_entity(entity_name)
-        elif relationship:
-            relationship_id = self.upsert_relationship(
-                relationship.source_name,
-                relationship.target_name,
-                relationship.strength,
-                relationship.directed
-            )
-        
-        def _norm_date(val: Optional[str], default_to_now: bool) -> Optional[str]:
-            def _default():
-                return (
-                    datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-                    if default_to_now
-                    else None
-                )
-            
-            if val is None:
-                return _default()
-
-            s = val.strip().replace("—", "-") # handle LLM relics
-            if len(s) == 4 and s.isdigit():
-                try:
-                    dt = datetime(int(s), 1, 1, tzinfo=timezone.utc)
-                    return dt.strftime("%Y-%m-%d %H:%M:%S")
-                except Exception:
-                    return _default()
-            if len(s) == 7 and s[4] == "-" and s[:4].isdigit() and s[5:7].isdigit():
-                try:
-                    dt = datetime(int(s[:4]), int(s[5:7]), 1, tzinfo=timezone.utc)
-                    return dt.strftime("%Y-%m-%d %H:%M:%S")
-                except Exception:
-                    return _default()
-
-            try:
-                dt = datetime.fromisoformat(s)
-                if dt.tzinfo is None:
-                    dt = dt.replace(tzinfo=timezone.utc)
-                return dt.strftime("%Y-%m-%d %H:%M:%S")
-            except Exception:
-                return _default()
-
         # source date should default to now if it is None or botched
         source_date_iso8601 = _norm_date(source_date, default_to_now=True)
 
         # claim date should not default to now
         claim_date_iso8601 = _norm_date(claim_date, default_to_now=False)
-        
-        with self._conn() as con:
+
+        entity_id = None
+        relationship_id = None
+
+        with self.transaction() as con:
+            if entity_name:
+                entity_id = self.upsert_entity(entity_name)
+            elif relationship:
+                relationship_id = self.upsert_relationship(
+                    relationship.source_name,
+                    relationship.target_name,
+                    relationship.strength,
+                    relationship.directed
+                )
+
             cur = con.execute("""
-                INSERT INTO claims (entity_id, relationship_id, content, source, source_date, claim_date, date_added)
-                VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                INSERT INTO claims (entity_id, relationship_id, content, source, source_date, claim_date, document_id, date_added)
+                VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
                 RETURNING id;
-            """, (entity_id, relationship_id, content, source, source_date_iso8601, claim_date_iso8601))
+            """, (entity_id, relationship_id, content, source, source_date_iso8601, claim_date_iso8601, document_id))
             return cur.fetchone()[0]
 
 
+    def upsert_entities_bulk(self, entities: list[EntityRecord]) -> dict[str, int]:
+        """
+        Set-oriented upsert_entity(): one staged INSERT ... SELECT per batch.
+        Returns {name: id}. Later non-null entity types win, as with sequential upserts.
+        """
+        if not entities:
+            return {}
+        with self.transaction() as con:
+            return self._upsert_entities_staged(con, [(e.name, e.entity_type) for e in entities])
+
+
+    def upsert_relationships_bulk(self, relationships: list[RelationshipRecord]) -> list[Optional[int]]:
+        """
+        Set-oriented upsert_relationship(). Endpoints are alias-resolved from the cache.
+        Returns relationship ids aligned with the input; None where source and
+        target resolve to the same canonical entity (see RelationshipCollisionError).
+        """
+        if not relationships:
+            return []
+        with self.transaction() as con:
+            return self._upsert_relationships_staged(con, relationships)
+
+
+    def upsert_claims_bulk(self,
+        claims: list[ClaimRecord],
+        on_collision: Literal["raise", "source"] = "raise",
+    ) -> list[int]:
+        """
+        Set-oriented upsert_claim(): entities, relationships and claims for the
+        whole batch are written in one transaction (one commit).
+
+        Args:
+            claims: ClaimRecords, each attached to an entity xor a relationship.
+            on_collision: for relationship claims whose endpoints resolve to the
+                same canonical entity:
+                - "raise": raise RelationshipCollisionError (nothing is written)
+                - "source": attach the claim to the source entity instead
+        Returns:
+            claim ids aligned with the input.
+        """
+        if not claims:
+            return []
+        for c in claims:
+            if c.entity_name and c.relationship:
+                raise ValueError("Claim cannot be associated with both entity and relationship")
+            if not c.entity_name and not c.relationship:
+                raise ValueError("Claim must be associated with either entity or relationship")
+        if on_collision not in ("raise", "source"):
+            raise ValueError(f"Unknown on_collision: {on_collision}")
+
+        with self.transaction() as con:
+            rel_positions = [i for i, c in enumerate(claims) if c.relationship]
+            rel_ids = self._upsert_relationships_staged(con, [claims[i].relationship for i in rel_positions])
+
+            targets: list[tuple[Optional[str], Optional[int]]] = [(c.entity_name, None) for c in claims]
+            for i, rel_id in zip(rel_positions, rel_ids):
+                rel = claims[i].relationship
+                if rel_id is not None:
+                    targets[i] = (None, rel_id)
+                elif on_collision == "raise":
+                    raise RelationshipCollisionError(rel.source_name, rel.target_name)
+                else:
+                    log.info("Self-referential relationship detected between %s and %s: upserting to %s",
+                        rel.source_name, rel.target_name, rel.source_name)
+                    targets[i] = (rel.source_name, None)
+
+            entity_ids = self._upsert_entities_staged(
+                con, [(name, None) for name, _ in targets if name is not None]
+            )
+
+            rows = []
+            for c, (name, rel_id) in zip(claims, targets):
+                rows.append((
+                    entity_ids[name] if name is not None else None,
+                    rel_id,
+                    c.content,
+                    c.source,
+                    _norm_date(c.source_date, default_to_now=True),
+                    _norm_date(c.claim_date, default_to_now=False),
+                    c.document_id,
+                ))
+
+            # the write lock is held, so new rowids are exactly those above the current max
+            last_id = con.execute("SELECT COALESCE(MAX(id), 0) FROM claims;").fetchone()[0]
+            con.execute("UPDATE claims_fts_state SET deferred = 1 WHERE id = 0;")
+            con.executemany("""
+                INSERT INTO claims (entity_id, relationship_id, content, source, source_date, claim_date, document_id, date_added)
+                VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP);
+            """, rows)
+            con.execute(f"""
+                INSERT INTO claims_fts (rowid, content, entities)
+                SELECT c.id, c.content, {self._claim_entities_sql("c")} FROM claims c WHERE c.id > ?;
+            """, (last_id,))
+            con.execute("UPDATE claims_fts_state SET deferred = 0 WHERE id = 0;")
+            return [
+                row[0] for row in con.execute(
+                    "SELECT id FROM claims WHERE id > ? ORDER BY id;", (last_id,)
+                ).fetchall()
+            ]
+
+
     def drop(self):
         """drop all data from all tables."""
-        with self._conn() as con:
+        with self.transaction() as con:
             con.execute("DELETE FROM claims;")
             con.execute("DELETE FROM relationships;")
             con.execute("DELETE FROM aliases;")
             con.execute("DELETE FROM entities;")
+            self._load_alias_cache(con, self._alias_generation(con))
 
 
     def load_aliases(self, name: str) -> list[str]:
@@ -320,31 +597,24 @@ class GraphIndex:
 
     def resolve_alias(self, name: str) -> str:
         """
-        Return the canonical name of an entity.
+        Return the canonical name of an entity (O(1) via the alias cache).
         NOTE: may want to be more explicit about entity-DNE.
         """
-        with self._conn() as con:
-            alias_row = con.execute(
-                "SELECT entity_id FROM aliases WHERE alias = ?;",
-                (name,)
-            ).fetchone() # check if name is an alias
-            
-            if alias_row: # -> get canonical entity name
-                entity_row = con.execute(
-                    "SELECT name FROM entities WHERE id = ?;",
-                    (alias_row[0],)
-                ).fetchone()
-                return entity_row[0]
-            
-            entity_row = con.execute(
-                "SELECT name FROM entities WHERE name = ?;",
-                (name,)
-            ).fetchone() # if not alias, check if it's an entity name
-            
-            if entity_row:
-                return entity_row[0]
-        
-            return name # not an alias, not yet an entity
+        self._sync_alias_cache()
+        return self._resolve_cached(name)
+
+
+    def resolve_aliases(self, names: Iterable[str]) -> dict[str, str]:
+        """Batch resolve_alias() for bulk callers: {name: canonical_name}."""
+        self._sync_alias_cache()
+        if self._has_pending_cache(): # this thread's transaction changed aliases: overlay lookups
+            return {name: self._resolve_cached(name) for name in names}
+        alias_ids, entity_names = self._alias_ids, self._entity_names
+        out = {}
+        for name in names:
+            entity_id = alias_ids.get(name)
+            out[name] = name if entity_id is None else entity_names.get(entity_id, name)
+        return out
     
 
     def load_entity_claims(self, name: str) -> list[ClaimData]:
@@ -521,6 +791,331 @@ class GraphIndex:
             ]
 
 
+    def load_neighborhood(self,
+        name: str | Iterable[str],
+        depth: int = 1,
+        min_strength: Optional[float] = None,
+        directed: Optional[bool] = None,
+        limit: Optional[int] = None
+    ) -> Subgraph:
+        """
+        Expand up to `depth` hops around an entity in one recursive query.
+        Aliases are collapsed: every node is a canonical entity.
+
+        Args:
+            name: Seed entity name (can be alias), or several seeds expanded together.
+            depth: Maximum number of hops from the nearest seed.
+            min_strength: Only follow relationships with strength >= min_strength.
+            directed: None => follow every relationship in either direction;
+                      True => follow directed relationships source→target only;
+                      False => follow undirected relationships only.
+            limit: Keep at most `limit` nodes, nearest first.
+        Returns:
+            Subgraph of the reached nodes and every matching edge between them.
+        """
+        if depth < 0:
+            raise ValueError("depth must be >= 0")
+        names = [name] if isinstance(name, str) else list(name)
+        with self._conn() as con:
+            seed_ids = list(dict.fromkeys(self._expand_ids(con, n)[0] for n in names))
+            self._walk(con, seed_ids, depth, min_strength, directed, limit)
+            return self._load_walk_subgraph(con, min_strength, directed)
+
+
+    def load_document_entities(self, document_ids: list[int]) -> dict[int, dict[str, int]]:
+        """
+        Canonical entities extracted from each document, via claims.document_id:
+        {document_id: {entity name: number of claims}}. Relationship claims count
+        for both endpoints. Documents without claims are left out.
+        """
+        if not document_ids:
+            return {}
+        ps = ",".join("?" * len(document_ids))
+        with self._conn() as con:
+            rows = con.execute(f"""
+                SELECT c.document_id, e.name, COUNT(*)
+                FROM claims c
+                JOIN entities e ON e.id = c.entity_id
+                WHERE c.document_id IN ({ps})
+                GROUP BY c.document_id, e.id
+                UNION ALL
+                SELECT c.document_id, e.name, COUNT(*)
+                FROM claims c
+                JOIN relationships r ON r.id = c.relationship_id
+                JOIN entities e ON e.id = r.source_id OR e.id = r.target_id
+                WHERE c.document_id IN ({ps})
+                GROUP BY c.document_id, e.id;
+            """, list(document_ids) * 2).fetchall()
+
+        canonical = self.resolve_aliases(row[1] for row in rows)
+        out: dict[int, dict[str, int]] = {}
+        for document_id, name, count in rows:
+            counts = out.setdefault(document_id, {})
+            counts[canonical[name]] = counts.get(canonical[name], 0) + count
+        return out
+
+
+    def load_document_claims(self,
+        document_ids: list[int],
+        limit_per_document: int = 20
+    ) -> dict[int, list[ClaimData]]:
+        """
+        Claims extracted from each document, oldest first, at most
+        limit_per_document each: {document_id: [ClaimData]}.
+        """
+        if not document_ids:
+            return {}
+        with self._conn() as con:
+            rows = con.execute(f"""
+                SELECT c.document_id, {self._CLAIM_COLUMNS}
+                FROM (
+                    SELECT *, ROW_NUMBER() OVER (PARTITION BY document_id ORDER BY id) AS n
+                    FROM claims
+                    WHERE document_id IN ({",".join("?" * len(document_ids))})
+                ) c
+                {self._CLAIM_JOINS}
+                WHERE c.n <= ?
+                ORDER BY c.document_id, c.id;
+            """, [*document_ids, limit_per_document]).fetchall()
+
+        out: dict[int, list[ClaimData]] = {}
+        for row, claim in zip(rows, self._claim_data(rows)):
+            out.setdefault(row["document_id"], []).append(claim)
+        return out
+
+
+    def load_shortest_path(self,
+        source_name: str,
+        target_name: str,
+        max_depth: int = 4,
+        min_strength: Optional[float] = None,
+        directed: Optional[bool] = None
+    ) -> Optional[Subgraph]:
+        """
+        Shortest path between two entities (aliases collapsed), at most `max_depth` hops.
+        `min_strength` and `directed` are as in load_neighborhood().
+        Returns the path as a Subgraph (nodes and edges in path order), or None if
+        the target is not reachable within `max_depth` hops.
+        """
+        with self._conn() as con:
+            source_id = self._expand_ids(con, source_name)[0]
+            target_id = self._expand_ids(con, target_name)[0]
+            self._walk(con, [source_id], max_depth, min_strength, directed, None)
+
+            row = con.execute("SELECT depth FROM _walk_nodes WHERE id = ?;", (target_id,)).fetchone()
+            if row is None:
+                return None
+
+            # walk back from the target, one hop closer to the source each step
+            path = [target_id]
+            for d in range(row[0] - 1, -1, -1):
+                path.append(self._walk_predecessor(con, path[-1], d, min_strength, directed))
+            path.reverse()
+
+            con.execute("DELETE FROM _walk_nodes;")
+            con.executemany(
+                "INSERT INTO _walk_nodes (id, depth) VALUES (?, ?);",
+                [(node_id, d) for d, node_id in enumerate(path)]
+            )
+            subgraph = self._load_walk_subgraph(con, min_strength, directed)
+
+        names = [node.name for node in subgraph.nodes] # ordered by depth == path position
+        hops = set(zip(names, names[1:]))
+        subgraph.edges = [
+            e for e in subgraph.edges
+            if (e.source_name, e.target_name) in hops
+            or (directed is not True and (e.target_name, e.source_name) in hops)
+        ]
+        subgraph.edges.sort(key=lambda e: min(
+            names.index(e.source_name), names.index(e.target_name)
+        ))
+        return subgraph
+
+
+    def snapshot(self) -> GraphSnapshot:
+        """
+        Load the whole graph into an immutable GraphSnapshot (alias-collapsed CSR)
+        with three bulk SELECTs. Persist it with GraphSnapshot.save().
+        """
+        with self._conn() as con:
+            cur = con.cursor()
+            cur.row_factory = None # plain tuples: much cheaper than sqlite3.Row in bulk
+            entity_rows = cur.execute("SELECT id, name, entity_type FROM entities ORDER BY id;").fetchall()
+            alias_rows = cur.execute("""
+                SELECT e.id, a.entity_id
+                FROM aliases a
+                JOIN entities e ON e.name = a.alias;
+            """).fetchall()
+            rel_rows = cur.execute("SELECT source_id, target_id, strength, directed FROM relationships;").fetchall()
+
+        all_ids = np.array([row[0] for row in entity_rows], dtype=np.int64)
+        canonical = all_ids.copy() # entity id -> canonical entity id, aligned with all_ids
+        if alias_rows:
+            alias_ids = np.array(alias_rows, dtype=np.int64)
+            canonical[np.searchsorted(all_ids, alias_ids[:, 0])] = alias_ids[:, 1]
+        is_node = canonical == all_ids
+
+        node_ids = all_ids[is_node]
+        names = np.array([row[1] for row, keep in zip(entity_rows, is_node) if keep], dtype=str)
+        entity_types = np.array(
+            [row[2] or "" for row, keep in zip(entity_rows, is_node) if keep], dtype=str
+        )
+
+        def positions(entity_ids: np.ndarray) -> np.ndarray:
+            return np.searchsorted(node_ids, canonical[np.searchsorted(all_ids, entity_ids)])
+
+        rels = np.array(
+            [(row[0], row[1], row[3]) for row in rel_rows], dtype=np.int64
+        ).reshape(-1, 3)
+        strength = np.array(
+            [np.nan if row[2] is None else row[2] for row in rel_rows], dtype=np.float32
+        )
+        return GraphSnapshot.from_edges(
+            node_ids, names, entity_types,
+            src=positions(rels[:, 0]),
+            dst=positions(rels[:, 1]),
+            strength=strength,
+            directed=rels[:, 2].astype(bool),
+        )
+
+
+    def search_claims(self,
+        text: str,
+        limit: int = 10,
+        entity: Optional[str] = None,
+        date_range: Optional[tuple[str, str]] = None
+    ) -> list[ClaimData]:
+        """
+        Keyword search over claim content and attached entity names (FTS5, BM25-ranked).
+
+        Args:
+            text: Free text; every word must match (porter-stemmed, case-insensitive).
+            limit: Maximum number of claims to return.
+            entity: Only claims on this entity or its relationships (alias-expanded).
+            date_range: Only claims with date_added BETWEEN (start, end), as in delete_claim().
+        Returns:
+            ClaimData, best match first.
+        """
+        query = self._fts_query(text)
+        if query is None:
+            return []
+
+        with self._conn() as con:
+            clauses, params = ["claims_fts MATCH ?"], [query]
+            if entity is not None:
+                ids = self._expand_ids(con, entity)
+                ps = ",".join("?" * len(ids))
+                clauses.append(f"""(
+                    c.entity_id IN ({ps}) OR c.relationship_id IN (
+                        SELECT id FROM relationships WHERE source_id IN ({ps})
+                        UNION ALL
+                        SELECT id FROM relationships WHERE target_id IN ({ps})
+                    )
+                )""")
+                params.extend(ids * 3)
+            if date_range is not None:
+                clauses.append("c.date_added BETWEEN ? AND ?")
+                params.extend(date_range)
+            params.append(limit)
+
+            rows = con.execute(f"""
+                SELECT {self._CLAIM_COLUMNS}
+                FROM claims_fts f
+                JOIN claims c ON c.id = f.rowid
+                {self._CLAIM_JOINS}
+                WHERE {" AND ".join(clauses)}
+                ORDER BY f.rank
+                LIMIT ?;
+            """, params).fetchall()
+
+        return self._claim_data(rows)
+
+
+    def list_unembedded(self,
+        kind: Literal["entity", "claim"],
+        limit: Optional[int] = None
+    ) -> list[tuple[int, str]]:
+        """
+        Rows without a vector yet, oldest first, as (row id, text).
+        Text is the entity name or the claim content. Read from the
+        vector_pending queue (filled by triggers), so the cost is O(rows
+        returned), not O(table). See GraphVectorIndex.sync().
+        """
+        _, _, parent, text = self._vector_table(kind)
+        with self._conn() as con:
+            rows = con.execute(f"""
+                SELECT p.id, p.{text}
+                FROM vector_pending q
+                JOIN {parent} p ON p.id = q.row_id
+                WHERE q.kind = ?
+                ORDER BY q.row_id
+                {"LIMIT ?" if limit is not None else ""};
+            """, (kind,) if limit is None else (kind, limit)).fetchall()
+        return [(row[0], row[1]) for row in rows]
+
+
+    def link_vectors(self, kind: Literal["entity", "claim"], pairs: list[tuple[int, int]]) -> None:
+        """Record (vector_id, row id) pairs for entity or claim vectors (the rows leave vector_pending)."""
+        table, column, _, _ = self._vector_table(kind)
+        with self._conn() as con:
+            con.executemany(
+                f"INSERT OR REPLACE INTO {table} (vector_id, {column}) VALUES (?, ?);", pairs
+            )
+            con.executemany(
+                "DELETE FROM vector_pending WHERE kind = ? AND row_id = ?;", [(kind, row_id) for _, row_id in pairs]
+            )
+
+
+    def list_orphan_vectors(self, kind: Literal["entity", "claim"]) -> list[int]:
+        """Vector ids whose row was deleted or changed; see GraphVectorIndex.sync()."""
+        self._vector_table(kind)
+        with self._conn() as con:
+            rows = con.execute(
+                "SELECT vector_id FROM vector_orphans WHERE kind = ? ORDER BY vector_id;", (kind,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+    def clear_orphan_vectors(self, kind: Literal["entity", "claim"], vector_ids: list[int]) -> None:
+        """Forget orphaned vector ids once they are removed from the FAISS index."""
+        with self._conn() as con:
+            con.executemany(
+                "DELETE FROM vector_orphans WHERE kind = ? AND vector_id = ?;", [(kind, i) for i in vector_ids]
+            )
+
+
+    def resolve_entity_vectors(self, vector_ids: list[int]) -> dict[int, str]:
+        """Map entity vector ids to canonical entity names; stale ids are left out."""
+        if not vector_ids:
+            return {}
+        with self._conn() as con:
+            ps = ",".join("?" * len(vector_ids))
+            rows = con.execute(f"""
+                SELECT v.vector_id, e.name
+                FROM entity_vectors v
+                JOIN entities e ON e.id = v.entity_id
+                WHERE v.vector_id IN ({ps});
+            """, vector_ids).fetchall()
+        canonical = self.resolve_aliases(row[1] for row in rows)
+        return {row[0]: canonical[row[1]] for row in rows}
+
+
+    def resolve_claim_vectors(self, vector_ids: list[int]) -> dict[int, ClaimData]:
+        """Map claim vector ids to ClaimData; stale ids are left out."""
+        if not vector_ids:
+            return {}
+        with self._conn() as con:
+            ps = ",".join("?" * len(vector_ids))
+            rows = con.execute(f"""
+                SELECT v.vector_id, {self._CLAIM_COLUMNS}
+                FROM claim_vectors v
+                JOIN claims c ON c.id = v.claim_id
+                {self._CLAIM_JOINS}
+                WHERE v.vector_id IN ({ps});
+            """, vector_ids).fetchall()
+        return dict(zip((row["vector_id"] for row in rows), self._claim_data(rows)))
+
+
     def merge_alias(self, canonical_name: str, alias_name: str):
         """
         Physically merge an alias entity into its canonical entity.
@@ -531,7 +1126,8 @@ class GraphIndex:
         - Claims from both are consolidated
         - Alias entity is deleted (alias mapping remains)
         """
-        with self._conn() as con:
+        with self.transaction() as con:
+            self._sync_alias_cache()
             canonical_row = con.execute(
                 "SELECT id FROM entities WHERE name = ?;", (canonical_name,)
             ).fetchone()
@@ -622,6 +1218,8 @@ class GraphIndex:
             
             # delete alias entity (alias mapping remains in aliases table!)
             con.execute("DELETE FROM entities WHERE id = ?;", (alias_id,))
+            self._cache_drop_entity(alias_id)
+            self._cache_commit_generation(con)
             
             log.info("Successfully merged %s into %s", alias_name, canonical_name)
 
@@ -686,7 +1284,8 @@ class GraphIndex:
             )
             raise DeletionConflict(name, "entities", message=msg)
         
-        with self._conn() as con:
+        with self.transaction() as con:
+            self._sync_alias_cache()
             row = con.execute(
                 "SELECT id FROM entities WHERE name = ?;", (canonical,)
             ).fetchone()
@@ -755,6 +1354,10 @@ class GraphIndex:
             con.execute("DELETE FROM claims WHERE entity_id = ?;", (canonical_id,))
             con.execute("DELETE FROM aliases WHERE entity_id = ?;", (canonical_id,))
             con.execute("DELETE FROM entities WHERE id = ?;", (canonical_id,))
+            for alias in self._cached_aliases_of(canonical_id):
+                self._cache_set_alias(alias, None)
+            self._cache_drop_entity(canonical_id)
+            self._cache_commit_generation(con)
 
 
     def delete_relationship(self,
@@ -832,7 +1435,8 @@ class GraphIndex:
             msg = (f"Cannot delete alias: '{entity_name}' is an alias of '{canonical}'.")
             raise DeletionConflict(alias, "aliases", message=msg)
 
-        with self._conn() as con:
+        with self.transaction() as con:
+            self._sync_alias_cache()
             ent_row = con.execute(
                 "SELECT id FROM entities WHERE name = ?;", (entity_name,)
             ).fetchone()
@@ -856,6 +1460,8 @@ class GraphIndex:
                     message=f"'{alias}' is mapped to '{other_name}', not '{entity_name}'.")
             
             con.execute("DELETE FROM aliases WHERE id = ?;", (mapping[1],))
+            self._cache_set_alias(alias, None)
+            self._cache_commit_generation(con)
 
 
     def delete_claim(self,
@@ -928,8 +1534,9 @@ class GraphIndex:
                 params.extend(date_range)
 
             elif mode == "by_content" and content:
-                clauses.append("content = ?")
-                params.append(content)
+                clause = self._content_clause(content)
+                clauses.append(clause[0])
+                params.extend(clause[1])
 
             elif mode == "exact":
                 if entity_name: # entity filter (conservative)
@@ -951,8 +1558,9 @@ class GraphIndex:
                     clauses.append(f"relationship_id IN ({placeholders})")
                     params.extend(rel_ids)
                 if content:
-                    clauses.append("content = ?")
-                    params.append(content)
+                    clause = self._content_clause(content)
+                    clauses.append(clause[0])
+                    params.extend(clause[1])
                 if source:
                     clauses.append("source = ?")
                     params.append(source)
@@ -1035,21 +1643,268 @@ class GraphIndex:
     def _expand_ids(self, con, name: str) -> list[int]:
         """Return [canonical_id] plus ids of any alias-entities for this name."""
         canonical = self.resolve_alias(name)
-        row = con.execute("SELECT id FROM entities WHERE name = ?;", (canonical,)).fetchone()
-        if not row:
+        canonical_id = self._entity_id(con, canonical)
+        if canonical_id is None:
             raise EntityNotFoundError(canonical)
-        ids = [row[0]]
-
-        alias_rows = con.execute(
-            "SELECT alias FROM aliases WHERE entity_id = ?;", (row[0],)
-        ).fetchall()
-        for alias_row in alias_rows:
-            alias_entity = con.execute(
-                "SELECT id FROM entities WHERE name = ?;", (alias_row[0],)
-            ).fetchone()
-            if alias_entity:
-                ids.append(alias_entity[0])
+        ids = [canonical_id]
+
+        for alias in self._cached_aliases_of(canonical_id):
+            alias_id = self._entity_id(con, alias)
+            if alias_id is not None:
+                ids.append(alias_id)
         return ids
+
+
+    # --- alias cache ---
+
+    def _sync_alias_cache(self) -> None:
+        """
+        Make sure the alias cache reflects the database.
+
+        PRAGMA data_version is per-connection and costs no I/O; it only moves when
+        another connection (thread or process) commits. Only then is the
+        alias_generation counter read, and the cache reloaded if it moved.
+        Writes made through this instance are applied write-through once they
+        commit; until then only the writing thread sees them (_pending_cache).
+        """
+        with self._conn() as con:
+            if self._pool.in_transaction(): # may see uncommitted rows: reload privately
+                pending = self._pending_cache()
+                if pending.base is not None:
+                    return # loaded in this transaction; nobody else can commit while it is open
+                generation = self._alias_generation(con)
+                known = pending.generation if pending.generation is not None else self._cache_generation
+                if pending.stale or not self._cache_loaded or generation != known:
+                    self._load_alias_cache(con, generation)
+                return
+            version = con.execute("PRAGMA data_version;").fetchone()[0]
+            if self._cache_loaded and self._cache_versions.get(id(con)) == version:
+                return
+            with self._cache_lock:
+                generation = self._alias_generation(con)
+                if not self._cache_loaded or generation != self._cache_generation:
+                    self._load_alias_cache(con, generation)
+                self._cache_versions[id(con)] = version
+
+
+    def _load_alias_cache(self, con, generation: int) -> None:
+        """
+        Helper: (re)load the whole alias table and entity name<->id maps.
+        The generation must be read *before* the tables, so a concurrent write
+        can only ever cause a spurious reload, never a stale cache.
+        Inside a transaction the maps become this thread's pending base instead.
+        """
+        entity_ids = {row[0]: row[1] for row in con.execute("SELECT name, id FROM entities;")}
+        alias_ids: dict[str, int] = {}
+        aliases_of: dict[int, list[str]] = {}
+        for row in con.execute("SELECT alias, entity_id FROM aliases ORDER BY id;"):
+            alias_ids[row[0]] = row[1]
+            aliases_of.setdefault(row[1], []).append(row[0])
+        entity_names = {entity_id: name for name, entity_id in entity_ids.items()}
+
+        if self._pool.in_transaction():
+            pending = self._pending_cache()
+            self._reset_pending_cache(pending) # the reload already includes them
+            pending.base = (alias_ids, aliases_of, entity_ids, entity_names)
+            pending.generation = generation
+            return
+        with self._cache_lock:
+            self._entity_ids = entity_ids
+            self._entity_names = entity_names
+            self._alias_ids = alias_ids
+            self._aliases_of = aliases_of
+            self._cache_generation = generation
+            self._cache_versions.clear()
+            self._cache_loaded = True
+
+
+    def _alias_generation(self, con) -> int:
+        return con.execute("SELECT value FROM alias_generation WHERE id = 0;").fetchone()[0]
+
+
+    def _invalidate_alias_cache(self) -> None:
+        """Drop the cache; the next _sync_alias_cache() reloads it."""
+        self._cache_loaded = False
+
+
+    # pending (uncommitted) cache changes, per thread
+
+    def _pending_cache(self) -> threading.local:
+        """
+        This thread's uncommitted cache changes: overlays alias_ids / entity_ids /
+        entity_names (None: removed), a base (maps reloaded inside the transaction)
+        and the generation it will commit.
+        """
+        pending = self._pending
+        if not hasattr(pending, "alias_ids"):
+            self._reset_pending_cache(pending)
+        return pending
+
+
+    @staticmethod
+    def _reset_pending_cache(pending: threading.local) -> None:
+        pending.alias_ids = {}
+        pending.entity_ids = {}
+        pending.entity_names = {}
+        pending.base = None
+        pending.generation = None
+        pending.stale = False # a savepoint rolled back part of the overlays
+
+
+    def _has_pending_cache(self) -> bool:
+        pending = self._pending_cache()
+        return bool(pending.base is not None or pending.alias_ids or pending.entity_ids or pending.entity_names)
+
+
+    def _publish_pending_cache(self) -> None:
+        """Pool commit hook: this thread's transaction committed; apply its cache changes."""
+        pending = self._pending_cache()
+        if pending.stale and pending.base is None:
+            self._reset_pending_cache(pending)
+            self._invalidate_alias_cache()
+            return
+        if not self._has_pending_cache() and pending.generation is None:
+            return
+        with self._cache_lock:
+            if pending.base is not None:
+                self._alias_ids, self._aliases_of, self._entity_ids, self._entity_names = pending.base
+                self._cache_versions.clear()
+                self._cache_loaded = True
+            for entity_id, name in pending.entity_names.items():
+                if name is None:
+                    self._entity_names.pop(entity_id, None)
+                else:
+                    self._entity_names[entity_id] = name
+            for name, entity_id in pending.entity_ids.items():
+                if entity_id is None:
+                    self._entity_ids.pop(name, None)
+                else:
+                    self._entity_ids[name] = entity_id
+            for alias, entity_id in pending.alias_ids.items():
+                self._set_alias(self._alias_ids, self._aliases_of, alias, entity_id)
+            if pending.generation is not None:
+                self._cache_generation = pending.generation
+        self._reset_pending_cache(pending)
+
+
+    def _drop_pending_cache(self) -> None:
+        """Pool rollback hook: forget this thread's uncommitted cache changes."""
+        pending = self._pending_cache()
+        self._reset_pending_cache(pending)
+        if self._pool.in_transaction(): # a savepoint: the transaction goes on without part of them
+            pending.stale = True
+
+
+    # cache reads (this thread's pending changes first) and write-through
+
+    def _view(self) -> tuple[dict, dict, dict, dict]:
+        """(alias_ids, aliases_of, entity_ids, entity_names) under this thread's overlays."""
+        base = self._pending_cache().base
+        if base is not None:
+            return base
+        return self._alias_ids, self._aliases_of, self._entity_ids, self._entity_names
+
+
+    def _resolve_cached(self, name: str) -> str:
+        pending = self._pending_cache()
+        entity_id = pending.alias_ids[name] if name in pending.alias_ids else self._view()[0].get(name)
+        if entity_id is None:
+            return name # not an alias (entity or not-yet-entity)
+        return self._cached_entity_name(entity_id) or name
+
+
+    def _cached_entity_name(self, entity_id: int) -> Optional[str]:
+        pending = self._pending_cache()
+        if entity_id in pending.entity_names:
+            return pending.entity_names[entity_id]
+        return self._view()[3].get(entity_id)
+
+
+    def _cached_entity_id(self, name: str) -> Optional[int]:
+        pending = self._pending_cache()
+        if name in pending.entity_ids:
+            return pending.entity_ids[name]
+        return self._view()[2].get(name)
+
+
+    def _cached_aliases_of(self, entity_id: int) -> list[str]:
+        pending = self._pending_cache()
+        aliases = [a for a in self._view()[1].get(entity_id, ()) if pending.alias_ids.get(a, entity_id) == entity_id]
+        aliases += [a for a, e in pending.alias_ids.items() if e == entity_id and a not in aliases]
+        return aliases
+
+
+    def _entity_id(self, con, name: str) -> Optional[int]:
+        """Helper: entity id by exact name (cache first, then DB)."""
+        entity_id = self._cached_entity_id(name)
+        if entity_id is not None:
+            return entity_id
+        row = con.execute("SELECT id FROM entities WHERE name = ?;", (name,)).fetchone()
+        if row is None:
+            return None
+        self._cache_entity(name, row[0])
+        return row[0]
+
+
+    def _cache_entity(self, name: str, entity_id: int) -> None:
+        """Write-through: entity inserted (or looked up)."""
+        if self._pool.in_transaction():
+            pending = self._pending_cache()
+            pending.entity_ids[name] = entity_id
+            pending.entity_names[entity_id] = name
+            return
+        with self._cache_lock:
+            self._entity_ids[name] = entity_id
+            self._entity_names[entity_id] = name
+
+
+    def _cache_drop_entity(self, entity_id: int) -> None:
+        """Write-through: entity row deleted (alias mappings are handled separately)."""
+        if self._pool.in_transaction():
+            pending = self._pending_cache()
+            name = self._cached_entity_name(entity_id)
+            pending.entity_names[entity_id] = None
+            if name is not None and self._cached_entity_id(name) == entity_id:
+                pending.entity_ids[name] = None
+            return
+        with self._cache_lock:
+            name = self._entity_names.pop(entity_id, None)
+            if name is not None and self._entity_ids.get(name) == entity_id:
+                del self._entity_ids[name]
+
+
+    def _cache_set_alias(self, alias: str, entity_id: Optional[int]) -> None:
+        """Write-through: map alias -> entity_id, or unmap it when entity_id is None."""
+        if self._pool.in_transaction():
+            self._pending_cache().alias_ids[alias] = entity_id
+            return
+        with self._cache_lock:
+            self._set_alias(self._alias_ids, self._aliases_of, alias, entity_id)
+
+
+    @staticmethod
+    def _set_alias(alias_ids: dict, aliases_of: dict, alias: str, entity_id: Optional[int]) -> None:
+        previous = alias_ids.pop(alias, None)
+        if previous is not None:
+            aliases_of[previous].remove(alias)
+            if not aliases_of[previous]:
+                del aliases_of[previous]
+        if entity_id is not None:
+            alias_ids[alias] = entity_id
+            aliases_of.setdefault(entity_id, []).append(alias)
+
+
+    def _cache_commit_generation(self, con) -> None:
+        """
+        Write-through done: adopt the post-write generation (at commit). Callers hold
+        the write lock and synced the cache when taking it, so no foreign write hides here.
+        """
+        generation = self._alias_generation(con)
+        if self._pool.in_transaction():
+            self._pending_cache().generation = generation
+            return
+        with self._cache_lock:
+            self._cache_generation = generation
     
 
     def _relationship_ids_alias_expanded(self,
@@ -1095,57 +1950,396 @@ class GraphIndex:
         return [r[0] for r in rows]
 
 
+    # --- claim rows ---
+
+    # claim columns + the names of its entity / relationship endpoints (use with _CLAIM_JOINS)
+    _CLAIM_COLUMNS = """
+        c.content, c.source, c.date_added, c.source_date, c.claim_date,
+        e.name AS entity_name, es.name AS source_name, et.name AS target_name
+    """
+    _CLAIM_JOINS = """
+        LEFT JOIN entities e ON e.id = c.entity_id
+        LEFT JOIN relationships r ON r.id = c.relationship_id
+        LEFT JOIN entities es ON es.id = r.source_id
+        LEFT JOIN entities et ON et.id = r.target_id
+    """
+
+
+    def _claim_data(self, rows: list[sqlite3.Row]) -> list[ClaimData]:
+        """Helper: rows selected with _CLAIM_COLUMNS -> ClaimData with canonical entity names."""
+        def names(row):
+            return [n for n in (row["entity_name"], row["source_name"], row["target_name"]) if n is not None]
+
+        canonical = self.resolve_aliases(name for row in rows for name in names(row))
+        return [
+            ClaimData(
+                content=row["content"],
+                source=row["source"],
+                date_added=row["date_added"],
+                source_date=row["source_date"],
+                claim_date=row["claim_date"],
+                entities=[canonical[name] for name in names(row)]
+            )
+            for row in rows
+        ]
+
+
+    @staticmethod
+    def _vector_table(kind: str) -> tuple[str, str, str, str]:
+        """Helper: (map table, row id column, row table, text column) for a vector kind."""
+        if kind == "entity":
+            return "entity_vectors", "entity_id", "entities", "name"
+        if kind == "claim":
+            return "claim_vectors", "claim_id", "claims", "content"
+        raise ValueError(f"Unknown vector kind: {kind}")
+
+
+    # --- full-text ---
+
+    @staticmethod
+    def _claim_entities_sql(row: str) -> str:
+        """SQL expression: names of the entity, or both relationship endpoints, of claim `row`."""
+        return f"""COALESCE(
+            (SELECT e.name FROM entities e WHERE e.id = {row}.entity_id),
+            (SELECT es.name || char(10) || et.name
+             FROM relationships r
+             JOIN entities es ON es.id = r.source_id
+             JOIN entities et ON et.id = r.target_id
+             WHERE r.id = {row}.relationship_id),
+            ''
+        )"""
+
+
+    @staticmethod
+    def _fts_query(text: str, column: Optional[str] = None) -> Optional[str]:
+        """
+        Helper: free text -> FTS5 query matching every word (quoted, so FTS5
+        operators in user text are taken literally). None if there are no words.
+        """
+        words = re.findall(r"\w+", text)
+        if not words:
+            return None
+        query = " ".join(f'"{w}"' for w in words)
+        return f"{column} : ({query})" if column else query
+
+
+    def _content_clause(self, content: str) -> tuple[str, list]:
+        """
+        Helper: WHERE clause for claims with exactly this content. Narrowed
+        through claims_fts, so it is an index lookup rather than a table scan.
+        """
+        query = self._fts_query(content, column="content")
+        if query is None:
+            return ("content = ?", [content])
+        return (
+            "id IN (SELECT rowid FROM claims_fts WHERE claims_fts MATCH ?) AND content = ?",
+            [query, content]
+        )
+
+
+    # --- traversal ---
+
+    @staticmethod
+    def _canonical_sql(col: str) -> str:
+        """SQL expression: canonical entity id for the entity id in `col`."""
+        return f"""COALESCE((
+            SELECT a.entity_id FROM entities e JOIN aliases a ON a.alias = e.name WHERE e.id = {col}
+        ), {col})"""
+
+
+    @staticmethod
+    def _members_sql(col: str) -> str:
+        """SQL subquery: the canonical id in `col` plus the ids of its alias-entities."""
+        return f"""
+            SELECT {col} UNION ALL
+            SELECT e.id FROM aliases a JOIN entities e ON e.name = a.alias WHERE a.entity_id = {col}
+        """
+
+
+    def _walk_steps(self,
+        min_strength: Optional[float],
+        directed: Optional[bool]
+    ) -> list[tuple[str, str, str, list]]:
+        """
+        Helper: the ways a traversal may cross a relationship row, as
+        (from_column, to_column, extra WHERE sql, params).
+        """
+        conds, params = [], []
+        if min_strength is not None:
+            conds.append("r.strength >= ?")
+            params.append(min_strength)
+        if directed is not None:
+            conds.append("r.directed = ?")
+            params.append(int(bool(directed)))
+        where = "".join(f" AND {c}" for c in conds)
+
+        steps = [("source_id", "target_id", where, params)]
+        if directed is not True:
+            steps.append(("target_id", "source_id", where, params))
+        return steps
+
+
+    def _walk(self,
+        con,
+        seed_ids: list[int],
+        depth: int,
+        min_strength: Optional[float],
+        directed: Optional[bool],
+        limit: Optional[int]
+    ) -> None:
+        """
+        Helper: breadth-first walk from canonical entity ids as one WITH RECURSIVE
+        query; fills the temp table _walk_nodes with (canonical id, min hops).
+        """
+        selects, params = [], list(seed_ids)
+        for from_col, to_col, where, step_params in self._walk_steps(min_strength, directed):
+            selects.append(f"""
+                SELECT {self._canonical_sql(f"r.{to_col}")}, w.depth + 1
+                FROM walk w
+                JOIN relationships r ON r.{from_col} IN ({self._members_sql("w.id")})
+                WHERE w.depth < ?{where}
+            """)
+            params.extend([depth, *step_params])
+        if limit is not None:
+            params.append(limit)
+
+        con.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS _walk_nodes (
+                id INTEGER PRIMARY KEY,
+                depth INTEGER NOT NULL
+            );
+        """)
+        con.execute("DELETE FROM _walk_nodes;")
+        con.execute(f"""
+            WITH RECURSIVE walk(id, depth) AS (
+                SELECT column1, 0 FROM (VALUES {",".join(["(?)"] * len(seed_ids))})
+                {"".join("UNION " + sql for sql in selects)}
+            )
+            INSERT INTO _walk_nodes (id, depth)
+            SELECT id, MIN(depth) FROM walk
+            GROUP BY id
+            ORDER BY MIN(depth), id
+            {"LIMIT ?" if limit is not None else ""};
+        """, params)
+
+
+    def _walk_predecessor(self,
+        con,
+        node_id: int,
+        depth: int,
+        min_strength: Optional[float],
+        directed: Optional[bool]
+    ) -> int:
+        """Helper: a node in _walk_nodes at `depth` with a traversable edge into node_id."""
+        selects, params = [], []
+        for from_col, to_col, where, step_params in self._walk_steps(min_strength, directed):
+            selects.append(f"""
+                SELECT {self._canonical_sql(f"r.{from_col}")} AS id
+                FROM relationships r
+                WHERE r.{to_col} IN ({self._members_sql("?")}){where}
+            """)
+            params.extend([node_id, node_id, *step_params])
+        row = con.execute(f"""
+            SELECT n.id FROM _walk_nodes n
+            WHERE n.depth = ? AND n.id IN ({" UNION ".join(selects)})
+            ORDER BY n.id LIMIT 1;
+        """, [depth, *params]).fetchone()
+        return row[0]
+
+
+    def _load_walk_subgraph(self,
+        con,
+        min_strength: Optional[float],
+        directed: Optional[bool]
+    ) -> Subgraph:
+        """
+        Helper: Subgraph of the nodes in _walk_nodes and the matching edges between
+        them. Alias-entities are folded into their canonical node; claim counts
+        cover the whole alias family.
+        """
+        con.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS _walk_members (
+                eid INTEGER PRIMARY KEY,
+                cid INTEGER NOT NULL
+            );
+        """)
+        con.execute("DELETE FROM _walk_members;")
+        con.execute("""
+            INSERT OR IGNORE INTO _walk_members (eid, cid)
+            SELECT id, id FROM _walk_nodes
+            UNION ALL
+            SELECT e.id, n.id
+            FROM _walk_nodes n
+            JOIN aliases a ON a.entity_id = n.id
+            JOIN entities e ON e.name = a.alias;
+        """)
+
+        # (CROSS JOIN pins the walk tables as the outer loop)
+        node_rows = con.execute("""
+            SELECT n.id, e.name, e.entity_type, n.depth, COALESCE(cc.claim_count, 0) AS claim_count
+            FROM _walk_nodes n
+            CROSS JOIN entities e ON e.id = n.id
+            LEFT JOIN (
+                SELECT m.cid, COUNT(*) AS claim_count
+                FROM _walk_members m
+                CROSS JOIN claims c ON c.entity_id = m.eid
+                GROUP BY m.cid
+            ) cc ON cc.cid = n.id
+            ORDER BY n.depth, e.name;
+        """).fetchall()
+
+        conds, params = [], []
+        if min_strength is not None:
+            conds.append("r.strength >= ?")
+            params.append(min_strength)
+        if directed is not None:
+            conds.append("r.directed = ?")
+            params.append(int(bool(directed)))
+
+        # undirected edges are keyed on the unordered pair, as in load_relationships()
+        edge_rows = con.execute(f"""
+            SELECT
+                CASE WHEN r.directed = 1 OR ms.cid < mt.cid THEN ms.cid ELSE mt.cid END AS s,
+                CASE WHEN r.directed = 1 OR ms.cid < mt.cid THEN mt.cid ELSE ms.cid END AS t,
+                r.directed,
+                MAX(r.strength) AS strength,
+                SUM((SELECT COUNT(*) FROM claims c WHERE c.relationship_id = r.id)) AS claim_count
+            FROM _walk_members ms
+            CROSS JOIN relationships r ON r.source_id = ms.eid
+            CROSS JOIN _walk_members mt ON mt.eid = r.target_id
+            WHERE ms.cid <> mt.cid{"".join(f" AND {c}" for c in conds)}
+            GROUP BY s, t, r.directed
+            ORDER BY s, t, r.directed;
+        """, params).fetchall()
+
+        names = {row["id"]: row["name"] for row in node_rows}
+        return Subgraph(
+            nodes=[
+                SubgraphNode(
+                    name=row["name"],
+                    entity_type=row["entity_type"],
+                    depth=row["depth"],
+                    claim_count=row["claim_count"],
+                )
+                for row in node_rows
+            ],
+            edges=[
+                SubgraphEdge(
+                    source_name=names[row["s"]],
+                    target_name=names[row["t"]],
+                    strength=row["strength"],
+                    directed=bool(row["directed"]),
+                    claim_count=row["claim_count"],
+                )
+                for row in edge_rows
+            ],
+        )
+
+
+    def _upsert_entities_staged(self,
+        con,
+        entities: list[tuple[str, Optional[str]]]
+    ) -> dict[str, int]:
+        """Helper: stage (name, entity_type) rows and upsert them with one INSERT ... SELECT."""
+        if not entities:
+            return {}
+        con.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS _stage_entities (
+                seq INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                entity_type TEXT
+            );
+        """)
+        con.execute("DELETE FROM _stage_entities;")
+        con.executemany("INSERT INTO _stage_entities (name, entity_type) VALUES (?, ?);", entities)
+        # (WHERE true disambiguates the upsert clause from a join constraint)
+        con.execute("""
+            INSERT INTO entities (name, entity_type, date_added)
+            SELECT name, entity_type, CURRENT_TIMESTAMP
+            FROM _stage_entities WHERE true ORDER BY seq
+            ON CONFLICT(name)
+            DO UPDATE SET entity_type = COALESCE(excluded.entity_type, entities.entity_type);
+        """)
+        rows = con.execute("""
+            SELECT DISTINCT s.name, e.id
+            FROM _stage_entities s
+            JOIN entities e ON e.name = s.name;
+        """).fetchall()
+        ids = {row[0]: row[1] for row in rows}
+        with self._cache_lock:
+            for name, entity_id in ids.items():
+                self._cache_entity(name, entity_id)
+        return ids
+
+
+    def _upsert_relationships_staged(self,
+        con,
+        relationships: list[RelationshipRecord]
+    ) -> list[Optional[int]]:
+        """Helper: alias-resolve, normalize and upsert relationships as one staged batch."""
+        if not relationships:
+            return []
+        canonical = self.resolve_aliases(
+            n for r in relationships for n in (r.source_name, r.target_name)
+        )
+        entity_ids = self._upsert_entities_staged(
+            con, [(name, None) for name in dict.fromkeys(canonical.values())]
+        )
+
+        staged = []
+        for seq, r in enumerate(relationships):
+            source_canonical = canonical[r.source_name]
+            target_canonical = canonical[r.target_name]
+            if source_canonical == target_canonical:
+                continue
+            source_id, target_id, directed = self._normalize_pair(
+                entity_ids[source_canonical], entity_ids[target_canonical], r.directed
+            )
+            staged.append((seq, source_id, target_id, r.strength, directed))
+
+        con.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS _stage_relationships (
+                seq INTEGER PRIMARY KEY,
+                source_id INTEGER NOT NULL,
+                target_id INTEGER NOT NULL,
+                strength REAL,
+                directed INTEGER NOT NULL
+            );
+        """)
+        con.execute("DELETE FROM _stage_relationships;")
+        con.executemany("""
+            INSERT INTO _stage_relationships (seq, source_id, target_id, strength, directed)
+            VALUES (?, ?, ?, ?, ?);
+        """, staged)
+        con.execute("""
+            INSERT INTO relationships (source_id, target_id, strength, directed, date_added)
+            SELECT source_id, target_id, strength, directed, CURRENT_TIMESTAMP
+            FROM _stage_relationships WHERE true ORDER BY seq
+            ON CONFLICT(source_id, target_id, directed)
+            DO UPDATE SET strength = excluded.strength;
+        """)
+        rows = con.execute("""
+            SELECT s.seq, r.id
+            FROM _stage_relationships s
+            JOIN relationships r
+              ON r.source_id = s.source_id AND r.target_id = s.target_id AND r.directed = s.directed;
+        """).fetchall()
+
+        ids: list[Optional[int]] = [None] * len(relationships)
+        for row in rows:
+            ids[row[0]] = row[1]
+        return ids
+
+
     def _has_relationship_between(self, entity1_name: str, entity2_name: str) -> bool:
         """Check if any relationship exists between two entities (considering aliases)."""
         with self._conn() as con:
-            entity1_canonical = self.resolve_alias(entity1_name)
-            entity1_row = con.execute(
-                "SELECT id FROM entities WHERE name = ?;",
-                (entity1_canonical,)
-            ).fetchone()
-            
-            if not entity1_row:
-                return False
-            
-            entity1_ids = [entity1_row[0]]
-            
-            alias_rows = con.execute(
-                "SELECT alias FROM aliases WHERE entity_id = ?;",
-                (entity1_row[0],)
-            ).fetchall() # add alias entity IDs for entity1
-            
-            for alias_row in alias_rows:
-                alias_entity = con.execute(
-                    "SELECT id FROM entities WHERE name = ?;",
-                    (alias_row[0],)
-                ).fetchone()
-                if alias_entity:
-                    entity1_ids.append(alias_entity[0])
-            
-            entity2_canonical = self.resolve_alias(entity2_name)
-            entity2_row = con.execute(
-                "SELECT id FROM entities WHERE name = ?;",
-                (entity2_canonical,)
-            ).fetchone() # get all entity IDs for entity2
-            
-            if not entity2_row:
+            try:
+                entity1_ids = self._expand_ids(con, entity1_name)
+                entity2_ids = self._expand_ids(con, entity2_name)
+            except EntityNotFoundError:
                 return False
             
-            entity2_ids = [entity2_row[0]]
-            
-            alias_rows = con.execute(
-                "SELECT alias FROM aliases WHERE entity_id = ?;",
-                (entity2_row[0],)
-            ).fetchall() # add alias entity IDs for entity2
-            
-            for alias_row in alias_rows:
-                alias_entity = con.execute(
-                    "SELECT id FROM entities WHERE name = ?;",
-                    (alias_row[0],)
-                ).fetchone()
-                if alias_entity:
-                    entity2_ids.append(alias_entity[0])
-            
             # check if any relationship exists between any combination
             placeholders1 = ','.join('?' * len(entity1_ids))
             placeholders2 = ','.join('?' * len(entity2_ids))
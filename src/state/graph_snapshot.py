@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+
+class GraphSnapshot:
+    """
+    Immutable, array-backed snapshot of the graph for analytics.
+
+    Nodes are canonical entities (alias-entities folded in), addressed by
+    position 0..n-1. Adjacency is CSR over outgoing edges: the neighbors of
+    node i are indices[indptr[i]:indptr[i+1]], with matching strength.
+    Undirected relationships appear in both directions, directed ones once.
+    Parallel rows between the same pair (e.g. via aliases) are merged,
+    keeping the max strength; self-loops left by alias folding are dropped.
+    """
+
+    def __init__(self,
+        ids: np.ndarray,
+        names: np.ndarray,
+        entity_types: np.ndarray,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        strength: np.ndarray
+    ):
+        self.ids = ids # int64 entity ids (canonical)
+        self.names = names # str
+        self.entity_types = entity_types # str, "" when unset
+        self.indptr = indptr # int64, n + 1
+        self.indices = indices # int32
+        self.strength = strength # float32, NaN when unset
+        for arr in (ids, names, entity_types, indptr, indices, strength):
+            arr.flags.writeable = False
+        self._position = {name: i for i, name in enumerate(names.tolist())}
+        self._undirected: Optional[tuple[np.ndarray, np.ndarray]] = None
+
+
+    @classmethod
+    def from_edges(cls,
+        ids: np.ndarray,
+        names: np.ndarray,
+        entity_types: np.ndarray,
+        src: np.ndarray,
+        dst: np.ndarray,
+        strength: np.ndarray,
+        directed: np.ndarray
+    ) -> GraphSnapshot:
+        """
+        Build from node arrays and an edge list given as node positions.
+        Undirected edges are mirrored; duplicates and self-loops are dropped.
+        """
+        n = len(ids)
+        undirected = ~directed.astype(bool)
+        src, dst = (
+            np.concatenate([src, dst[undirected]]).astype(np.int64),
+            np.concatenate([dst, src[undirected]]).astype(np.int64),
+        )
+        strength = np.concatenate([strength, strength[undirected]]).astype(np.float32)
+
+        keep = src != dst
+        src, dst, strength = src[keep], dst[keep], strength[keep]
+
+        # sort by (src, dst, strength desc, NaN last) and keep the first of each pair
+        order = np.lexsort((-np.nan_to_num(strength, nan=-np.inf), dst, src))
+        src, dst, strength = src[order], dst[order], strength[order]
+        first = np.ones(len(src), dtype=bool)
+        first[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+        src, dst, strength = src[first], dst[first], strength[first]
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+        return cls(ids, names, entity_types, indptr, dst.astype(np.int32), strength)
+
+
+    # --- persistence ---
+
+    def save(self, path: str | Path) -> Path:
+        """Write the snapshot to an uncompressed .npz (loads without pickling)."""
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez(
+            tmp,
+            ids=self.ids,
+            names=self.names,
+            entity_types=self.entity_types,
+            indptr=self.indptr,
+            indices=self.indices,
+            strength=self.strength,
+        )
+        tmp.replace(path) # readers never see a half-written file
+        return path
+
+
+    @classmethod
+    def load(cls, path: str | Path) -> GraphSnapshot:
+        """Load a snapshot written by save()."""
+        with np.load(Path(path), allow_pickle=False) as data:
+            return cls(
+                ids=data["ids"],
+                names=data["names"],
+                entity_types=data["entity_types"],
+                indptr=data["indptr"],
+                indices=data["indices"],
+                strength=data["strength"],
+            )
+
+
+    # --- access ---
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.ids)
+
+
+    @property
+    def num_edges(self) -> int:
+        """Number of CSR entries (undirected relationships count twice)."""
+        return len(self.indices)
+
+
+    def position(self, name: str) -> int:
+        """Node position of a canonical entity name (KeyError if absent)."""
+        return self._position[name]
+
+
+    def neighbors(self, name: str) -> list[str]:
+        """Names of the out-neighbors of a canonical entity."""
+        i = self._position[name]
+        return self.names[self.indices[self.indptr[i]:self.indptr[i + 1]]].tolist()
+
+
+    def top(self, scores: np.ndarray, k: int = 10) -> list[tuple[str, float]]:
+        """The k highest-scoring nodes as (name, score), best first."""
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k] if k else np.array([], dtype=np.int64)
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(str(self.names[i]), float(scores[i])) for i in best]
+
+
+    def _edge_sources(self) -> np.ndarray:
+        """Source position of every CSR entry."""
+        return np.repeat(np.arange(self.num_nodes, dtype=np.int64), np.diff(self.indptr))
+
+
+    def _undirected_edges(self) -> tuple[np.ndarray, np.ndarray]:
+        """Helper: (src, dst) of the symmetrized simple graph, each pair in both directions."""
+        if self._undirected is None:
+            src, dst = self._edge_sources(), self.indices.astype(np.int64)
+            pairs = np.unique(np.concatenate([
+                np.stack([src, dst], axis=1),
+                np.stack([dst, src], axis=1),
+            ]), axis=0)
+            self._undirected = (pairs[:, 0], pairs[:, 1])
+        return self._undirected
+
+
+    # --- algorithms ---
+
+    def degree(self, mode: str = "all") -> np.ndarray:
+        """
+        Node degree.
+        mode: "out" (CSR row lengths), "in", or "all" (distinct neighbors, direction ignored).
+        """
+        if mode == "out":
+            return np.diff(self.indptr)
+        if mode == "in":
+            return np.bincount(self.indices, minlength=self.num_nodes)
+        if mode == "all":
+            return np.bincount(self._undirected_edges()[0], minlength=self.num_nodes)
+        raise ValueError(f"Unknown degree mode: {mode}")
+
+
+    def degree_centrality(self) -> np.ndarray:
+        """Degree (direction ignored) normalized by n - 1."""
+        n = self.num_nodes
+        return self.degree("all") / max(n - 1, 1)
+
+
+    def pagerank(self,
+        alpha: float = 0.85,
+        weighted: bool = False,
+        tol: float = 1e-8,
+        max_iter: int = 100
+    ) -> np.ndarray:
+        """
+        PageRank by power iteration over the CSR edges.
+        weighted=True splits rank by strength (unset strength counts as 1.0).
+        Mass from nodes without out-edges is spread uniformly.
+        """
+        n = self.num_nodes
+        if n == 0:
+            return np.zeros(0)
+        src, dst = self._edge_sources(), self.indices
+        w = np.nan_to_num(self.strength, nan=1.0).astype(np.float64) if weighted else np.ones(len(dst))
+        out = np.bincount(src, weights=w, minlength=n)
+        dangling = out == 0
+        w = w / np.where(out == 0, 1.0, out)[src]
+
+        rank = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            spread = np.bincount(dst, weights=rank[src] * w, minlength=n)
+            new = alpha * (spread + rank[dangling].sum() / n) + (1.0 - alpha) / n
+            if np.abs(new - rank).sum() < tol:
+                return new
+            rank = new
+        return rank
+
+
+    def connected_components(self) -> np.ndarray:
+        """
+        Weakly connected components: a label per node, 0..k-1, numbered in
+        order of each component's first node.
+        Min-label propagation with pointer jumping.
+        """
+        n = self.num_nodes
+        src, dst = self._undirected_edges()
+        labels = np.arange(n)
+        while True:
+            new = labels.copy()
+            np.minimum.at(new, dst, labels[src])
+            new = new[new] # pointer jumping
+            if np.array_equal(new, labels):
+                break
+            labels = new
+        return np.unique(labels, return_inverse=True)[1]
+
+
+    def core_numbers(self) -> np.ndarray:
+        """Core number of every node (direction ignored), by batch peeling."""
+        n = self.num_nodes
+        src, dst = self._undirected_edges()
+        deg = np.bincount(src, minlength=n)
+        core = np.zeros(n, dtype=np.int64)
+        alive = np.ones(n, dtype=bool)
+        k = 0
+        while alive.any():
+            k = max(k, int(deg[alive].min()))
+            peel = alive & (deg <= k)
+            core[peel] = k
+            alive &= ~peel
+            hit = peel[src] & alive[dst]
+            deg -= np.bincount(dst[hit], minlength=n)
+        return core
+
+
+    def k_core(self, k: int) -> list[str]:
+        """Names of the nodes in the k-core (core number >= k)."""
+        return self.names[self.core_numbers() >= k].tolist()
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from typing import Callable, Literal
+
+import numpy as np
+
+from ...config import log
+from .vector_index import VectorIndex
+from .graph_index import GraphIndex
+
+
+class GraphVectorIndex:
+    """
+    FAISS indexes of entity-name and claim embeddings for a GraphIndex.
+    Vector ids map to rows through the entity_vectors / claim_vectors tables
+    in graph.sqlite; sync() embeds whatever rows are not mapped yet and
+    removes the vectors of rows deleted or changed since (vector_orphans).
+    """
+
+    def __init__(self, graph_index: GraphIndex, cfg, dimension: int):
+        """
+        Args:
+            graph_index: the graph whose rows are embedded.
+            cfg: VectorDBConfig for the FAISS indexes (index type, HNSW params, stage_dir).
+            dimension: embedding dimension.
+        """
+        self.graph_index = graph_index
+        self.indexes: dict[str, VectorIndex] = {
+            kind: VectorIndex(cfg, dimension, rebuild=False,
+                index_path=cfg.stage_dir / f"graph_{kind}_{cfg.index_type}.faiss")
+            for kind in ("entity", "claim")
+        }
+
+
+    def sync(self, embed: Callable[[list[str]], np.ndarray], batch_size: int = 1024) -> dict[str, int]:
+        """
+        Embed and index every entity name and claim that has no vector yet, and
+        remove the vectors whose rows were deleted or changed.
+        Each batch is saved to disk before its ids are linked (orphans: before
+        they are forgotten), so an interrupted sync leaves at worst unreferenced
+        vectors, never dangling links.
+
+        Args:
+            embed: texts -> L2-normalized float32 array (e.g. Embedder.embed).
+            batch_size: rows embedded per round-trip.
+        Returns:
+            {"entity": n, "claim": n} vectors added.
+        """
+        added = {}
+        for kind, index in self.indexes.items():
+            orphans = self.graph_index.list_orphan_vectors(kind)
+            if orphans:
+                removed = index.remove_ids(orphans)
+                index.save()
+                self.graph_index.clear_orphan_vectors(kind, orphans)
+                log.info("Removed %s stale %s vectors", removed, kind)
+
+            added[kind] = 0
+            while True:
+                rows = self.graph_index.list_unembedded(kind, limit=batch_size)
+                if not rows:
+                    break
+                vector_ids = index.add_vectors(embed([text for _, text in rows]))
+                index.save()
+                self.graph_index.link_vectors(kind, [
+                    (vector_id, row_id) for vector_id, (row_id, _) in zip(vector_ids, rows)
+                ])
+                added[kind] += len(rows)
+        if any(added.values()):
+            log.info("Embedded %s entities and %s claims", added["entity"], added["claim"])
+        return added
+
+
+    def search(self,
+        kind: Literal["entity", "claim"],
+        query_vector: np.ndarray,
+        k: int
+    ) -> list[tuple[int, float]]:
+        """
+        Nearest vectors to query_vector as (vector_id, similarity), best first.
+        Similarity is cosine for normalized embeddings (1 - squared L2 / 2).
+        """
+        index = self.indexes[kind]
+        if index.index is None or index.size() == 0 or k <= 0:
+            return []
+        distances, ids = index.search(query_vector.reshape(1, -1), k)
+        return [
+            (int(i), float(1.0 - d / 2.0))
+            for d, i in zip(distances[0], ids[0]) if i != -1
+        ]
+
+
+    def size(self, kind: Literal["entity", "claim"]) -> int:
+        return self.indexes[kind].size()
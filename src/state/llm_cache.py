@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional
+import hashlib
+import json
+import zlib
+
+from ._connection import ConnectionPool
+
+
+class LLMCache:
+    """
+    Persistent LLM responses keyed by sha256 of (model, messages), i.e. the
+    model, system prompt and rendered prompt. Responses are stored
+    zlib-compressed; every call (hit, miss or error) is also appended to the
+    `calls` log with its latency and token usage.
+    """
+
+    def __init__(self, index_path: str | Path):
+        self.index_path = Path(index_path)
+        self._pool = ConnectionPool(self.index_path)
+        self._initialize()
+
+
+    def _initialize(self) -> None:
+        with self._pool.connection() as con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key               BLOB PRIMARY KEY,
+                    model             TEXT NOT NULL,
+                    response          BLOB NOT NULL,
+                    prompt_tokens     INTEGER,
+                    completion_tokens INTEGER,
+                    created_at        INTEGER
+                ) WITHOUT ROWID
+            """)
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS calls (
+                    id                INTEGER PRIMARY KEY,
+                    at                REAL NOT NULL,
+                    key               BLOB NOT NULL,
+                    model             TEXT NOT NULL,
+                    cached            INTEGER NOT NULL,
+                    seconds           REAL,
+                    prompt_tokens     INTEGER,
+                    completion_tokens INTEGER,
+                    error             TEXT
+                )
+            """)
+
+
+    def close(self) -> None:
+        self._pool.close()
+
+
+    @staticmethod
+    def key(model: str, messages: list[dict]) -> bytes:
+        payload = json.dumps([model, messages], ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).digest()
+
+
+    def get(self, key: bytes) -> Optional[str]:
+        """Cached response for key, None on a miss."""
+        with self._pool.connection() as con:
+            row = con.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row is not None else None
+
+
+    def put(self, key: bytes, model: str, response: str,
+            prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None) -> None:
+        with self._pool.connection() as con:
+            con.execute(
+                """
+                INSERT OR REPLACE INTO responses (key, model, response, prompt_tokens, completion_tokens, created_at)
+                VALUES (?, ?, ?, ?, ?, strftime('%s','now'))
+                """,
+                (key, model, zlib.compress(response.encode("utf-8")), prompt_tokens, completion_tokens),
+            )
+
+
+    def log_call(self, at: float, key: bytes, model: str, cached: bool, seconds: Optional[float] = None,
+                 prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None,
+                 error: Optional[str] = None) -> None:
+        with self._pool.connection() as con:
+            con.execute(
+                """
+                INSERT INTO calls (at, key, model, cached, seconds, prompt_tokens, completion_tokens, error)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (at, key, model, int(cached), seconds, prompt_tokens, completion_tokens, error),
+            )
+
+
+    def size(self) -> int:
+        with self._pool.connection() as con:
+            return con.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+    def usage(self) -> dict[str, int]:
+        """Totals over the call log: calls, cached (hits), errors, prompt_tokens, completion_tokens."""
+        with self._pool.connection() as con:
+            row = con.execute("""
+                SELECT COUNT(*), COALESCE(SUM(cached), 0), COUNT(error),
+                       COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(completion_tokens), 0)
+                FROM calls
+            """).fetchone()
+        return dict(zip(("calls", "cached", "errors", "prompt_tokens", "completion_tokens"), row))
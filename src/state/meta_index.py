@@ -1,10 +1,10 @@
 from __future__ import annotations
 
-from contextlib import contextmanager
 from pathlib import Path
-import sqlite3
+from typing import Optional
 
 from ...config import log
+from ._connection import ConnectionPool
 from .._schemas import (
     ChunkData
 )
@@ -19,29 +19,30 @@ def debug_only(func):
 class MetaIndex:
     """SQL Meta Index handler"""
 
+    _IN_LIST_MAX = 500 # resolve_many: larger batches use a temp table
+
     def __init__(self, index_path: str | Path):
         self.index_path = Path(index_path)
+        self._pool = ConnectionPool(self.index_path)
         self._initialize()
 
 
-    @contextmanager
     def _conn(self):
         """
-        Helper to open a SQLite connection with row access by column name.
+        Helper to borrow this thread's pooled SQLite connection (row access by column name).
+        Nested calls share the outermost connection and commit.
         """
-        con = sqlite3.connect(self.index_path)
-        con.execute("PRAGMA journal_mode=WAL;")
-        con.execute("PRAGMA foreign_keys=ON;")
-        con.execute("PRAGMA busy_timeout=5000;")
-        con.row_factory = sqlite3.Row
-        try:
-            yield con
-            con.commit()
-        except Exception:
-            con.rollback()
-            raise
-        finally:
-            con.close()
+        return self._pool.connection()
+
+
+    def transaction(self):
+        """Group several calls into one connection scope and one commit."""
+        return self._pool.transaction()
+
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self._pool.close()
 
 
     def _initialize(self) -> None:
@@ -59,6 +60,20 @@ class MetaIndex:
                     UNIQUE (document_id, start_token, end_token)
                 )
             """)
+            con.execute("CREATE INDEX IF NOT EXISTS idx_chunk_embedding ON chunk(embedding_id)")
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS document (
+                    document_id     INTEGER PRIMARY KEY,
+                    checksum        TEXT NOT NULL,
+                    source_path     TEXT NOT NULL,
+                    size            INTEGER,
+                    mtime_ns        INTEGER
+                )
+            """)
+            columns = {row["name"] for row in con.execute("PRAGMA table_info(document)")}
+            for column in ("size", "mtime_ns"): # tables from before file stats were recorded
+                if column not in columns:
+                    con.execute(f"ALTER TABLE document ADD COLUMN {column} INTEGER")
 
 
     def upsert(self, chunks: list[ChunkData]):
@@ -82,9 +97,71 @@ class MetaIndex:
 
 
     def drop(self):
-        """drop all values from the chunk table."""
+        """drop all values from the chunk and document tables."""
         with self._conn() as con:
             con.execute("DELETE FROM chunk;")
+            con.execute("DELETE FROM document;")
+
+
+    def set_document(self, document_id: int, checksum: str, source_path: str,
+                     size: Optional[int] = None, mtime_ns: Optional[int] = None) -> None:
+        """Record the content checksum (and file size / mtime) a document was last indexed with."""
+        with self._conn() as con:
+            con.execute("""
+                INSERT INTO document (document_id, checksum, source_path, size, mtime_ns) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(document_id) DO UPDATE SET
+                    checksum = excluded.checksum,
+                    source_path = excluded.source_path,
+                    size = excluded.size,
+                    mtime_ns = excluded.mtime_ns
+            """, (document_id, checksum, str(source_path), size, mtime_ns))
+
+
+    def document_checksums(self) -> dict[int, tuple[str, str, Optional[int], Optional[int]]]:
+        """{document_id: (checksum, source_path, size, mtime_ns)} of every tracked document."""
+        with self._conn() as con:
+            return {
+                row["document_id"]: (row["checksum"], row["source_path"], row["size"], row["mtime_ns"])
+                for row in con.execute("SELECT document_id, checksum, source_path, size, mtime_ns FROM document")
+            }
+
+
+    def document_paths(self, document_ids: list[int]) -> list[str]:
+        """Source paths of documents (from their checksum rows and chunks)."""
+        if not document_ids:
+            return []
+        ids = [int(i) for i in document_ids]
+        paths: dict[str, None] = {}
+        with self._conn() as con:
+            for start in range(0, len(ids), self._IN_LIST_MAX):
+                batch = ids[start:start + self._IN_LIST_MAX]
+                marks = ",".join("?" * len(batch))
+                for row in con.execute(f"""
+                    SELECT source_path FROM document WHERE document_id IN ({marks})
+                    UNION SELECT DISTINCT source_path FROM chunk WHERE document_id IN ({marks})
+                """, batch + batch):
+                    paths[row[0]] = None
+        return list(paths)
+
+
+    def delete_documents(self, document_ids: list[int]) -> list[int]:
+        """
+        Delete the chunks and checksum rows of documents.
+        Returns the embedding ids of the deleted chunks (to remove from the vector index).
+        """
+        if not document_ids:
+            return []
+        with self._conn() as con:
+            con.execute("CREATE TEMP TABLE IF NOT EXISTS _delete_docs (document_id INTEGER PRIMARY KEY)")
+            con.execute("DELETE FROM _delete_docs")
+            con.executemany("INSERT OR IGNORE INTO _delete_docs VALUES (?)", ((int(i),) for i in document_ids))
+            embedding_ids = [row[0] for row in con.execute("""
+                SELECT embedding_id FROM chunk
+                WHERE document_id IN (SELECT document_id FROM _delete_docs) AND embedding_id IS NOT NULL
+            """)]
+            con.execute("DELETE FROM chunk WHERE document_id IN (SELECT document_id FROM _delete_docs)")
+            con.execute("DELETE FROM document WHERE document_id IN (SELECT document_id FROM _delete_docs)")
+        return embedding_ids
 
 
     def resolve(self, embedding_id: int) -> int:
@@ -102,6 +179,36 @@ class MetaIndex:
         return row["id"]
 
 
+    def resolve_many(self, embedding_ids: list[int]) -> dict[int, tuple[int, str, int, int]]:
+        """
+        Bulk lookup: {embedding_id: (document_id, source_path, start_char, end_char)}
+        in one query. Unknown ids are left out. Long id lists (e.g. whole
+        clusters) go through a temp table instead of an IN list.
+        """
+        if len(embedding_ids) == 0:
+            return {}
+        columns = "c.embedding_id, c.document_id, c.source_path, c.start_char, c.end_char"
+        with self._conn() as con:
+            if len(embedding_ids) <= self._IN_LIST_MAX:
+                rows = con.execute(
+                    f"SELECT {columns} FROM chunk c "
+                    f"WHERE c.embedding_id IN ({','.join('?' * len(embedding_ids))})",
+                    [int(i) for i in embedding_ids],
+                ).fetchall()
+            else:
+                con.execute("CREATE TEMP TABLE IF NOT EXISTS _resolve_ids (embedding_id INTEGER PRIMARY KEY)")
+                con.execute("DELETE FROM _resolve_ids")
+                con.executemany("INSERT OR IGNORE INTO _resolve_ids VALUES (?)", ((int(i),) for i in embedding_ids))
+                rows = con.execute(
+                    f"SELECT {columns} FROM _resolve_ids r "
+                    "CROSS JOIN chunk c ON c.embedding_id = r.embedding_id"
+                ).fetchall()
+        return {
+            row["embedding_id"]: (row["document_id"], row["source_path"], row["start_char"], row["end_char"])
+            for row in rows
+        }
+
+
     def get_chunk_metadata(
         self,
         chunk_id: int,
@@ -1,5 +1,11 @@
 from __future__ import annotations
 
+from pathlib import Path
+from typing import Callable, Optional
+import threading
+import json
+import os
+
 import faiss
 import numpy as np
 
@@ -12,17 +18,60 @@ def debug_only(func):
 
 
 class VectorIndex:
-    """Manages FAISS vector index."""
+    """
+    Manages FAISS vector index.
+
+    Vectors carry explicit, stable ids (IndexIDMap2); ids are never reused.
+    Removed ids that the underlying index can't delete in place (HNSW) are
+    tombstoned: filtered out of searches and dropped by compact(), which runs
+    once they make up compact_ratio of the index.
+
+    "ivf" / "ivfpq" indexes need training: vectors are kept in an exact flat
+    index until cfg.ivf_train_size of them have been added, then train()
+    fits the coarse quantizer (and PQ codebooks) on a sample and moves them
+    into the IVF index, which holds the ids itself.
+
+    With mmap=True a saved index is mapped read-only (IO_FLAG_MMAP_IFC)
+    instead of read into memory: opening is near-instant, pages are loaded
+    on first touch, and processes mapping the same file share them through
+    the OS page cache. Such an index can only be searched.
+
+    On disk, an index is a base segment plus delta segments (vectors added
+    and ids removed by each save since), listed in <stem>.manifest.json;
+    see save().
+    """
+
+    compact_ratio = 0.2
+    IVF_TYPES = ("ivf", "ivfpq")
+    MIN_PER_LIST = 39 # faiss' minimum training vectors per centroid
     
-    def __init__(self, cfg, dimension: int, rebuild: bool = False):
+    def __init__(self, cfg, dimension: int, rebuild: bool = False, index_path: Optional[Path] = None,
+                 mmap: bool = False):
         self.cfg = cfg
         self.dimension = dimension
+        self.read_only = mmap and not rebuild
 
         self.index_type = cfg.index_type
-        self.index_path = self.cfg.stage_dir / f"{self.index_type}.faiss" # | FIXME
+        self.index_path = index_path or self.cfg.stage_dir / f"{self.index_type}.faiss" # | FIXME
+        self.deleted_path = self.index_path.with_name(self.index_path.name + ".deleted.npy") # single-file layout
+        self.manifest_path = self.index_path.with_name(self.index_path.stem + ".manifest.json")
 
         self.index_size = 0
         self.index = None
+        self.deleted: set[int] = set() # tombstoned ids
+        self._next_id = 0
+        self._delta = None # read-only: vectors of delta segments, searched next to the mapped base
+
+        self._persist_lock = threading.RLock() # index changes vs. a background merge's snapshot; manifest writes
+        self._merge_thread: Optional[threading.Thread] = None
+        self._generation = 0 # last segment generation written or loaded
+        self._base_size = 0
+        self._delta_size = 0 # vectors added + removed in the delta segments
+        self._full_save = True # next save() writes a new base
+        self._clear_pending() # changes since the last save
+
+        if self.index_type == "ivfpq" and dimension % cfg.pq_m:
+            raise ValueError(f"pq_m ({cfg.pq_m}) must divide the dimension ({dimension})")
         
         if rebuild:
             self._initialize()
@@ -31,49 +80,325 @@ class VectorIndex:
 
 
     def _initialize(self) -> None:
-        """Initialize a new HNSW index."""
+        """Initialize a new, empty index."""
         log.info("Initializing %s index with dimension %s", self.index_type, self.dimension)
-        
+        self.index = faiss.IndexIDMap2(self._new_base())
+        self.index_size = 0
+        self.deleted = set()
+        self._next_id = 0
+        self._full_save = True
+
+
+    def _new_base(self):
+        """Helper: empty underlying index of the configured type."""
         if self.index_type == "hnsw":
             # Create HNSW index
-            self.index = faiss.IndexHNSWFlat(self.dimension, self.cfg.hnsw_m)
-            self.index.hnsw.efConstruction = self.cfg.hnsw_ef_construction
-            self.index.hnsw.efSearch = self.cfg.hnsw_ef_search
-            self.index_size = 0
-        elif self.index_type == "flat":
-            pass # stub TODO
-        elif self.index_type == "ivf":
-            pass # stub TODO
+            index = faiss.IndexHNSWFlat(self.dimension, self.cfg.hnsw_m)
+            index.hnsw.efConstruction = self.cfg.hnsw_ef_construction
+            index.hnsw.efSearch = self.cfg.hnsw_ef_search
+            return index
+        elif self.index_type == "flat" or self.index_type in self.IVF_TYPES: # ivf: exact until trained
+            return faiss.IndexFlatL2(self.dimension)
+        raise ValueError(f"Unsupported index type: {self.index_type}")
+
+
+    def _new_ivf(self, n_train: int):
+        """Helper: empty, untrained IVF index sized for n_train training vectors."""
+        nlist = max(1, min(self.cfg.ivf_nlist, n_train // self.MIN_PER_LIST))
+        quantizer = faiss.IndexFlatL2(self.dimension)
+        if self.index_type == "ivfpq":
+            index = faiss.IndexIVFPQ(quantizer, self.dimension, nlist, self.cfg.pq_m, self.cfg.pq_nbits)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, self.dimension, nlist)
+        index.nprobe = self.cfg.ivf_nprobe
+        return index
+
+
+    def trained(self) -> bool:
+        """False while an "ivf"/"ivfpq" index is still staged in its flat index."""
+        return not (self.index_type in self.IVF_TYPES and isinstance(self.index, faiss.IndexIDMap2))
+
+
+    def train(self) -> bool:
+        """
+        Train the IVF index on a random sample of up to cfg.ivf_train_size
+        staged vectors and move all of them into it (ids are kept).
+        Returns False if there is nothing to train or too few vectors.
+        """
+        if self.index is None:
+            raise RuntimeError("Index not initialized. Please call load().")
+        if self.trained():
+            return False
+        self._check_writable()
+        with self._persist_lock:
+            return self._train()
+
+
+    def _train(self) -> bool:
+        """Helper (under _persist_lock): train(), see above."""
+        ids, vectors = self.vectors()
+        min_train = 2 ** self.cfg.pq_nbits if self.index_type == "ivfpq" else self.MIN_PER_LIST
+        if len(ids) < min_train:
+            log.warning("Not training %s index: %s vectors, need at least %s", self.index_type, len(ids), min_train)
+            return False
+
+        n_train = min(len(ids), self.cfg.ivf_train_size)
+        sample = vectors[np.random.default_rng(0).choice(len(ids), n_train, replace=False)]
+        index = self._new_ivf(n_train)
+        log.info("Training %s index (%s lists) on %s vectors", self.index_type, index.nlist, n_train)
+        index.train(sample)
+        index.set_direct_map_type(faiss.DirectMap.Hashtable) # reconstruct() / remove_ids() by id
+        index.add_with_ids(vectors, ids)
+        self.index = index
+        self.index_size = self.index.ntotal
+        self._full_save = True
+        return True
 
 
     def _load(self):
         """Create index or load existing index from disk."""
-        if self.index_path.exists():   
-            try:
-                self.index = faiss.read_index(str(self.index_path))
-                self.index_size = self.index.ntotal
-                log.info("Loaded existing index with %s vectors", self.index_size)
-                return self.index
-            except Exception as e:
-                log.error("Failed to load index: %s", e)
-                raise
+        if self.manifest_path.exists():
+            for attempt in range(3):
+                manifest = self._read_manifest()
+                try:
+                    self._load_segments(manifest)
+                    break
+                except (OSError, RuntimeError) as e: # a merge replaced the files after we read the manifest
+                    if attempt == 2:
+                        log.error("Failed to load index: %s", e)
+                        raise
+            log.info("Loaded existing index with %s vectors in %s segments%s", self.size(),
+                1 + len(manifest["deltas"]), " (memory-mapped)" if self.read_only else "")
+            return self.index
+        elif self.index_path.exists(): # single-file layout (older builds)
+            self._adopt(self._read_index(self.index_path))
+            self.deleted = set(np.load(self.deleted_path).tolist()) if self.deleted_path.exists() else set()
+            ids = self._ids()
+            self._next_id = int(ids.max()) + 1 if len(ids) else 0
+            self._full_save = True # move to the segmented layout on the next save
+            log.info("Loaded existing index with %s vectors%s", self.size(), " (memory-mapped)" if self.read_only else "")
+            return self.index
         else:
             self._initialize()
-    
-    
-    def save(self):
-        """Save index to disk."""
+
+
+    def _load_segments(self, manifest: dict) -> None:
+        """Helper: load the base segment, then replay the delta segments on top of it."""
+        base = manifest["base"]
+        deltas = []
+        for delta in manifest["deltas"]: # read everything first: a missing file means a newer manifest
+            with np.load(self.index_path.with_name(delta["file"]), allow_pickle=False) as data:
+                deltas.append((data["ids"], data["vectors"], data["removed"]))
+        deleted = np.load(self.index_path.with_name(base["deleted"])) if base["deleted"] else np.zeros(0, dtype=np.int64)
+        self._adopt(self._read_index(self.index_path.with_name(base["file"])))
+        self.deleted = set(deleted.tolist())
+        self._delta = None
+        in_delta: set[int] = set() # ids living in the side index
+
+        for ids, vectors, removed in deltas:
+            if self.read_only: # the base can't take writes: keep added vectors in a flat side index
+                if len(ids):
+                    if self._delta is None:
+                        self._delta = faiss.IndexIDMap2(faiss.IndexFlatL2(self.dimension))
+                    self._delta.add_with_ids(vectors, ids)
+                    in_delta.update(ids.tolist())
+                if len(removed):
+                    # saves only record live ids: those not added by a delta live in the base
+                    from_delta = in_delta.intersection(removed.tolist())
+                    if from_delta:
+                        self._delta.remove_ids(faiss.IDSelectorBatch(np.fromiter(from_delta, dtype=np.int64)))
+                        in_delta -= from_delta
+                    self.deleted.update(i for i in removed.tolist() if i not in from_delta)
+            else:
+                self._add(vectors, ids)
+                self._remove(removed)
+        self._next_id = manifest["next_id"]
+        self._generation = manifest["generation"]
+        self._base_size = base["size"]
+        self._delta_size = sum(delta["size"] for delta in manifest["deltas"])
+        self._clear_pending()
+        self._full_save = False
+
+
+    def _read_index(self, path: Path):
+        """Helper: read (or memory-map, when read-only) a FAISS index file."""
+        if not path.exists():
+            raise FileNotFoundError(path)
+        return faiss.read_index(str(path), faiss.IO_FLAG_MMAP_IFC if self.read_only else 0)
+
+
+    def _adopt(self, index) -> None:
+        """Helper: make a freshly read index the current one."""
+        if isinstance(index, faiss.IndexIVF):
+            index.nprobe = self.cfg.ivf_nprobe
+            if index.direct_map.type != faiss.DirectMap.Hashtable and not self.read_only:
+                index.set_direct_map_type(faiss.DirectMap.Hashtable)
+            self.index = index
+        elif not isinstance(index, faiss.IndexIDMap2): # positional ids (older builds): keep them as explicit ids
+            log.info("Migrating %s to explicit vector ids", self.index_path)
+            self._initialize()
+            if index.ntotal:
+                self.index.add_with_ids(index.reconstruct_n(0, index.ntotal), np.arange(index.ntotal, dtype=np.int64))
+        else:
+            self.index = index
+        self.index_size = self.index.ntotal
+
+
+    # --- persistence ---
+
+    def save(self, wait: bool = False) -> None:
+        """
+        Persist changes since the last save. Small changes are appended as a
+        delta segment; once the deltas reach cfg.index_delta_ratio of the
+        base, they are merged into a new base in the background (wait=True
+        blocks until that merge is on disk). Every file is written to a temp
+        name and renamed into place, and the manifest is renamed last, so a
+        crash leaves the previous consistent state.
+        """
         if self.index is None:
             log.warning("No index to save. Please call load().")
             return
-            
+        self._check_writable()
+
         try:
-            faiss.write_index(self.index, str(self.index_path))
-            log.info("Saved index with %s vectors to %s", self.index.ntotal, self.index_path)
+            if self._full_save or self.cfg.index_delta_ratio <= 0 or not self.manifest_path.exists():
+                self.merge()
+            elif self._pending_ids or self._pending_removed:
+                self._write_delta()
+                if self._delta_size > self.cfg.index_delta_ratio * max(self._base_size, 1):
+                    self.merge(wait=wait)
         except Exception as e:
             log.error("Failed to save index: %s", e)
             raise
+        if wait:
+            self.wait()
+
+
+    def merge(self, wait: bool = True) -> None:
+        """
+        Write the whole index as a new base segment that replaces the current
+        base and deltas. With wait=False the index is snapshotted and written
+        by a background thread: changes made meanwhile wait for the snapshot,
+        and saves append deltas that the new manifest keeps.
+        """
+        self._check_writable()
+        self.wait() # one merge at a time
+        if wait:
+            self._merge()
+        else:
+            self._merge_thread = threading.Thread(target=self._merge, name=f"merge-{self.index_path.stem}")
+            self._merge_thread.start()
+
+
+    def _merge(self) -> None:
+        """Helper: snapshot the index under the lock, then write it as the new base."""
+        with self._persist_lock:
+            generation = self._new_generation()
+            data = faiss.serialize_index(self.index)
+            deleted = np.fromiter(self.deleted, dtype=np.int64, count=len(self.deleted))
+            size, next_id = self.index.ntotal, self._next_id
+            self._base_size, self._delta_size = size, 0
+            self._clear_pending()
+            self._full_save = False
+        self._write_base(generation, data, deleted, size, next_id)
+
+
+    def wait(self) -> None:
+        """Block until a background merge (if any) is on disk."""
+        if self._merge_thread is not None:
+            self._merge_thread.join()
+            self._merge_thread = None
+
+
+    def _write_base(self, generation: int, data: np.ndarray, deleted: np.ndarray, size: int, next_id: int) -> None:
+        """Helper: write a base segment, point the manifest at it, and delete the files it supersedes."""
+        base = self._segment(generation, "faiss")
+        self._replace(base, lambda tmp: data.tofile(str(tmp)))
+        deleted_file = None
+        if len(deleted):
+            deleted_file = self._segment(generation, "deleted.npy")
+            self._replace(deleted_file, lambda tmp: np.save(tmp, deleted))
+
+        with self._persist_lock:
+            old = self._read_manifest() if self.manifest_path.exists() else None
+            kept = [delta for delta in old["deltas"] if delta["generation"] > generation] if old else []
+            self._write_manifest({
+                "generation": max(generation, old["generation"] if old else 0),
+                "next_id": max(next_id, old["next_id"] if old else 0),
+                "base": {"generation": generation, "file": base.name,
+                    "deleted": deleted_file.name if deleted_file else None, "size": size},
+                "deltas": kept,
+            })
+        log.info("Saved index with %s vectors to %s", size, base)
+
+        stale = [self.index_path, self.deleted_path] # single-file layout
+        if old:
+            if old["base"]["generation"] < generation:
+                stale += [old["base"]["file"]] + ([old["base"]["deleted"]] if old["base"]["deleted"] else [])
+            stale += [delta["file"] for delta in old["deltas"] if delta["generation"] < generation]
+        for path in stale: # open readers keep their (unlinked) files
+            self.index_path.with_name(Path(path).name).unlink(missing_ok=True)
+
+
+    def _write_delta(self) -> None:
+        """Helper: append the changes since the last save as a delta segment."""
+        with self._persist_lock:
+            generation = self._new_generation()
+            ids = np.concatenate(self._pending_ids) if self._pending_ids else np.zeros(0, dtype=np.int64)
+            vectors = (np.concatenate(self._pending_vectors) if self._pending_vectors
+                else np.zeros((0, self.dimension), dtype=np.float32))
+            removed = np.fromiter(self._pending_removed, dtype=np.int64, count=len(self._pending_removed))
+            path = self._segment(generation, "delta.npz")
+            self._replace(path, lambda tmp: np.savez(tmp, ids=ids, vectors=vectors, removed=removed))
+
+            manifest = self._read_manifest()
+            manifest["deltas"].append({"generation": generation, "file": path.name, "size": len(ids) + len(removed)})
+            manifest["generation"] = generation
+            manifest["next_id"] = self._next_id
+            self._write_manifest(manifest)
+            self._delta_size += len(ids) + len(removed)
+            self._clear_pending()
+        log.info("Saved %s added and %s removed vectors to %s", len(ids), len(removed), path)
+
+
+    def _new_generation(self) -> int:
+        """Helper: next segment generation (also past any on-disk manifest, e.g. after a rebuild)."""
+        on_disk = self._read_manifest()["generation"] if self.manifest_path.exists() else 0
+        self._generation = max(self._generation, on_disk) + 1
+        return self._generation
+
+
+    def _segment(self, generation: int, kind: str) -> Path:
+        return self.index_path.with_name(f"{self.index_path.stem}.{generation}.{kind}")
+
+
+    def _read_manifest(self) -> dict:
+        return json.loads(self.manifest_path.read_text(encoding="utf-8"))
+
+
+    def _write_manifest(self, manifest: dict) -> None:
+        self._replace(self.manifest_path, lambda tmp: tmp.write_text(json.dumps(manifest, indent=1), encoding="utf-8"))
+
+
+    @staticmethod
+    def _replace(path: Path, write: Callable[[Path], None]) -> None:
+        """Helper: write through a temp file, flush it to disk, then rename it over path."""
+        tmp = path.with_name(f".{path.name}.tmp{path.suffix}")
+        try:
+            write(tmp)
+            with tmp.open("rb+") as fh:
+                os.fsync(fh.fileno())
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        tmp.replace(path) # readers see the old file or the new one, never a partial write
+
+
+    def _clear_pending(self) -> None:
+        self._pending_ids, self._pending_vectors, self._pending_removed = [], [], set()
+
 
+    # --- read / write ---
 
     def add_vectors(self, embeddings: np.ndarray) -> list[int]:
         """
@@ -85,18 +410,143 @@ class VectorIndex:
         """
         if self.index is None:
             raise RuntimeError("Index not initialized. Please call load().")
+        self._check_writable()
         if embeddings.size == 0:
             return []
         
         if len(embeddings.shape) == 1: # ensure correct shape
             embeddings = embeddings.reshape(1, -1)
             
-        start_id = self.index_size
-        self.index.add(embeddings)
-        self.index_size = self.index.ntotal
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        with self._persist_lock:
+            start_id = self._next_id
+            ids = np.arange(start_id, start_id + len(embeddings), dtype=np.int64)
+            self._add(embeddings, ids)
+            self._next_id += len(embeddings)
+            self._pending_ids.append(ids)
+            self._pending_vectors.append(embeddings)
         
         # return list of assigned IDs
-        return list(range(start_id, self.index_size))
+        return ids.tolist()
+
+
+    def _add(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        """Helper: add vectors under the given ids (training the IVF index once enough are staged)."""
+        if len(ids) == 0:
+            return
+        self.index.add_with_ids(vectors, ids)
+        self.index_size = self.index.ntotal
+        if not self.trained() and self.index.ntotal >= self.cfg.ivf_train_size:
+            self.train()
+
+
+    def remove_ids(self, ids: list[int]) -> int:
+        """
+        Remove vectors by id (unknown ids are ignored). Returns the number removed.
+        """
+        if self.index is None:
+            raise RuntimeError("Index not initialized. Please call load().")
+        self._check_writable()
+        with self._persist_lock:
+            live = self._stored_ids([i for i in np.unique(np.asarray(ids, dtype=np.int64)).tolist() if i not in self.deleted])
+            self._remove(live)
+            self._pending_removed.update(live.tolist())
+        return len(live)
+
+
+    def _stored_ids(self, ids: list[int]) -> np.ndarray:
+        """Helper: the ids present in the main index, looked up one by one (O(len(ids)), not O(index))."""
+        found = []
+        for i in ids:
+            try:
+                self.index.reconstruct(i) # id map / IVF hashtable lookup; raises on unknown ids
+            except RuntimeError:
+                continue
+            found.append(i)
+        return np.asarray(found, dtype=np.int64)
+
+
+    def _remove(self, live: np.ndarray) -> None:
+        """Helper: remove stored, not yet removed ids."""
+        if len(live) == 0:
+            return
+        try:
+            if isinstance(self.index, faiss.IndexIVF): # its id hashtable only takes id arrays
+                self.index.remove_ids(faiss.IDSelectorArray(live))
+            else:
+                self.index.remove_ids(faiss.IDSelectorBatch(live))
+        except RuntimeError: # not supported in place (HNSW): tombstone
+            self.deleted.update(live.tolist())
+            if len(self.deleted) >= self.compact_ratio * self.index.ntotal:
+                self.compact()
+        self.index_size = self.index.ntotal
+
+
+    def compact(self) -> None:
+        """Rebuild the index without tombstoned vectors (ids are kept)."""
+        if not self.deleted:
+            return
+        self._check_writable()
+        with self._persist_lock:
+            self._compact()
+
+
+    def _compact(self) -> None:
+        """Helper (under _persist_lock): compact(), see above."""
+        ids, vectors = self._all()
+        keep = ~np.isin(ids, np.fromiter(self.deleted, dtype=np.int64, count=len(self.deleted)))
+        vectors = vectors[keep]
+        log.info("Compacting index: dropping %s removed vectors", int((~keep).sum()))
+
+        next_id = self._next_id
+        self._initialize() # the next save writes the compacted base
+        self._next_id = next_id
+        if keep.any():
+            self.index.add_with_ids(vectors, ids[keep])
+        self.index_size = self.index.ntotal
+
+
+    def search(self, query_vectors: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        k nearest live vectors for each query row: (distances, ids), each of
+        shape (n, min(k, size)); missing results have id -1.
+        """
+        if self.index is None:
+            raise RuntimeError("Index not initialized")
+        query_vectors = np.ascontiguousarray(query_vectors, dtype=np.float32).reshape(-1, self.dimension)
+        k = min(k, self.size())
+        if k <= 0:
+            return np.zeros((len(query_vectors), 0), dtype=np.float32), np.zeros((len(query_vectors), 0), dtype=np.int64)
+        params = None
+        if self.deleted:
+            sel = faiss.IDSelectorNot(faiss.IDSelectorBatch(np.fromiter(self.deleted, dtype=np.int64, count=len(self.deleted))))
+            if isinstance(self.index, faiss.IndexIVF):
+                params = faiss.SearchParametersIVF(sel=sel, nprobe=self.index.nprobe)
+            elif isinstance(self.index.index, faiss.IndexHNSW):
+                params = faiss.SearchParametersHNSW(sel=sel, efSearch=self.index.index.hnsw.efSearch)
+            else:
+                params = faiss.SearchParameters(sel=sel)
+        distances, ids = self.index.search(query_vectors, k, params=params)
+        if self._delta is None or self._delta.ntotal == 0:
+            return distances, ids
+
+        # merge with the delta segments' vectors (read-only)
+        delta_distances, delta_ids = self._delta.search(query_vectors, min(k, self._delta.ntotal))
+        distances = np.hstack([distances, delta_distances])
+        ids = np.hstack([ids, delta_ids])
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k] # missing results carry the max float
+        return np.take_along_axis(distances, order, 1), np.take_along_axis(ids, order, 1)
+
+
+    def vectors(self) -> tuple[np.ndarray, np.ndarray]:
+        """All live (ids, vectors), in insertion order."""
+        if self.index is None:
+            raise RuntimeError("Index not initialized. Please call load().")
+        ids, vectors = self._all()
+        if self.deleted:
+            keep = ~np.isin(ids, np.fromiter(self.deleted, dtype=np.int64, count=len(self.deleted)))
+            ids, vectors = ids[keep], vectors[keep]
+        return ids, vectors
 
 
     def mean(self, ids: list[int]) -> np.ndarray:
@@ -115,7 +565,8 @@ class VectorIndex:
             raise ValueError("No IDs provided.")
 
         # reconstruct each vector from the index
-        vectors = [self.index.reconstruct(idx) for idx in ids]
+        in_delta = set(self._delta_ids().tolist())
+        vectors = [(self._delta if idx in in_delta else self.index).reconstruct(int(idx)) for idx in ids]
 
         # convert to numpy array and compute mean
         vectors = np.array(vectors, dtype=np.float32)
@@ -124,5 +575,47 @@ class VectorIndex:
 
 
     def size(self) -> int:
-        """Get index size"""
-        return self.index_size
+        """Number of live vectors"""
+        return self.index_size - len(self.deleted) + (self._delta.ntotal if self._delta is not None else 0)
+
+
+    def _check_writable(self) -> None:
+        """Helper: refuse to modify a memory-mapped index."""
+        if self.read_only:
+            raise RuntimeError(f"{self.index_path} is memory-mapped read-only; open it with mmap=False to modify it")
+
+
+    def _all(self) -> tuple[np.ndarray, np.ndarray]:
+        """Helper: every stored (ids, vectors), tombstones included, in insertion order."""
+        if self._delta is not None and self._delta.ntotal:
+            ids, vectors = self._stored()
+            ids = np.concatenate([ids, self._delta_ids()])
+            vectors = np.vstack([vectors, self._delta.index.reconstruct_n(0, self._delta.ntotal)])
+            order = np.argsort(ids, kind="stable")
+            return ids[order], vectors[order]
+        return self._stored()
+
+
+    def _stored(self) -> tuple[np.ndarray, np.ndarray]:
+        """Helper: _all() for the main index only."""
+        if isinstance(self.index, faiss.IndexIVF):
+            ids = np.sort(self._ids()) # ids are assigned in increasing order
+            return ids, self.index.reconstruct_batch(ids) if len(ids) else np.zeros((0, self.dimension), dtype=np.float32)
+        return self._ids(), self.index.index.reconstruct_n(0, self.index.ntotal)
+
+
+    def _ids(self) -> np.ndarray:
+        """Helper: ids by position in the underlying index (by inverted list, for IVF)."""
+        if isinstance(self.index, faiss.IndexIVF):
+            lists = self.index.invlists
+            return np.concatenate([np.zeros(0, dtype=np.int64)] + [
+                faiss.rev_swig_ptr(lists.get_ids(i), lists.list_size(i)).astype(np.int64)
+                for i in range(self.index.nlist) if lists.list_size(i)
+            ])
+        return faiss.vector_to_array(self.index.id_map).astype(np.int64)
+
+
+    def _delta_ids(self) -> np.ndarray:
+        if self._delta is None:
+            return np.zeros(0, dtype=np.int64)
+        return faiss.vector_to_array(self._delta.id_map).astype(np.int64)
@@ -3,6 +3,9 @@ nexus utilities
 """
 
 from pathlib import Path
+from typing import Callable, Iterator, Optional
+import io
+import re
 
 from ..config import log
 from ._schemas import (ChunkData)
@@ -33,15 +36,40 @@ def fetch_doc(filepath: Path | str, start_char: int | None = None, end_char: int
 
 # --- chunker ---
 
+def _sentence_boundary(before: str, gap: str) -> bool:
+    """Sentence end between two tokens: terminal punctuation (+ closing quotes) then whitespace."""
+    if re.search(r"\s", gap) and re.search(r"[.!?][\"'”’)\]]*$", before):
+        return True
+    return _paragraph_boundary(before, gap)
+
+
+def _paragraph_boundary(before: str, gap: str) -> bool:
+    """Paragraph break between two tokens: a blank line."""
+    return gap.count("\n") >= 2
+
+
+# chunker name -> boundary test on (text just before the gap, whitespace gap between two tokens);
+# None cuts at fixed token strides with overlap
+CHUNKERS: dict[str, Callable[[str, str], bool] | None] = {
+    "tokens": None,
+    "sentences": _sentence_boundary,
+    "paragraphs": _paragraph_boundary,
+}
+
+
 def chunk(
     filepath: str,
     document_id: int,
-    embedder,  # Implements .encode(str)->list[int] & .decode(list[int])->str.
+    embedder,  # Implements .encode_offsets(str) -> (list[int], list[(start_char, end_char)]).
     max_tokens: int = 510,
     overlap: int = 510 * 0.10,
-) -> tuple[list[ChunkData], list[list[int]]]:
+    chunker: str = "tokens",
+) -> tuple[list[ChunkData], list[str]]:
     """
     Read a document file, chunk its text, and return (chunks_data, chunks_text).
+    Character offsets come from the tokenizer's offset mapping, so
+    text[start_char:end_char] is exactly the chunk's text.
+    Collects iter_chunks(); prefer that for large files.
     
     Args:
         filepath: Path to document file
@@ -49,69 +77,142 @@ def chunk(
         embedder: Embedder instance
         max_tokens: Max tokens per chunk
         overlap: Overlap in tokens
+        chunker: Chunking strategy, see iter_chunks()
         
     Returns:
         Tuple of (chunks_data, chunks_text)
     """
-
-    # fetch document text
-    try:
-        text = fetch_doc(filepath)
-    except Exception as e:
-        log.error("Failed to read %s: %s", filepath, e)
-        return [], []
-    
-    if not text.strip():
-        log.warning("Empty file: %s", filepath)
-        return [], []
-
-    encoding = embedder.encode(text) # just tokenizing.
     chunks_data, chunks_text = [], []
+    for chunk_data, chunk_text in iter_chunks(filepath, document_id, embedder, max_tokens, overlap, chunker):
+        chunks_data.append(chunk_data)
+        chunks_text.append(chunk_text)
+    return chunks_data, chunks_text
 
-    # TODO: SENTENCIZER
 
-    # chunking logic
-    if len(encoding) <= max_tokens: # doc is single chunk
-        chunk_text = text.strip()
-        chunks_data.append(ChunkData(
+def iter_chunks(
+    filepath: str,
+    document_id: int,
+    embedder,  # Implements .encode_offsets(str) -> (list[int], list[(start_char, end_char)]).
+    max_tokens: int = 510,
+    overlap: int = 510 * 0.10,
+    chunker: str = "tokens",
+    window_chars: int = 1 << 20,
+    doc_text: Optional[str] = None,
+) -> Iterator[tuple[ChunkData, str]]:
+    """
+    Lazily chunk a document file (or its already-read text), yielding (chunk_data, chunk_text).
+
+    The file is read window_chars at a time. Each window is tokenized up to
+    its last whitespace (so no token is split across windows) and only the
+    text from the oldest pending chunk onward is kept, so memory is bounded
+    by the window, not the file. Yields the same chunks as tokenizing the
+    whole text at once, provided the tokenizer never lets a token span
+    whitespace, i.e. it pre-splits on whitespace before any subword step
+    (WordPiece, SentencePiece and byte-level BPE all do). A tokenizer that
+    merges across spaces may tokenize the text around a window cut differently.
+
+    chunker="tokens" cuts every max_tokens tokens, stepping max_tokens - overlap.
+    "sentences" / "paragraphs" pack whole units up to max_tokens and cut
+    only at unit boundaries, without overlap; a unit longer than max_tokens
+    is cut at max_tokens.
+
+    Args:
+        filepath: Path to document file
+        document_id: Document DB ID
+        embedder: Embedder instance
+        max_tokens: Max tokens per chunk
+        overlap: Overlap in tokens (carried across windows; "tokens" chunker only)
+        chunker: "tokens", "sentences" or "paragraphs" (see CHUNKERS)
+        window_chars: Characters read per window
+        doc_text: The document's text, if already in memory (filepath is then only recorded in the chunks)
+    """
+    if chunker not in CHUNKERS:
+        raise ValueError(f"Unknown chunker: {chunker} (expected one of {', '.join(CHUNKERS)})")
+    boundary = CHUNKERS[chunker]
+    step = max(1, int(max_tokens - overlap))
+    spans: list[tuple[int, int]] = [] # absolute char spans of pending tokens
+    first = 0 # absolute token index of spans[0]
+    next_start = 0 # absolute token index of the next chunk's first token
+    text, text_start = "", 0 # retained text; absolute char offset of text[0]
+    tokenized = 0 # absolute char offset up to which text is tokenized
+    emitted = False
+
+    def make(start: int, end: int, start_char: int, end_char: int) -> tuple[ChunkData, str]:
+        return ChunkData(
             document_id=document_id,
-            start_token=0,
-            end_token=len(encoding),
-            start_char=0,
-            end_char=len(text),
+            start_token=start,
+            end_token=end,
+            start_char=start_char,
+            end_char=end_char,
             source_path=str(filepath)
-        ))
-        chunks_text.append(text)
-    else: # make many chunks
-        total_chars = len(text)
-        total_tokens = len(encoding)
-        step = max_tokens - overlap
-        for start in range(0, total_tokens, step):
-            end = min(start + max_tokens, total_tokens)
-            token_slice = encoding[start:end]
-            chunk_text = embedder.decode(token_slice)
-            if not chunk_text:
-                log.warning("Empty chunk within %s: %s...", filepath, text[:30])
-                continue
-            start_char = int((start / total_tokens) * total_chars)
-            end_char = int((end / total_tokens) * total_chars)
-            start_char = max(0, min(start_char, total_chars))
-            end_char = max(start_char, min(end_char, total_chars))
-            chunks_data.append(ChunkData(
-                document_id=document_id,
-                start_token=start,
-                end_token=end,
-                start_char=start_char,
-                end_char=end_char,
-                source_path=str(filepath)
-            ))
-            chunks_text.append(chunk_text)
-
-    if not chunks_text:
-        log.warning("No chunks generated for %s", filepath)
-        return [], []
-    
-    return chunks_data, chunks_text
+        ), text[start_char - text_start:end_char - text_start]
+
+    try:
+        fh = io.StringIO(doc_text) if doc_text is not None else open(filepath, encoding="utf-8")
+    except OSError as e:
+        log.error("Failed to read %s: cannot open %s: %s", filepath, filepath, e)
+        return
+
+    with fh:
+        eof = False
+        while not eof:
+            try:
+                window = fh.read(window_chars)
+            except (OSError, UnicodeDecodeError) as e:
+                log.error("Failed to read %s: %s", filepath, e)
+                return
+            eof = not window
+            text += window
+
+            # tokenize up to the last whitespace (everything, at EOF)
+            cut = len(text) if eof else max(text.rfind(c) for c in " \n\t")
+            if cut <= tokenized - text_start:
+                continue # no whitespace yet: keep reading
+            _, new = embedder.encode_offsets(text[tokenized - text_start:cut])
+            spans.extend((s + tokenized, e + tokenized) for s, e in new)
+            tokenized = text_start + cut
+            total = first + len(spans)
+
+            if eof and not emitted and total <= max_tokens: # doc is single chunk
+                if text.strip():
+                    yield make(0, total, 0, len(text))
+                    emitted = True
+                break
+
+            # emit every window that is final: more tokens follow it, or EOF
+            while next_start < total and (eof or total - next_start > max_tokens):
+                end = min(next_start + max_tokens, total)
+                if boundary is not None and end < total: # back off to the last unit boundary
+                    for split in range(end, next_start, -1):
+                        prev_end, next_begin = spans[split - first - 1][1], spans[split - first][0]
+                        gap = text[prev_end - text_start:next_begin - text_start]
+                        if boundary(text[max(prev_end - 8, text_start) - text_start:prev_end - text_start], gap):
+                            end = split
+                            break
+                s, e = spans[next_start - first][0], spans[end - first - 1][1]
+                chunk_data, chunk_text = make(next_start, end, s, e)
+                if chunk_text.strip():
+                    yield chunk_data, chunk_text
+                    emitted = True
+                else:
+                    log.warning("Empty chunk within %s: %s...", filepath, text[:30])
+                if end == total: # later windows would be suffixes of this one
+                    next_start = total
+                    break
+                next_start = end if boundary is not None else next_start + step
+
+            # drop tokens and text before the next chunk (kept until then for the single-chunk case)
+            if emitted:
+                del spans[:next_start - first]
+                first = next_start
+                keep = spans[0][0] if spans else tokenized
+                text, text_start = text[keep - text_start:], keep
+
+    if not emitted:
+        if not text.strip():
+            log.warning("Empty file: %s", filepath)
+        else:
+            log.warning("No chunks generated for %s", filepath)
 
 
 # --- progress bar ---
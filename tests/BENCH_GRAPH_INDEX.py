@@ -0,0 +1,145 @@
+"""
+GraphIndex benchmarks.
+
+run from the directory containing nexus:
+    python -m nexus.tests.BENCH_GRAPH_INDEX [n_claims]
+"""
+
+from ..src.state import GraphIndex
+from ..src._schemas import RelationshipRecord, ClaimRecord
+from ._logger import TEST_LOG
+
+from pathlib import Path
+from collections import Counter
+import tempfile
+import random
+import time
+import sys
+
+
+def _claims(n: int, n_entities: int = 2_000, seed: int = 7) -> list[tuple]:
+    """deterministic mix of entity (60%) and relationship (40%) claims"""
+    rng = random.Random(seed)
+    names = [f"entity_{i}" for i in range(n_entities)]
+    out = []
+    for i in range(n):
+        if rng.random() < 0.6:
+            out.append((f"claim {i}", rng.choice(names), None))
+        else:
+            src, tgt = rng.sample(names, 2)
+            out.append((f"claim {i}", None, RelationshipRecord(source_name=src, target_name=tgt)))
+    return out
+
+
+def bench_claim_upserts(n: int = 100_000, persistent: bool = True, group: int = 1) -> float:
+    """
+    Upsert n claims one call at a time; returns claims/sec.
+    group > 1 wraps every `group` calls in one transaction() scope.
+    """
+    claims = _claims(n)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = GraphIndex(Path(tmp) / "graph.sqlite", persistent=persistent)
+        t0 = time.perf_counter()
+        for i in range(0, n, group):
+            if group > 1:
+                with index.transaction():
+                    for content, entity, rel in claims[i : i + group]:
+                        index.upsert_claim(content=content, source="bench", entity_name=entity, relationship=rel)
+            else:
+                content, entity, rel = claims[i]
+                index.upsert_claim(content=content, source="bench", entity_name=entity, relationship=rel)
+        elapsed = time.perf_counter() - t0
+        index.close()
+    return n / elapsed
+
+
+def bench_claim_upserts_bulk(n: int = 100_000, batch: int = 10_000) -> float:
+    """Upsert n claims through upsert_claims_bulk in batches; returns claims/sec."""
+    claims = [
+        ClaimRecord(content=content, source="bench", entity_name=entity, relationship=rel)
+        for content, entity, rel in _claims(n)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        index = GraphIndex(Path(tmp) / "graph.sqlite")
+        t0 = time.perf_counter()
+        for i in range(0, n, batch):
+            index.upsert_claims_bulk(claims[i : i + batch])
+        elapsed = time.perf_counter() - t0
+        index.close()
+    return n / elapsed
+
+
+def bench_neighborhood(n: int = 100_000, depth: int = 3, repeat: int = 20) -> tuple[float, int]:
+    """Expand `depth` hops around the busiest entity; returns (ms per call, nodes reached)."""
+    claims = [
+        ClaimRecord(content=content, source="bench", entity_name=entity, relationship=rel)
+        for content, entity, rel in _claims(n, n_entities=20_000)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        index = GraphIndex(Path(tmp) / "graph.sqlite")
+        for i in range(0, n, 10_000):
+            index.upsert_claims_bulk(claims[i : i + 10_000])
+        degree = Counter(
+            name for c in claims if c.relationship
+            for name in (c.relationship.source_name, c.relationship.target_name)
+        )
+        hub = degree.most_common(1)[0][0]
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            subgraph = index.load_neighborhood(hub, depth=depth)
+        elapsed = time.perf_counter() - t0
+        index.close()
+    return elapsed / repeat * 1000, len(subgraph.nodes)
+
+
+def bench_search_claims(n: int = 1_000_000, repeat: int = 200) -> tuple[float, float]:
+    """
+    Keyword lookups over n synthetic claims; returns (ms per search_claims call,
+    ms per equivalent LIKE scan).
+    """
+    rng = random.Random(11)
+    vocab = [f"term{i}" for i in range(50_000)]
+    claims = [
+        ClaimRecord(content=" ".join(rng.choices(vocab, k=12)), source="bench", entity_name=f"entity_{i % 20_000}")
+        for i in range(n)
+    ]
+    queries = [" ".join(rng.sample(vocab, 2)) for _ in range(repeat)]
+    with tempfile.TemporaryDirectory() as tmp:
+        index = GraphIndex(Path(tmp) / "graph.sqlite")
+        for i in range(0, n, 50_000):
+            index.upsert_claims_bulk(claims[i : i + 50_000])
+        t0 = time.perf_counter()
+        for q in queries:
+            index.search_claims(q, limit=10)
+        fts = (time.perf_counter() - t0) / repeat * 1000
+        with index._conn() as con:
+            t0 = time.perf_counter()
+            for q in queries[:5]:
+                a, b = q.split()
+                con.execute(
+                    "SELECT id FROM claims WHERE content LIKE ? AND content LIKE ? LIMIT 10;",
+                    (f"%{a}%", f"%{b}%")
+                ).fetchall()
+            like = (time.perf_counter() - t0) / 5 * 1000
+        index.close()
+    return fts, like
+
+
+def run(n: int = 100_000):
+    TEST_LOG.info("claim upserts (n=%s)", n)
+    per_call = bench_claim_upserts(n, persistent=False)
+    TEST_LOG.info("  per-call connections      : %10.0f claims/s", per_call)
+    pooled = bench_claim_upserts(n, persistent=True)
+    TEST_LOG.info("  pooled connection         : %10.0f claims/s (x%.1f)", pooled, pooled / per_call)
+    grouped = bench_claim_upserts(n, persistent=True, group=1_000)
+    TEST_LOG.info("  pooled + transaction(1000): %10.0f claims/s (x%.1f)", grouped, grouped / per_call)
+    bulk = bench_claim_upserts_bulk(n)
+    TEST_LOG.info("  upsert_claims_bulk(10000) : %10.0f claims/s (x%.1f)", bulk, bulk / per_call)
+    ms, reached = bench_neighborhood(n)
+    TEST_LOG.info("load_neighborhood(depth=3)   : %10.1f ms (%s nodes)", ms, reached)
+    fts, like = bench_search_claims(10 * n)
+    TEST_LOG.info("search_claims (n=%s)    : %10.2f ms (LIKE scan: %.1f ms)", 10 * n, fts, like)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,137 @@
+"""
+VectorIndex benchmarks: recall@k vs latency vs memory per index type, and
+cold-start time / resident memory of query workers loading vs mapping the index.
+
+run from the directory containing nexus:
+    python -m nexus.tests.BENCH_VECTOR_INDEX [n_vectors]
+"""
+
+from ..src.state import VectorIndex
+from ..config import VectorDBConfig
+from ._logger import TEST_LOG
+
+from pathlib import Path
+import multiprocessing as mp
+import tempfile
+import time
+import sys
+
+import faiss
+import numpy as np
+
+
+def _vectors(n: int, d: int = 384, n_topics: int = 500, seed: int = 7) -> np.ndarray:
+    """clustered unit vectors (topic centre + noise), closer to sentence embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((n_topics, d)).astype(np.float32)
+    x = centres[rng.integers(0, n_topics, n)] + 0.15 * rng.standard_normal((n, d)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def bench_index(index_type: str, data: np.ndarray, queries: np.ndarray, truth: np.ndarray, k: int = 10,
+                **cfg) -> tuple[float, float, float, float]:
+    """
+    Build a VectorIndex of index_type over data and run queries one at a time;
+    returns (build s, recall@k against truth, ms per query, index MB).
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        config = VectorDBConfig(stage_dir=Path(tmp), index_type=index_type, **cfg)
+        t0 = time.perf_counter()
+        index = VectorIndex(config, data.shape[1], rebuild=True)
+        for i in range(0, len(data), 10_000):
+            index.add_vectors(data[i : i + 10_000])
+        index.train() # corpora below ivf_train_size
+        build = time.perf_counter() - t0
+
+        found = []
+        t0 = time.perf_counter()
+        for q in queries:
+            found.append(index.search(q, k)[1][0])
+        ms = (time.perf_counter() - t0) / len(queries) * 1000
+
+        recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+        mb = faiss.serialize_index(index.index).nbytes / 2**20
+    return build, recall, ms, mb
+
+
+def _memory_mb() -> tuple[float, float]:
+    """(RSS, PSS) of this process in MB; PSS splits shared pages between the processes mapping them"""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as fh:
+        for line in fh:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return fields["Rss"], fields["Pss"]
+
+
+def _worker(stage_dir: str, index_type: str, dimension: int, mmap: bool, queries: np.ndarray, barrier, out) -> None:
+    """query worker: open the index, search, then report (open s, RSS MB, PSS MB) once every worker is resident"""
+    rss0, pss0 = _memory_mb()
+    t0 = time.perf_counter()
+    config = VectorDBConfig(stage_dir=Path(stage_dir), index_type=index_type, rebuild=False)
+    index = VectorIndex(config, dimension, rebuild=False, mmap=mmap)
+    opened = time.perf_counter() - t0
+    for q in queries:
+        index.search(q, 10)
+    barrier.wait()
+    rss, pss = _memory_mb()
+    barrier.wait() # keep the index mapped until every worker has measured
+    out.put((opened, rss - rss0, pss - pss0))
+
+
+def bench_startup(index_type: str, data: np.ndarray, queries: np.ndarray, workers: int = 4,
+                  mmap: bool = False) -> tuple[float, float, float]:
+    """
+    Save an index over data, then start `workers` processes that each open it
+    and run queries; returns (mean open s, mean RSS MB, mean PSS MB) added by the index per worker.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        config = VectorDBConfig(stage_dir=Path(tmp), index_type=index_type, ivf_nlist=1024)
+        index = VectorIndex(config, data.shape[1], rebuild=True)
+        for i in range(0, len(data), 10_000):
+            index.add_vectors(data[i : i + 10_000])
+        index.train()
+        index.save()
+        del index
+
+        ctx = mp.get_context("spawn")
+        barrier, out = ctx.Barrier(workers), ctx.Queue()
+        procs = [ctx.Process(target=_worker, args=(tmp, index_type, data.shape[1], mmap, queries, barrier, out))
+                 for _ in range(workers)]
+        for p in procs:
+            p.start()
+        results = [out.get() for _ in procs]
+        for p in procs:
+            p.join()
+    return tuple(float(np.mean(col)) for col in zip(*results))
+
+
+def run(n: int = 100_000, k: int = 10, n_queries: int = 200):
+    data = _vectors(n + n_queries)
+    data, queries = data[:n], data[n:] # queries from the same topics
+    flat = faiss.IndexFlatL2(data.shape[1])
+    flat.add(data)
+    truth = flat.search(queries, k)[1]
+
+    TEST_LOG.info("recall@%s vs latency vs memory (n=%s, d=%s, %s queries)", k, n, data.shape[1], n_queries)
+    runs = [("flat", {})]
+    runs += [("hnsw", {"hnsw_ef_search": ef}) for ef in (16, 50, 128)]
+    runs += [("ivf", {"ivf_nprobe": p}) for p in (1, 8, 32)]
+    runs += [("ivfpq", {"ivf_nprobe": p, "pq_m": m}) for m in (16, 48) for p in (8, 32)]
+    for index_type, cfg in runs:
+        build, recall, ms, mb = bench_index(index_type, data, queries, truth, k, ivf_nlist=1024, **cfg)
+        label = f"{index_type} {' '.join(f'{key}={value}' for key, value in cfg.items())}"
+        TEST_LOG.info("  %-32s: recall %.3f  %7.3f ms/query  %8.1f MB  (build %.1f s)", label, recall, ms, mb, build)
+
+    workers = 4
+    TEST_LOG.info("query worker startup, %s workers (index memory per worker)", workers)
+    for index_type in ("flat", "hnsw", "ivf"):
+        for mmap in (False, True):
+            opened, rss, pss = bench_startup(index_type, data, queries[:20], workers, mmap)
+            TEST_LOG.info("  %-5s %-10s: open %7.3f s  RSS %7.1f MB  PSS %7.1f MB",
+                index_type, "mmap" if mmap else "read_index", opened, rss, pss)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
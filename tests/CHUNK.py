@@ -0,0 +1,95 @@
+from ..src.util import chunk, iter_chunks, fetch_doc
+
+from pathlib import Path
+import re
+
+
+class _WordTokenizer:
+    """stand-in for Embedder: one token per non-space run, with char offsets"""
+    def encode_offsets(self, text: str) -> tuple[list[int], list[tuple[int, int]]]:
+        spans = [m.span() for m in re.finditer(r"\S+", text)]
+        return list(range(len(spans))), spans
+
+
+class _SubwordTokenizer:
+    """stand-in for a WordPiece-style tokenizer: pre-split on whitespace/punctuation, then <= 3-char pieces"""
+    def encode_offsets(self, text: str) -> tuple[list[int], list[tuple[int, int]]]:
+        spans = [
+            (start, min(start + 3, m.end()))
+            for m in re.finditer(r"\w+|[^\w\s]", text)
+            for start in range(m.start(), m.end(), 3)
+        ]
+        return list(range(len(spans))), spans
+
+
+def test_chunk_offsets_are_exact(tmp_path: Path):
+    doc = tmp_path / "doc.txt"
+    words = [("x" * (i % 7 + 1)) + ("é" * (i % 3)) for i in range(100)]
+    doc.write_text("  " + "  \n ".join(words) + "\n\n", encoding="utf-8")
+
+    chunks, texts = chunk(doc, 7, _WordTokenizer(), max_tokens=30, overlap=5)
+    assert [(c.start_token, c.end_token) for c in chunks] == [(0, 30), (25, 55), (50, 80), (75, 100)]
+    for c, text in zip(chunks, texts):
+        assert fetch_doc(doc, c.start_char, c.end_char) == text
+        assert text.split() == words[c.start_token:c.end_token]
+        assert c.document_id == 7
+
+    single, texts = chunk(doc, 7, _WordTokenizer(), max_tokens=100, overlap=5)
+    assert len(single) == 1 and texts[0] == fetch_doc(doc)
+
+
+def test_iter_chunks_streams_in_windows(tmp_path: Path):
+    doc = tmp_path / "doc.txt"
+    doc.write_text(" ".join(f"w{i}" + "\n" * (i % 5 == 0) for i in range(2000)), encoding="utf-8")
+
+    whole = chunk(doc, 1, _WordTokenizer(), max_tokens=64, overlap=8)
+    for window_chars in (7, 100, 1000):
+        streamed = list(iter_chunks(doc, 1, _WordTokenizer(), max_tokens=64, overlap=8, window_chars=window_chars))
+        assert [c for c, _ in streamed] == whole[0]
+        assert [t for _, t in streamed] == whole[1]
+
+    # a short document is still one chunk spanning the whole text
+    short = tmp_path / "short.txt"
+    short.write_text(" a b c ", encoding="utf-8")
+    [(c, text)] = iter_chunks(short, 2, _WordTokenizer(), max_tokens=64, overlap=8, window_chars=2)
+    assert (c.start_char, c.end_char, text) == (0, 7, " a b c ")
+    assert list(iter_chunks(tmp_path / "missing.txt", 3, _WordTokenizer())) == []
+
+
+def test_iter_chunks_with_subword_tokens(tmp_path: Path):
+    doc = tmp_path / "doc.txt"
+    doc.write_text(" ".join(f"Wörterbuch{i}, (idx-{i % 13})." + "\n" * (i % 7 == 0) for i in range(500)), encoding="utf-8")
+    tok = _SubwordTokenizer()
+
+    # windows cut mid-word and between word pieces; the chunks still match whole-text tokenization
+    whole = chunk(doc, 1, tok, max_tokens=50, overlap=10)
+    assert len(whole[0]) > 10
+    for window_chars in (5, 97, 4096):
+        streamed = list(iter_chunks(doc, 1, tok, max_tokens=50, overlap=10, window_chars=window_chars))
+        assert [c for c, _ in streamed] == whole[0]
+        assert [t for _, t in streamed] == whole[1]
+
+
+def test_sentence_and_paragraph_chunkers(tmp_path: Path):
+    doc = tmp_path / "doc.txt"
+    paragraphs = [
+        " ".join(f"p{p}s{s} " + "word " * ((p + s) % 4) + "end." for s in range(5))
+        for p in range(6)
+    ]
+    doc.write_text("\n\n".join(paragraphs) + "\n", encoding="utf-8")
+    tok = _WordTokenizer()
+
+    for chunker, unit in (("sentences", r"p\d+s\d+ .*?end\."), ("paragraphs", r"p\d+s0 .*?p\d+s4 .*?end\.")):
+        for window_chars in (16, 1 << 20):
+            streamed = list(iter_chunks(doc, 1, tok, max_tokens=20, overlap=5, chunker=chunker, window_chars=window_chars))
+            units = [m.group() for m in re.finditer(unit, fetch_doc(doc), re.S)]
+            # whole units, packed in order, no overlap, none over budget
+            assert [u for _, text in streamed for u in re.findall(unit, text, re.S)] == units
+            assert all(c.end_token - c.start_token <= 20 for c, _ in streamed)
+            assert all(a.end_token == b.start_token for (a, _), (b, _) in zip(streamed, streamed[1:]))
+
+    # a sentence longer than max_tokens is cut at max_tokens
+    long = tmp_path / "long.txt"
+    long.write_text("a " * 50 + "end. short one.", encoding="utf-8")
+    chunks, _ = chunk(long, 2, tok, max_tokens=20, overlap=0, chunker="sentences")
+    assert [(c.start_token, c.end_token) for c in chunks] == [(0, 20), (20, 40), (40, 53)]
@@ -0,0 +1,72 @@
+from ..src.state import DocStore
+from ..src.util import fetch_doc
+
+from pathlib import Path
+import random
+
+
+def test_doc_store_matches_fetch_doc(tmp_path: Path):
+    rng = random.Random(0)
+    alphabet = "ab \né中\U0001f600" # 1- to 4-byte UTF-8
+    doc = tmp_path / "doc.txt"
+    doc.write_bytes("".join(rng.choice(alphabet) for _ in range(5000)).replace("\n", "\r\n").encode("utf-8"))
+    store = DocStore(tmp_path / "docs", cache_size=8)
+    store.add(doc)
+
+    n = len(fetch_doc(doc))
+    ranges = [(None, None), (0, 0), (10, 5), (0, n), (n - 3, n + 50), (n + 5, n + 10), (1023, 1025), (2048, 3072)]
+    ranges += [tuple(sorted(rng.sample(range(n + 20), 2))) for _ in range(200)]
+    for start, end in ranges:
+        assert store.fetch(doc, start, end) == fetch_doc(doc, start, end), (start, end)
+
+    # served from the stored copy, re-pointed when the source changes (the old copy is deleted);
+    # identical content is stored once
+    doc.write_text("changed", encoding="utf-8")
+    assert store.fetch(doc, 0, 5) != "chang"
+    store.add(doc)
+    assert store.fetch(doc, 0, 5) == "chang"
+    (tmp_path / "copy.txt").write_text("changed", encoding="utf-8")
+    store.add(tmp_path / "copy.txt")
+    assert len(list((tmp_path / "docs").glob("*/*.txt"))) == 1
+
+    # documents never added are read from disk; a fresh store sees earlier adds
+    other = tmp_path / "other.txt"
+    other.write_text("plain file", encoding="utf-8")
+    assert not store.has(other) and store.fetch(other, 6, 10) == "file"
+    assert DocStore(tmp_path / "docs").fetch(tmp_path / "copy.txt", 2, 4) == "an"
+
+
+def test_doc_store_removes_unreferenced_copies(tmp_path: Path):
+    docs = []
+    for i, text in enumerate(["first", "second", "second"]): # 1 and 2 share a copy
+        docs.append(tmp_path / f"doc_{i}.txt")
+        docs[-1].write_text(text, encoding="utf-8")
+    store = DocStore(tmp_path / "docs")
+    for doc in docs:
+        store.add(doc)
+    copies = lambda: len(list((tmp_path / "docs").glob("*/*.txt")))
+    assert copies() == 2
+
+    assert store.fetch(docs[1], 0, 3) == "sec"
+    assert store.remove([docs[1]]) == 0 # still referenced by doc_2
+    assert store.remove([docs[2], tmp_path / "unknown.txt"]) == 1
+    assert copies() == 1 and not store.has(docs[1])
+
+    # re-pointing a path releases its old copy
+    docs[0].write_text("first, edited", encoding="utf-8")
+    store.add(docs[0])
+    assert copies() == 1 and store.fetch(docs[0], 0, 6) == "first,"
+
+    # another instance (e.g. a builder process) changing the store invalidates the path memo and LRU
+    builder = DocStore(tmp_path / "docs")
+    docs[0].write_text("rewritten", encoding="utf-8")
+    builder.add(docs[0])
+    assert store.fetch(docs[0], 0, 6) == "rewrit"
+    builder.remove([docs[0]])
+    docs[0].unlink()
+    assert not store.has(docs[0]) and copies() == 0
+
+    store.add(docs[1])
+    store.drop()
+    assert copies() == 0 and not store.has(docs[1])
+    assert store.fetch(docs[1], 0, 3) == "sec" # read from the source again
@@ -0,0 +1,56 @@
+from ..src import embed as embed_module
+from ..src.state import EmbeddingCache
+from ..src.embed import Embedder
+from .GRAPH_INDEX import _bag_of_words
+
+from pathlib import Path
+import numpy as np
+import sentence_transformers
+
+
+class _Tokenizer:
+    """stand-in for embed.Tokenizer: no tokenizer download"""
+    def __init__(self, embed_model: str):
+        self.tokenizer = None
+
+
+def test_embedding_cache_computes_only_misses(tmp_path: Path, monkeypatch):
+    calls = []
+
+    class _Model:
+        """stand-in for SentenceTransformer: records what it encodes"""
+        def __init__(self, embed_model: str):
+            pass
+
+        def get_sentence_embedding_dimension(self) -> int:
+            return 64
+
+        def encode(self, texts, **kwargs):
+            calls.append(list(texts))
+            return _bag_of_words(list(texts))
+
+    monkeypatch.setattr(sentence_transformers, "SentenceTransformer", _Model)
+    monkeypatch.setattr(embed_module, "Tokenizer", _Tokenizer)
+
+    def embedder(model: str = "m") -> Embedder:
+        return Embedder(model, 32, cache_dir=tmp_path)
+
+    texts = ["alpha beta", "gamma", "alpha beta", "delta"]
+    first = embedder().embed(texts)
+    assert calls == [["alpha beta", "gamma", "delta"]] # duplicates embedded once
+    assert np.allclose(first, _bag_of_words(texts))
+
+    again = embedder().embed(["delta", "epsilon", "gamma"]) # fresh instance: cache is on disk
+    assert calls[1:] == [["epsilon"]]
+    assert np.array_equal(again[[0, 2]], first[[3, 1]])
+
+    embedder("other-model").embed(["gamma"]) # keys are per model
+    assert calls[2:] == [["gamma"]]
+
+    # a torn trailing row (crash mid-append) is dropped on the next append
+    cache = EmbeddingCache(tmp_path, "m", 64)
+    with cache.matrix_path.open("ab") as fh:
+        fh.write(b"\0" * 10)
+    cache.put_many([EmbeddingCache.key("zeta")], _bag_of_words(["zeta"]))
+    assert cache.size() == 5
+    assert np.allclose(cache.get_many([EmbeddingCache.key("zeta")])[EmbeddingCache.key("zeta")], _bag_of_words(["zeta"])[0])
@@ -0,0 +1,360 @@
+from ..src.state import GraphIndex, GraphSnapshot, GraphVectorIndex
+from ..src._schemas import (
+    RelationshipRecord,
+    EntityRecord,
+    ClaimRecord,
+    RelationshipCollisionError
+)
+from ..config import VectorDBConfig
+
+from pathlib import Path
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import zlib
+
+
+def test_transaction_nesting(tmp_path: Path):
+    index = GraphIndex(tmp_path / "graph.sqlite")
+
+    with index.transaction():
+        index.upsert_claim(content="kept", source="test", entity_name="A")
+        try:
+            with index.transaction():
+                index.upsert_claim(content="dropped", source="test", entity_name="B")
+                raise RuntimeError("inner failure")
+        except RuntimeError:
+            pass
+        index.upsert_claim(
+            content="kept too", source="test",
+            relationship=RelationshipRecord(source_name="A", target_name="C")
+        )
+
+    # inner scope rolled back to its savepoint; outer scope committed once
+    assert index.list_all_entities() == ["A", "C"]
+    assert [c.content for c in index.load_entity_claims("A")] == ["kept"]
+    assert len(index.load_relationship_claims("A", "C")) == 1
+    index.close()
+
+
+def test_per_call_connections_match_pooled(tmp_path: Path):
+    pooled = GraphIndex(tmp_path / "pooled.sqlite")
+    per_call = GraphIndex(tmp_path / "per_call.sqlite", persistent=False)
+    for index in (pooled, per_call):
+        index.upsert_claim(content="x", source="test", entity_name="A")
+        index.upsert_alias("A", "Alpha")
+        index.upsert_claim(content="y", source="test", entity_name="Alpha")
+    assert pooled.list_all_entities() == per_call.list_all_entities()
+    assert len(pooled.load_entity_claims("A")) == len(per_call.load_entity_claims("A")) == 2
+
+
+def test_bulk_matches_row_at_a_time(tmp_path: Path):
+    claims = [
+        ClaimRecord(content="a1", source="doc", entity_name="A", claim_date="2020"),
+        ClaimRecord(content="ab", source="doc", relationship=RelationshipRecord(source_name="A", target_name="B")),
+        ClaimRecord(content="ba", source="doc", relationship=RelationshipRecord(source_name="B", target_name="A")),
+        ClaimRecord(content="self", source="doc", relationship=RelationshipRecord(source_name="Alpha", target_name="A")),
+    ]
+
+    row = GraphIndex(tmp_path / "row.sqlite")
+    bulk = GraphIndex(tmp_path / "bulk.sqlite")
+    for index in (row, bulk):
+        index.upsert_entity("A", "ORG")
+        index.upsert_alias("A", "Alpha")
+
+    row.upsert_entity("B", "PERSON")
+    for c in claims:
+        try:
+            row.upsert_claim(c.content, c.source, entity_name=c.entity_name,
+                relationship=c.relationship, claim_date=c.claim_date)
+        except RelationshipCollisionError:
+            row.upsert_claim(c.content, c.source, entity_name=c.relationship.source_name)
+
+    with pytest.raises(RelationshipCollisionError):
+        bulk.upsert_claims_bulk(claims)
+    assert bulk.list_all_entities() == ["A"] # nothing written
+
+    assert bulk.upsert_entities_bulk([EntityRecord("B", None), EntityRecord("B", "PERSON")]).keys() == {"B"}
+    ids = bulk.upsert_claims_bulk(claims, on_collision="source")
+    assert len(ids) == len(set(ids)) == len(claims)
+
+    assert row.list_all_entities() == bulk.list_all_entities()
+    for name in ("A", "Alpha", "B"):
+        assert sorted(c.content for c in row.load_entity_claims(name)) == \
+               sorted(c.content for c in bulk.load_entity_claims(name))
+    assert len(bulk.load_relationships("A")) == 1
+    assert sorted(c.content for c in bulk.load_relationship_claims("A", "B")) == ["ab", "ba"]
+    assert [c.claim_date for c in bulk.load_entity_claims("A") if c.content == "a1"] == ["2020-01-01 00:00:00"]
+
+
+def test_alias_cache_write_through_and_invalidation(tmp_path: Path):
+    path = tmp_path / "graph.sqlite"
+    index = GraphIndex(path)
+    other = GraphIndex(path) # separate connections, stands in for another process
+
+    index.upsert_entity("Federal Bureau of Investigation")
+    assert index.resolve_alias("FBI") == "FBI"
+
+    # write-through
+    index.upsert_alias("Federal Bureau of Investigation", "FBI")
+    assert index.resolve_alias("FBI") == "Federal Bureau of Investigation"
+
+    # foreign writes are caught by the generation counter
+    assert other.resolve_alias("FBI") == "Federal Bureau of Investigation"
+    other.delete_alias("Federal Bureau of Investigation", "FBI")
+    assert index.resolve_alias("FBI") == "FBI"
+    other.upsert_alias("Federal Bureau of Investigation", "The Bureau")
+    assert index.resolve_aliases(["The Bureau", "FBI", "x"]) == {
+        "The Bureau": "Federal Bureau of Investigation", "FBI": "FBI", "x": "x"
+    }
+
+    # rolled-back write-through is discarded
+    with pytest.raises(RuntimeError):
+        with index.transaction():
+            index.upsert_alias("Federal Bureau of Investigation", "Feds")
+            assert index.resolve_alias("Feds") == "Federal Bureau of Investigation"
+            raise RuntimeError("abort")
+    assert index.resolve_alias("Feds") == "Feds"
+
+    index.delete_entity("Federal Bureau of Investigation")
+    assert other.resolve_alias("The Bureau") == "The Bureau"
+
+
+def test_alias_cache_hides_uncommitted_writes(tmp_path: Path):
+    index = GraphIndex(tmp_path / "graph.sqlite")
+    index.upsert_entity("X")
+    index.upsert_entity("Y")
+    reader = ThreadPoolExecutor(max_workers=1) # one long-lived reader thread (and connection)
+    def read() -> tuple[str, str]:
+        return reader.submit(lambda: (index.resolve_alias("Z"), index.resolve_alias("W"))).result()
+    assert read() == ("Z", "W")
+
+    with pytest.raises(RuntimeError):
+        with index.transaction():
+            index.upsert_alias("X", "Z")
+            assert index.resolve_alias("Z") == "X" # the writer sees its own writes
+            assert read() == ("Z", "W") # other threads don't, while the transaction is open
+            raise RuntimeError("abort")
+    assert index.resolve_alias("Z") == "Z" and read() == ("Z", "W") # nor after it rolled back
+
+    with index.transaction():
+        index.upsert_alias("X", "Z")
+        with pytest.raises(RuntimeError): # a rolled-back savepoint keeps the rest of the transaction
+            with index.transaction():
+                index.upsert_alias("Y", "W")
+                raise RuntimeError("abort")
+        assert index.resolve_alias("Z") == "X" and index.resolve_alias("W") == "W"
+        assert read() == ("Z", "W")
+    assert index.resolve_alias("Z") == "X" and read() == ("X", "W")
+    reader.shutdown()
+
+
+def _edges(subgraph) -> set[tuple]:
+    return {(e.source_name, e.target_name, e.directed, e.claim_count) for e in subgraph.edges}
+
+
+def test_neighborhood_and_shortest_path(tmp_path: Path):
+    index = GraphIndex(tmp_path / "graph.sqlite")
+    rel = lambda s, t, strength=1.0, directed=False: RelationshipRecord(s, t, strength, directed)
+    index.upsert_claims_bulk([
+        ClaimRecord(content="a", entity_name="A"),
+        ClaimRecord(content="alpha", entity_name="Alpha"),
+        ClaimRecord(content="ab", relationship=rel("A", "B")),
+        ClaimRecord(content="alpha-b", relationship=rel("Alpha", "B")),
+        ClaimRecord(content="bc", relationship=rel("B", "C", 0.2)),
+        ClaimRecord(content="cd", relationship=rel("C", "D", directed=True)),
+        ClaimRecord(content="ed", relationship=rel("E", "D", directed=True)),
+    ])
+    index.upsert_alias("A", "Alpha") # Alpha is also an entity: its rows fold into A
+
+    sub = index.load_neighborhood("Alpha", depth=2)
+    assert [(n.name, n.depth, n.claim_count) for n in sub.nodes] == [("A", 0, 2), ("B", 1, 0), ("C", 2, 0)]
+    assert _edges(sub) == {("A", "B", False, 2), ("B", "C", False, 1)}
+
+    assert [n.name for n in index.load_neighborhood("A", depth=5).nodes] == ["A", "B", "C", "D", "E"]
+    assert [n.name for n in index.load_neighborhood("A", depth=5, min_strength=0.5).nodes] == ["A", "B"]
+    assert [n.name for n in index.load_neighborhood("C", depth=5, directed=True).nodes] == ["C", "D"]
+    assert [n.name for n in index.load_neighborhood("A", depth=5, limit=2).nodes] == ["A", "B"]
+
+    path = index.load_shortest_path("Alpha", "E")
+    assert [n.name for n in path.nodes] == ["A", "B", "C", "D", "E"]
+    assert [(e.source_name, e.target_name) for e in path.edges] == [("A", "B"), ("B", "C"), ("C", "D"), ("E", "D")]
+    assert index.load_shortest_path("A", "E", max_depth=3) is None
+    assert index.load_shortest_path("A", "E", directed=True) is None
+
+
+def test_document_provenance(tmp_path: Path):
+    index = GraphIndex(tmp_path / "graph.sqlite")
+    index.upsert_claims_bulk([
+        ClaimRecord(content="a1", entity_name="A", document_id=1),
+        ClaimRecord(content="a2", entity_name="Alpha", document_id=1),
+        ClaimRecord(content="bc", relationship=RelationshipRecord("B", "C", 1.0, False), document_id=1),
+        ClaimRecord(content="cd", relationship=RelationshipRecord("C", "D", 1.0, False), document_id=2),
+        ClaimRecord(content="e", entity_name="E"),
+    ])
+    index.upsert_claim(content="d", source="test", entity_name="D", document_id=2)
+    index.upsert_alias("A", "Alpha")
+
+    assert index.load_document_entities([1, 2, 3]) == {
+        1: {"A": 2, "B": 1, "C": 1},
+        2: {"C": 1, "D": 2},
+    }
+    claims = index.load_document_claims([1, 2], limit_per_document=2)
+    assert [c.content for c in claims[1]] == ["a1", "a2"]
+    assert [(c.content, c.entities) for c in claims[2]] == [("cd", ["C", "D"]), ("d", ["D"])]
+
+    # several seeds expand together; depth counts from the nearest seed
+    sub = index.load_neighborhood(["A", "D"], depth=1)
+    assert [(n.name, n.depth) for n in sub.nodes] == [("A", 0), ("D", 0), ("C", 1)]
+
+
+def test_snapshot_and_algorithms(tmp_path: Path):
+    index = GraphIndex(tmp_path / "graph.sqlite")
+    rel = lambda s, t, strength=1.0, directed=False: RelationshipRecord(s, t, strength, directed)
+    index.upsert_relationships_bulk([
+        rel("A", "B"), rel("Alpha", "B", 0.5), rel("B", "C"), rel("C", "A"),
+        rel("C", "D", directed=True), rel("E", "F"),
+    ])
+    index.upsert_entity("G", "PERSON")
+    index.upsert_alias("A", "Alpha")
+
+    snap = index.snapshot()
+    assert snap.names.tolist() == ["A", "B", "C", "D", "E", "F", "G"] # Alpha folded into A
+    assert snap.entity_types[snap.position("G")] == "PERSON"
+    assert sorted(snap.neighbors("A")) == ["B", "C"]
+    assert snap.neighbors("D") == []
+    assert snap.strength[snap.indptr[0]] == 1.0 # max over parallel A-B rows
+    assert snap.degree("all").tolist() == [2, 2, 3, 1, 1, 1, 0]
+
+    components = snap.connected_components()
+    assert components.tolist() == [0, 0, 0, 0, 1, 1, 2]
+    assert snap.k_core(2) == ["A", "B", "C"]
+
+    rank = snap.pagerank()
+    assert abs(rank.sum() - 1.0) < 1e-6
+    pos = snap.position
+    assert rank[pos("D")] > rank[pos("G")] # fed by C vs. teleport only
+    assert abs(rank[pos("E")] - rank[pos("F")]) < 1e-9
+    assert snap.top(rank, 7)[-1][0] == "G"
+
+    path = snap.save(tmp_path / "graph_snapshot.npz")
+    loaded = GraphSnapshot.load(path)
+    assert loaded.names.tolist() == snap.names.tolist()
+    assert loaded.indices.tolist() == snap.indices.tolist()
+    assert (loaded.pagerank() == rank).all()
+
+
+def test_search_claims(tmp_path: Path):
+    index = GraphIndex(tmp_path / "graph.sqlite")
+    index.upsert_claims_bulk([
+        ClaimRecord(content="The budget was cut in 2020.", entity_name="FBI"),
+        ClaimRecord(content="Budgets are public.", entity_name="Treasury"),
+        ClaimRecord(content="Shares a budget line with the FBI.", entity_name="Bureau"),
+        ClaimRecord(content="Signed a budget agreement.", relationship=RelationshipRecord("Congress", "Bureau")),
+        ClaimRecord(content='Odd "quotes" AND -operators', entity_name="Treasury"),
+    ])
+
+    assert [c.content for c in index.search_claims("budget cut")] == ["The budget was cut in 2020."]
+    assert len(index.search_claims("budget")) == 4 # porter: budgets -> budget
+    # entity names are indexed too
+    assert sorted(c.entities[0] for c in index.search_claims("fbi budget")) == ["Bureau", "FBI"]
+    assert [c.content for c in index.search_claims('"quotes" AND -operators')] == ['Odd "quotes" AND -operators']
+    assert index.search_claims("?!") == []
+
+    # entity filter is alias-expanded and covers relationship claims
+    index.upsert_alias("Treasury", "Bureau")
+    hits = index.search_claims("budget", entity="Treasury")
+    assert sorted(c.content for c in hits) == [
+        "Budgets are public.", "Shares a budget line with the FBI.", "Signed a budget agreement."
+    ]
+    assert index.search_claims("budget", limit=1, date_range=("1999-01-01", "2000-01-01")) == []
+
+    # kept in sync on merge and delete
+    index.merge_alias("Treasury", "Bureau")
+    assert index.search_claims("signed")[0].entities == ["Congress", "Treasury"]
+    index.delete_claim(content="Budgets are public.", mode="by_content")
+    assert len(index.search_claims("budget")) == 3
+    index.delete_entity("FBI")
+    assert [c.content for c in index.search_claims("cut")] == []
+    index.upsert_claim(content="A hearing on cuts.", source="test", entity_name="Congress") # trigger path
+    assert [c.content for c in index.search_claims("cut")] == ["A hearing on cuts."]
+
+
+def _bag_of_words(texts: list[str], dim: int = 64) -> np.ndarray:
+    """deterministic stand-in for Embedder.embed: hashed word counts, L2-normalized"""
+    out = np.zeros((len(texts), dim), dtype=np.float32)
+    for i, text in enumerate(texts):
+        for word in text.lower().split():
+            out[i, zlib.crc32(word.encode()) % dim] += 1.0
+    return out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-9)
+
+
+def test_graph_vector_index_sync_and_search(tmp_path: Path):
+    index = GraphIndex(tmp_path / "graph.sqlite")
+    vectors = GraphVectorIndex(index, VectorDBConfig(stage_dir=tmp_path, rebuild=False), dimension=64)
+    index.upsert_claims_bulk([
+        ClaimRecord(content="central bank raised interest rates", entity_name="Federal Reserve"),
+        ClaimRecord(content="the bureau opened an investigation", entity_name="Federal Bureau of Investigation"),
+    ])
+    assert vectors.sync(_bag_of_words) == {"entity": 2, "claim": 2}
+    assert vectors.sync(_bag_of_words) == {"entity": 0, "claim": 0} # incremental
+
+    index.upsert_claim(content="rates were raised again", source="test", entity_name="Fed")
+    assert vectors.sync(_bag_of_words) == {"entity": 1, "claim": 1}
+
+    hits = vectors.search("claim", _bag_of_words(["interest rates raised"])[0], k=3)
+    claims = index.resolve_claim_vectors([i for i, _ in hits])
+    assert claims[hits[0][0]].content == "central bank raised interest rates"
+    assert claims[hits[0][0]].entities == ["Federal Reserve"]
+
+    hits = vectors.search("entity", _bag_of_words(["Federal Bureau"])[0], k=1)
+    assert list(index.resolve_entity_vectors([i for i, _ in hits]).values()) == ["Federal Bureau of Investigation"]
+
+    # vectors of deleted rows stop resolving; aliases resolve to the canonical entity
+    index.upsert_alias("Federal Reserve", "Fed")
+    entity_ids = [i for i, _ in vectors.search("entity", _bag_of_words(["fed"])[0], k=3)]
+    assert "Fed" not in index.resolve_entity_vectors(entity_ids).values()
+    index.delete_entity("Federal Bureau of Investigation")
+    assert len(index.resolve_claim_vectors([i for i, _ in hits] + [0, 1, 2])) == 2
+    vectors = GraphVectorIndex(index, VectorDBConfig(stage_dir=tmp_path, rebuild=False), dimension=64)
+    assert vectors.size("claim") == 3 # reloaded from disk
+
+    # ... and leave FAISS on the next sync; a drop + rebuild doesn't duplicate vectors
+    assert vectors.sync(_bag_of_words) == {"entity": 0, "claim": 0}
+    assert vectors.size("claim") == 2 and vectors.size("entity") == 2 # Federal Reserve, Fed (an alias row)
+    assert index.list_orphan_vectors("claim") == []
+    index.drop()
+    index.upsert_claims_bulk([ClaimRecord(content="central bank raised interest rates", entity_name="Federal Reserve")])
+    assert vectors.sync(_bag_of_words) == {"entity": 1, "claim": 1}
+    assert vectors.size("entity") == vectors.size("claim") == 1
+
+
+def test_unembedded_rows_are_queued(tmp_path: Path):
+    index = GraphIndex(tmp_path / "graph.sqlite")
+    vectors = GraphVectorIndex(index, VectorDBConfig(stage_dir=tmp_path, rebuild=False), dimension=64)
+    index.upsert_claims_bulk([ClaimRecord(content=f"claim {i}", entity_name=f"E{i % 3}") for i in range(6)])
+    assert [text for _, text in index.list_unembedded("entity")] == ["E0", "E1", "E2"]
+    assert vectors.sync(_bag_of_words) == {"entity": 3, "claim": 6}
+
+    def pending() -> list[tuple]:
+        with index._conn() as con:
+            return [tuple(row) for row in con.execute("SELECT kind, row_id FROM vector_pending ORDER BY kind, row_id")]
+    assert pending() == [] # embedded rows leave the queue: later syncs never look at them
+
+    # changed text is queued again (its old vector orphaned); deleted rows leave the queue
+    with index._conn() as con:
+        con.execute("UPDATE claims SET content = 'claim zero, edited' WHERE content = 'claim 0'")
+    index.upsert_claim(content="claim 6", source="test", entity_name="E3")
+    assert [text for _, text in index.list_unembedded("claim")] == ["claim zero, edited", "claim 6"]
+    index.delete_entity("E3")
+    assert [kind for kind, _ in pending()] == ["claim"]
+    assert vectors.sync(_bag_of_words) == {"entity": 0, "claim": 1}
+    assert vectors.size("claim") == 6 and pending() == []
+
+    # databases from before the queue are backfilled once
+    with index._conn() as con:
+        con.execute("DROP TABLE vector_pending")
+        con.execute("DELETE FROM entity_vectors WHERE entity_id = (SELECT id FROM entities WHERE name = 'E1')")
+    index.close()
+    index = GraphIndex(tmp_path / "graph.sqlite")
+    assert index.list_unembedded("entity") == [(2, "E1")] and index.list_unembedded("claim") == []
@@ -0,0 +1,220 @@
+from ..src import build as build_module
+from ..src.build import GraphBuilder
+from ..src.llm import CircuitBreaker
+from ..src._schemas import Doc
+from ..config import GraphConfig, LLMConfig
+
+from functools import partial
+from pathlib import Path
+import asyncio
+import pytest
+import re
+import time
+
+
+class _ScriptedLLM:
+    """
+    AsyncLLM stand-in: answers with one entity per "ENTITY:<name>" in the prompt.
+    A name in `after` is answered only once that many other calls have finished
+    (TimeoutError after ~5 s); names in `fail`, and the first `flaky` calls, raise.
+    Calls go through `breaker` like AsyncLLM's.
+    """
+    def __init__(self, after: dict[str, int] | None = None, fail: set[str] = frozenset(), flaky: int = 0,
+                 breaker: CircuitBreaker | None = None):
+        self.after = after or {}
+        self.fail = fail
+        self.flaky = flaky
+        self.breaker = breaker or CircuitBreaker(threshold=0)
+        self.calls = self.finished = self.in_flight = self.peak = self.cancelled = 0
+        self.started: list[tuple[list[str], int]] = [] # (names, calls in flight) per call
+
+    def set_system(self, prompt: str) -> None:
+        pass
+
+    async def run(self, prompt: str) -> str:
+        self.breaker.check()
+        self.calls += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            names = re.findall(r"ENTITY:(\w+)", prompt)
+            self.started.append((names, self.in_flight))
+            await asyncio.sleep(0.01)
+            wait = max((self.after.get(name, 0) for name in names), default=0)
+            for _ in range(500):
+                if self.finished >= wait:
+                    break
+                await asyncio.sleep(0.01)
+            else:
+                raise TimeoutError(f"{names}: only {self.finished} of {wait} other calls finished")
+            if set(names) & self.fail or self.calls <= self.flaky:
+                self.breaker.record_failure()
+                raise RuntimeError("upstream error")
+            self.breaker.record_success()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.finished += 1
+        cfg = GraphConfig
+        return cfg.record_delimiter.join(
+            f'("entity"{cfg.tuple_delimiter}{name}{cfg.tuple_delimiter}PERSON{cfg.tuple_delimiter}{name} is named)'
+            for name in names
+        ) + cfg.completion_delimiter
+
+
+class _WhitespaceTokenizer:
+    """embed.Tokenizer stand-in: one token per whitespace-separated word"""
+    def __init__(self, embed_model: str | None = None):
+        pass
+
+    def encode_offsets(self, text: str) -> tuple[list[int], list[tuple[int, int]]]:
+        spans = [m.span() for m in re.finditer(r"\S+", text)]
+        return list(range(len(spans))), spans
+
+
+class _ExclusiveTokenizer(_WhitespaceTokenizer):
+    """like a HF fast tokenizer, refuses to be used from two threads at once ("Already borrowed")"""
+    busy = False
+
+    def encode_offsets(self, text: str) -> tuple[list[int], list[tuple[int, int]]]:
+        if self.busy:
+            raise RuntimeError("Already borrowed")
+        self.busy = True
+        try:
+            time.sleep(0.005)
+            return super().encode_offsets(text)
+        finally:
+            self.busy = False
+
+
+def _graph_builder(monkeypatch, stage_dir: Path, llm, workers: int = 4, tokenizer=_WhitespaceTokenizer, **cfg) -> GraphBuilder:
+    """GraphBuilder (async) over a stand-in LLM and tokenizer, without graph embeddings or LLM cache"""
+    monkeypatch.setattr(build_module, "GraphConfig",
+        partial(GraphConfig, stage_dir=stage_dir, embed_graph=False, llm_cache=False, **cfg))
+    monkeypatch.setattr(build_module, "LLMConfig", partial(LLMConfig, max_concurrency=workers))
+    monkeypatch.setattr(build_module, "Tokenizer", tokenizer)
+    monkeypatch.setattr(build_module, "AsyncLLM", lambda **kwargs: llm)
+    return GraphBuilder()
+
+
+def _docs(tmp_path: Path, names: list[str]) -> list[Doc]:
+    docs = []
+    for i, name in enumerate(names):
+        path = tmp_path / f"{name}.txt"
+        path.write_text(f"A document about ENTITY:{name}.", encoding="utf-8")
+        docs.append(Doc(document_id=i, filepath=path, source="test"))
+    return docs
+
+
+def test_async_pipeline_streams_past_stragglers(tmp_path: Path, monkeypatch):
+    names = ["slow"] + [f"fast{i}" for i in range(30)] + ["broken"]
+    # "slow" is answered only after every other document: the other 3 workers must drain them meanwhile
+    llm = _ScriptedLLM(after={"slow": 31}, fail={"broken"})
+    builder = _graph_builder(monkeypatch, tmp_path, llm, workers=4, write_group_size=5, write_group_seconds=0.05)
+
+    builder.build(_docs(tmp_path, names))
+    assert llm.peak == 4
+
+    assert set(builder.graph_index.list_all_entities()) == set(names) - {"broken"}
+    claims = builder.graph_index.load_document_claims([4])[4] # provenance is kept
+    assert [c.content for c in claims] == ["fast3 is named"]
+    assert [(doc.document_id, str(e)) for doc, e in builder.dead_letters] == [(31, "upstream error")]
+
+    # committed documents are checksummed (and skipped next time); the failed one is retried
+    llm.calls = 0
+    builder.build(_docs(tmp_path, names))
+    assert llm.calls == 1
+
+    llm.fail = set()
+    assert builder.retry_failed() == 0
+    assert "broken" in builder.graph_index.list_all_entities() and not builder.dead_letters
+
+
+def test_long_documents_are_extracted_in_concurrent_windows(tmp_path: Path, monkeypatch):
+    names = [f"person{i}" for i in range(10)]
+    words = []
+    for name in names + ["Person3", "PERSON3"]: # spellings of one entity, in later windows
+        words += [f"ENTITY:{name}"] + ["filler"] * 5
+    path = tmp_path / "long.txt"
+    path.write_text(" ".join(words), encoding="utf-8")
+
+    llm = _ScriptedLLM()
+    builder = _graph_builder(monkeypatch, tmp_path, llm, workers=1, max_tokens=20) # 72 words: windows of 20, overlap 2
+    entities, _ = builder._merge_extractions([
+        ([{"entity_name": "Ann", "entity_type": "PERSON", "entity_claim": "c", "claim_date": None}], []),
+        ([{"entity_name": "ann ", "entity_type": "ORG", "entity_claim": "c", "claim_date": None},
+          {"entity_name": "ANN", "entity_type": "PERSON", "entity_claim": "d", "claim_date": None}], []),
+    ])
+    assert [(e["entity_name"], e["entity_type"], e["entity_claim"]) for e in entities] == [
+        ("Ann", "PERSON", "c"), ("Ann", "PERSON", "d")]
+
+    builder.build([Doc(document_id=0, filepath=path, source="test")])
+    assert llm.calls == 4 and llm.peak == 4 # one worker, four windows in flight at once
+
+    assert set(builder.graph_index.list_all_entities()) == set(names)
+    # windows come from the text already read, not from the file again
+    assert builder._windows(Doc(document_id=1, filepath=tmp_path / "gone.txt", source="test"), " ".join(words)) == \
+        builder._windows(Doc(document_id=0, filepath=path, source="test"), path.read_text(encoding="utf-8"))
+    claims = builder.graph_index.load_document_claims([0])[0]
+    assert sorted(c.content for c in claims) == sorted( # overlapping windows: each claim once
+        [f"{name} is named" for name in names] + ["Person3 is named", "PERSON3 is named"])
+
+
+def test_async_pipeline_stops_after_a_write_failure(tmp_path: Path, monkeypatch):
+    names = [f"person{i}" for i in range(100)]
+    llm = _ScriptedLLM()
+    builder = _graph_builder(monkeypatch, tmp_path, llm, workers=2, write_group_size=1, extraction_queue_size=2)
+
+    def disk_full(entities):
+        raise OSError("disk full")
+    builder._upsert_entities = disk_full
+    with pytest.raises(OSError, match="disk full"):
+        builder.build(_docs(tmp_path, names))
+    assert llm.calls < 20 # documents still queued are skipped, not extracted
+    assert not builder.checksums.has(builder.checksums.compute("A document about ENTITY:person0."))
+
+
+def test_open_circuit_pauses_extraction(tmp_path: Path, monkeypatch):
+    names = [f"person{i}" for i in range(8)]
+    llm = _ScriptedLLM(flaky=2, breaker=CircuitBreaker(threshold=2, cooldown=0.1))
+    builder = _graph_builder(monkeypatch, tmp_path, llm, workers=1)
+
+    # the two failures open the circuit; later documents wait for the trial call instead of failing fast
+    builder.build(_docs(tmp_path, names))
+    assert [doc.document_id for doc, _ in builder.dead_letters] == [0, 1]
+    assert set(builder.graph_index.list_all_entities()) == set(names[2:])
+    assert llm.calls == 8
+
+
+def test_failed_window_cancels_its_siblings(tmp_path: Path, monkeypatch):
+    words = []
+    for name in ["broken", "a", "b", "c"]: # one window each
+        words += [f"ENTITY:{name}"] + ["filler"] * 19
+    path = tmp_path / "long.txt"
+    path.write_text(" ".join(words), encoding="utf-8")
+    llm = _ScriptedLLM(after={"a": 100, "b": 100, "c": 100}, fail={"broken"}) # a-c never finish on their own
+    builder = _graph_builder(monkeypatch, tmp_path, llm, workers=1, max_tokens=20)
+
+    [next_doc] = _docs(tmp_path, ["next"])
+    next_doc.document_id = 1
+    builder.build([Doc(document_id=0, filepath=path, source="test"), next_doc])
+    assert [str(e) for _, e in builder.dead_letters] == ["upstream error"]
+    assert llm.cancelled == 3
+    assert llm.started[-1] == (["next"], 1) # nothing left running from the failed document
+
+
+def test_workers_share_the_tokenizer_one_at_a_time(tmp_path: Path, monkeypatch):
+    docs = []
+    for i in range(8):
+        path = tmp_path / f"long_{i}.txt"
+        path.write_text(" ".join(f"ENTITY:p{i}w{j}" for j in range(60)), encoding="utf-8")
+        docs.append(Doc(document_id=i, filepath=path, source="test"))
+    llm = _ScriptedLLM()
+    builder = _graph_builder(monkeypatch, tmp_path, llm, workers=4, tokenizer=_ExclusiveTokenizer,
+        max_tokens=20, extraction_chunker="tokens")
+
+    builder.build(docs)
+    assert not builder.dead_letters
+    assert len(builder.graph_index.list_all_entities()) == 8 * 60
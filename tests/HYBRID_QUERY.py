@@ -0,0 +1,72 @@
+from ..src import query as query_module
+from ..src.query import HybridQueryEngine
+from ..src.state import GraphIndex, MetaIndex, VectorIndex
+from ..src._schemas import ChunkData, ClaimRecord, RelationshipRecord
+from ..config import VectorDBConfig
+from .GRAPH_INDEX import _bag_of_words
+
+from pathlib import Path
+import pytest
+
+
+class _BagOfWordsEmbedder:
+    """stand-in for Embedder: no model download, deterministic vectors"""
+    dim = 64
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def embed(self, texts):
+        single = isinstance(texts, str)
+        vectors = _bag_of_words([texts] if single else list(texts), self.dim)
+        return vectors[0] if single else vectors
+
+
+def test_hybrid_query_fuses_ann_and_graph_ranks(tmp_path: Path, monkeypatch):
+    monkeypatch.chdir(tmp_path) # GraphQueryEngine stages under ./.nexus
+    monkeypatch.setattr(query_module, "Embedder", _BagOfWordsEmbedder)
+    cfg = VectorDBConfig(stage_dir=Path(".nexus"), index_type="flat", rebuild=False)
+
+    # one chunk per document; ANN order for "alpha" is doc 0, 1, 2, 3 (cosine 1, .71, .58, .5)
+    texts = ["alpha", "alpha beta", "alpha beta gamma", "alpha beta gamma delta"]
+    index = VectorIndex(cfg, _BagOfWordsEmbedder.dim, rebuild=True)
+    ids = index.add_vectors(_bag_of_words(texts))
+    index.save()
+    meta = MetaIndex(cfg.meta_index_path)
+    for document_id, (text, embedding_id) in enumerate(zip(texts, ids)):
+        path = tmp_path / f"doc_{document_id}.txt"
+        path.write_text(text, encoding="utf-8")
+        meta.upsert([ChunkData(document_id=document_id, embedding_id=embedding_id, start_token=0,
+                               end_token=len(text.split()), start_char=0, end_char=len(text), source_path=str(path))])
+    meta.close()
+
+    # one entity per document; evidence in the neighborhood: Hub 5 > A 4 > B 3 > C 2 > N* 1
+    graph = GraphIndex(tmp_path / ".nexus" / "graph.sqlite")
+    claims = [ClaimRecord(content=f"{name} fact {j}", source="test", entity_name=name, document_id=document_id)
+              for document_id, (name, n) in enumerate([("A", 4), ("B", 3), ("C", 2), ("Hub", 1)]) for j in range(n)]
+    claims += [ClaimRecord(content=f"Hub links N{j}", source="test", document_id=9,
+                           relationship=RelationshipRecord(source_name="Hub", target_name=f"N{j}"))
+               for j in range(4)]
+    graph.upsert_claims_bulk(claims)
+    graph.close()
+
+    engine = HybridQueryEngine(cfg)
+    result = engine.query("alpha", k=4, rrf_k=60)
+
+    def rrf(*ranks):
+        return sum(1.0 / (60 + r + 1) for r in ranks)
+
+    # entities: seed order (A, B, C, Hub) x evidence order (Hub, A, B, C, N*)
+    assert [name for name, _ in result.entities] == ["A", "Hub", "B", "C"]
+    assert [score for _, score in result.entities] == pytest.approx([rrf(0, 1), rrf(3, 0), rrf(1, 2), rrf(2, 3)])
+
+    # chunks: ANN order (0, 1, 2, 3) x entity support (0, 3, 1, 2) lifts Hub's document over doc 2
+    assert [c["document_id"] for c in result.chunks] == [0, 1, 3, 2]
+    assert [c["score"] for c in result.chunks] == pytest.approx([rrf(0, 0), rrf(1, 2), rrf(3, 1), rrf(2, 3)])
+    assert [c["text"] for c in result.chunks] == [texts[0], texts[1], texts[3], texts[2]]
+    assert result.chunks[0]["similarity_score"] == pytest.approx(1.0)
+
+    # claims come from the returned documents only, best-supported first
+    assert {c.content for c in result.claims} == {c.content for c in claims if c.document_id in (0, 1, 2, 3)}
+    assert result.claims[0].content.startswith("A fact")
+    assert set(result.timings) >= {"embed", "ann", "chunks", "entities", "expand", "rerank", "claims", "fetch", "total"}
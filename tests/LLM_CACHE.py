@@ -0,0 +1,44 @@
+from ..src.llm import SyncLLM, AsyncLLM, RetryPolicy
+from ..src.state import LLMCache
+from .RATE_LIMIT import _StubProvider, _stub_provider
+
+from pathlib import Path
+import asyncio
+
+import openai
+import pytest
+
+
+def test_cached_responses_skip_the_network(tmp_path: Path):
+    cache = LLMCache(tmp_path / "llm_cache.sqlite")
+    with _stub_provider(script=[500]) as url:
+        llm = SyncLLM(backend="local", model="stub", api_key="", url=url, cache=cache,
+            policy=RetryPolicy(retries=1, base_delay=0.01))
+        llm.set_system("extract")
+        assert llm.run("doc 1") == "ok"
+        assert llm.run("doc 1") == "ok"
+        assert _StubProvider.requests == 2 # one failed attempt, one served; the repeat is a hit
+
+        llm.set_system("extract, differently") # keyed by the system prompt too
+        assert llm.run("doc 1") == "ok"
+        assert _StubProvider.requests == 3
+    assert cache.size() == 2
+    assert cache.usage() == {"calls": 4, "cached": 1, "errors": 1, "prompt_tokens": 20, "completion_tokens": 2}
+
+    # provider gone: cached prompts are answered locally by a fresh client and cache
+    cache = LLMCache(tmp_path / "llm_cache.sqlite")
+    llm = AsyncLLM(backend="local", model="stub", api_key="", url=url, cache=cache,
+        policy=RetryPolicy(retries=0))
+    llm.set_system("extract")
+
+    async def main():
+        return await asyncio.gather(*(llm.run("doc 1") for _ in range(20)))
+    assert asyncio.run(main()) == ["ok"] * 20
+    with pytest.raises(openai.APIConnectionError):
+        asyncio.run(llm.run("doc 2"))
+    assert cache.usage()["cached"] == 21
+
+    other = SyncLLM(backend="local", model="other", api_key="", url=url, cache=cache, policy=RetryPolicy(retries=0))
+    other.set_system("extract")
+    with pytest.raises(openai.APIConnectionError): # and by the model
+        other.run("doc 1")
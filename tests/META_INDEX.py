@@ -0,0 +1,24 @@
+from ..src.state import MetaIndex
+from ..src._schemas import ChunkData
+
+from pathlib import Path
+import numpy as np
+
+
+def test_resolve_many(tmp_path: Path):
+    meta = MetaIndex(tmp_path / "meta.sqlite")
+    meta.upsert([
+        ChunkData(document_id=i // 10, embedding_id=i, start_token=i, end_token=i + 1,
+                  start_char=2 * i, end_char=2 * i + 2, source_path=f"doc_{i // 10}.txt")
+        for i in range(1000)
+    ])
+
+    assert meta.resolve_many([]) == {}
+    assert meta.resolve_many([3, 42, 5000]) == {3: (0, "doc_0.txt", 6, 8), 42: (4, "doc_4.txt", 84, 86)}
+
+    # long lists (temp-table path) match the IN-list path, numpy ids included
+    ids = np.arange(1200, dtype=np.int64)[::-1]
+    many = meta.resolve_many(ids)
+    assert len(many) == 1000
+    assert all(many[i] == meta.resolve_many([i])[i] for i in (0, 500, 999))
+    assert many[7][1] == meta.get_chunk_metadata(meta.resolve(7))[0]
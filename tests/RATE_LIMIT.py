@@ -0,0 +1,189 @@
+from ..src.llm import SyncLLM, AsyncLLM, RateLimiter, RetryPolicy, CircuitBreaker, CircuitOpenError, _retry_after
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from contextlib import contextmanager
+import threading
+import asyncio
+import types
+import json
+import time
+
+import openai
+import pytest
+
+
+class _StubProvider(BaseHTTPRequestHandler):
+    """
+    OpenAI-compatible /chat/completions that answers 429 + Retry-After beyond
+    `capacity` concurrent calls, and with the statuses in `script` first
+    """
+    capacity = 4
+    latency = 0.05
+    script: list[int] = []
+    lock = threading.Lock()
+    in_flight = peak = served = throttled = requests = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        cls = type(self)
+        with cls.lock:
+            cls.requests += 1
+            status = cls.script.pop(0) if cls.script else None
+        if status is not None:
+            return self._reply(status, {"error": {"message": f"scripted {status}"}})
+        with cls.lock:
+            over = cls.in_flight >= cls.capacity
+            if over:
+                cls.throttled += 1
+            else:
+                cls.in_flight += 1
+                cls.peak = max(cls.peak, cls.in_flight)
+        if over:
+            return self._reply(429, {"error": {"message": "slow down"}}, {"Retry-After": "0.2"})
+        time.sleep(cls.latency)
+        with cls.lock:
+            cls.in_flight -= 1
+            cls.served += 1
+        self._reply(200, {
+            "id": "stub", "object": "chat.completion", "created": 0, "model": "stub",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "ok"}}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 1, "total_tokens": 11},
+        })
+
+    def _reply(self, status: int, body: dict, headers: dict = {}):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def _stub_provider(script: list[int] = ()):
+    _StubProvider.script = list(script)
+    _StubProvider.in_flight = _StubProvider.peak = _StubProvider.served = 0
+    _StubProvider.throttled = _StubProvider.requests = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubProvider)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_aimd_finds_provider_capacity():
+    limiter = RateLimiter(initial_concurrency=1, max_concurrency=32, latency_factor=None)
+    with _stub_provider() as url:
+        llm = AsyncLLM(backend="local", model="stub", api_key="", url=url, limiter=limiter,
+            policy=RetryPolicy(retries=5, base_delay=0.05))
+        llm.set_system("test")
+
+        async def main():
+            return await asyncio.gather(*(llm.run(f"prompt {i}") for i in range(150)))
+        assert asyncio.run(main()) == ["ok"] * 150
+
+    assert _StubProvider.served == 150
+    assert _StubProvider.peak == _StubProvider.capacity # grew from 1 to the provider's limit
+    assert _StubProvider.throttled < 30 # ... and backed off instead of hammering it
+    assert 1 <= limiter.limit <= 2 * _StubProvider.capacity + 1
+
+
+def test_token_buckets_pace_calls():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=60_000, max_concurrency=32)
+
+    async def call(tokens: int):
+        async with limiter.slot(tokens):
+            pass
+
+    async def main(n: int, tokens: int):
+        t0 = time.perf_counter()
+        await asyncio.gather(*(call(tokens) for _ in range(n)))
+        return time.perf_counter() - t0
+
+    assert 1.3 < asyncio.run(main(25, 1)) < 2.0 # 10 at once (one second's worth), then 10/s
+    limiter = RateLimiter(tokens_per_minute=60_000, max_concurrency=32)
+    assert 0.4 < asyncio.run(main(3, 500)) < 0.8 # 1000 tokens/s: the third call waits
+
+
+def test_retry_after_headers():
+    def error(headers: dict):
+        return types.SimpleNamespace(status_code=429, response=types.SimpleNamespace(headers=headers))
+    assert _retry_after(error({"retry-after": "3"})) == 3.0
+    assert _retry_after(error({"retry-after-ms": "250", "retry-after": "1"})) == 0.25
+    assert 59 < _retry_after(error({"retry-after": time.strftime(
+        "%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 61))})) <= 61
+    assert _retry_after(error({})) is None
+
+
+def test_rising_latency_backs_off():
+    limiter = RateLimiter(initial_concurrency=4, max_concurrency=32, latency_factor=2.0)
+
+    async def call(latency: float):
+        async with limiter.slot():
+            await asyncio.sleep(latency)
+
+    async def main():
+        await asyncio.gather(*(call(0.06) for _ in range(40)))
+        grown = limiter.limit
+        await asyncio.gather(*(call(0.4) for _ in range(12)))
+        return grown
+
+    grown = asyncio.run(main())
+    assert grown > 6 and limiter.limit <= grown / 2
+
+
+def test_retries_transient_errors_only():
+    policy = RetryPolicy(retries=2, base_delay=0.01)
+    with _stub_provider(script=[503, 500]) as url: # the last allowed retry succeeds
+        llm = SyncLLM(backend="local", model="stub", api_key="", url=url, policy=policy)
+        llm.set_system("test")
+        assert llm.run("prompt") == "ok"
+        assert _StubProvider.requests == 3
+
+    with _stub_provider(script=[400]) as url: # bad request: fatal
+        llm = AsyncLLM(backend="local", model="stub", api_key="", url=url, policy=policy)
+        llm.set_system("test")
+        with pytest.raises(openai.BadRequestError):
+            asyncio.run(llm.run("prompt"))
+        assert _StubProvider.requests == 1
+
+    with _stub_provider(script=[502] * 5) as url: # out of retries
+        llm = AsyncLLM(backend="local", model="stub", api_key="", url=url, policy=policy)
+        llm.set_system("test")
+        with pytest.raises(openai.InternalServerError):
+            asyncio.run(llm.run("prompt"))
+        assert _StubProvider.requests == 3
+
+
+def test_circuit_breaker_fails_fast():
+    breaker = CircuitBreaker(threshold=3, cooldown=0.3)
+    with _stub_provider(script=[500] * 3) as url:
+        llm = SyncLLM(backend="local", model="stub", api_key="", url=url,
+            policy=RetryPolicy(retries=5, base_delay=0.01), breaker=breaker)
+        llm.set_system("test")
+        with pytest.raises(CircuitOpenError):
+            llm.run("prompt")
+        with pytest.raises(CircuitOpenError): # no request reaches the provider while open
+            llm.run("prompt")
+        assert _StubProvider.requests == 3
+
+        time.sleep(0.3)
+        assert llm.run("prompt") == "ok" # trial call after the cooldown closes it
+        assert breaker.failures == 0
+
+
+def test_full_jitter_delays():
+    policy = RetryPolicy(base_delay=1.0, max_delay=8.0)
+    delays = [policy.delay(5) for _ in range(2000)]
+    assert 0 <= min(delays) < 0.5 and 7.5 < max(delays) <= 8.0 # uniform over [0, cap]
+    assert 3.5 < sum(delays) / len(delays) < 4.5
+    throttled = types.SimpleNamespace(status_code=429, response=types.SimpleNamespace(headers={"retry-after": "2"}))
+    assert all(policy.delay(0, throttled) >= 2.0 for _ in range(100)) # never before Retry-After
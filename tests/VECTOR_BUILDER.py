@@ -0,0 +1,112 @@
+from ..src import build as build_module
+from ..src.build import VectorDBBuilder
+from ..config import VectorDBConfig
+from .CHUNK import _WordTokenizer
+from .GRAPH_INDEX import _bag_of_words
+
+from dataclasses import dataclass
+from pathlib import Path
+import os
+
+
+@dataclass
+class _Doc:
+    document_id: int
+    filepath: Path
+
+
+class _Tokenizer(_WordTokenizer):
+    """stand-in for embed.Tokenizer (picklable, for the chunking processes)"""
+    def __init__(self, embed_model: str):
+        pass
+
+
+class _Embedder(_Tokenizer):
+    """stand-in for embed.Embedder: bag-of-words vectors, no model download"""
+    dim = 64
+
+    def __init__(self, embed_model: str, batch_size: int, cache_dir=None):
+        pass
+
+    def embed(self, texts):
+        return _bag_of_words(texts, self.dim)
+
+
+def _builder(monkeypatch, stage_dir: Path, **cfg) -> VectorDBBuilder:
+    """VectorDBBuilder over stand-in tokenizer / embedder"""
+    monkeypatch.setattr(build_module, "Embedder", _Embedder)
+    monkeypatch.setattr(build_module, "Tokenizer", _Tokenizer)
+    return VectorDBBuilder(VectorDBConfig(stage_dir=stage_dir, **cfg))
+
+
+def test_parallel_build_matches_sequential(tmp_path: Path, monkeypatch):
+    docs = []
+    for i in range(12):
+        path = tmp_path / f"doc_{i}.txt"
+        path.write_text(" ".join(f"d{i}w{j}" for j in range(37 * i)), encoding="utf-8") # doc_0 is empty
+        docs.append(_Doc(i, path))
+    docs.append(_Doc(99, tmp_path / "missing.txt"))
+
+    def chunks(builder: VectorDBBuilder) -> set[tuple]:
+        meta = builder.meta_index.resolve_many(list(range(builder.vector_index.size())))
+        return {(doc_id, builder.doc_store.fetch(path, s, e)) for doc_id, path, s, e in meta.values()}
+
+    cfg = dict(max_tokens=16, batch_size=5)
+    sequential = _builder(monkeypatch, tmp_path / "seq", build_workers=1, **cfg)
+    sequential.build(docs)
+    parallel = _builder(monkeypatch, tmp_path / "par", build_workers=3, build_queue_size=2, **cfg)
+    parallel.build(docs)
+
+    assert parallel.stats == sequential.stats
+    assert parallel.stats.documents_processed == 11 and parallel.stats.errors == 2
+    assert parallel.vector_index.size() == sequential.vector_index.size() == parallel.stats.chunks_created
+    assert chunks(parallel) == chunks(sequential)
+
+
+def test_incremental_build_and_delete(tmp_path: Path, monkeypatch):
+    docs = []
+    for i in range(4):
+        path = tmp_path / f"doc_{i}.txt"
+        path.write_text(" ".join(f"d{i}w{j}" for j in range(40)), encoding="utf-8")
+        docs.append(_Doc(i, path))
+    cfg = dict(max_tokens=16, batch_size=4, build_workers=1)
+    _builder(monkeypatch, tmp_path / "stage", **cfg).build(docs)
+
+    docs[1].filepath.write_text("changed text for doc one", encoding="utf-8")
+    mtime_ns = docs[2].filepath.stat().st_mtime_ns
+    os.utime(docs[2].filepath, ns=(mtime_ns, mtime_ns + 10**9)) # touched, same content
+    hashed = []
+    checksum = build_module._file_checksum
+    monkeypatch.setattr(build_module, "_file_checksum", lambda path: hashed.append(path) or checksum(path))
+    builder = _builder(monkeypatch, tmp_path / "stage", rebuild=False, **cfg)
+    embedded = []
+    builder.embedder.embed = lambda texts: embedded.extend(texts) or _bag_of_words(texts)
+    builder.build(docs)
+    assert embedded == ["changed text for doc one"] # only the changed document
+    assert builder.stats.documents_processed == 1
+    assert sorted(hashed) == [docs[1].filepath, docs[2].filepath] # unchanged stats aren't re-read
+
+    hashed.clear() # the touched file's new stat was recorded
+    _builder(monkeypatch, tmp_path / "stage", rebuild=False, **cfg).build(docs)
+    assert hashed == []
+
+    def search(builder, text):
+        _, ids = builder.vector_index.search(_bag_of_words([text]), 20)
+        meta = builder.meta_index.resolve_many(ids[0].tolist())
+        return {meta[i][0] for i in ids[0].tolist() if i != -1}
+
+    assert search(builder, "d1w3") == {0, 1, 2, 3}
+    assert builder.vector_index.size() == 3 * 3 + 1
+    assert builder.delete_documents([2, 3]) == 6
+    assert search(builder, "d2w3") == {0, 1}
+    # stored copies follow: doc_1's old content and docs 2, 3 are gone
+    assert not builder.doc_store.has(docs[2].filepath)
+    assert len(list((tmp_path / "stage" / "docs").glob("*/*.txt"))) == 2
+
+    # ids stay stable across reloads, tombstones and compaction
+    reloaded = _builder(monkeypatch, tmp_path / "stage", rebuild=False, **cfg)
+    assert reloaded.vector_index.size() == 4
+    reloaded.vector_index.compact()
+    assert reloaded.vector_index.index.ntotal == 4
+    assert search(reloaded, "changed") == {0, 1}
+    assert reloaded.vector_index.add_vectors(_bag_of_words(["new"]))[0] == 13
@@ -0,0 +1,184 @@
+from ..src.state import VectorIndex
+from ..config import VectorDBConfig
+
+from pathlib import Path
+import faiss
+import numpy as np
+import pytest
+import threading
+
+
+def _vectors(n: int, d: int = 32, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((n, d)).astype(np.float32)
+
+
+@pytest.mark.parametrize("index_type", ["hnsw", "flat", "ivf", "ivfpq"])
+def test_index_types_round_trip(tmp_path: Path, index_type: str):
+    cfg = VectorDBConfig(stage_dir=tmp_path, index_type=index_type,
+        ivf_nlist=8, ivf_nprobe=8, ivf_train_size=600, pq_m=8, pq_nbits=6)
+    vectors = _vectors(1000)
+
+    index = VectorIndex(cfg, 32, rebuild=True)
+    assert index.add_vectors(vectors[:500]) == list(range(500))
+    assert index.trained() == (index_type not in VectorIndex.IVF_TYPES) # staged flat below ivf_train_size
+    index.add_vectors(vectors[500:])
+    assert index.trained() # training kicked in at ivf_train_size
+
+    _, ids = index.search(vectors[:20], 1)
+    hits = (ids[:, 0] == np.arange(20)).mean()
+    assert hits >= (0.8 if index_type == "ivfpq" else 1.0) # nprobe == nlist: only PQ loses precision
+
+    assert index.remove_ids([0, 1, 2, 5000]) == 3
+    assert index.size() == 997
+    index.save()
+
+    index = VectorIndex(cfg, 32, rebuild=False)
+    assert index.size() == 997 and index.trained()
+    _, ids = index.search(vectors[:3], 5)
+    assert not set(ids.ravel()) & {0, 1, 2}
+    assert index.add_vectors(vectors[:1]) == [1000] # ids are not reused
+
+    ids, stored = index.vectors()
+    assert ids.tolist() == list(range(3, 1001))
+    if index_type != "ivfpq":
+        assert np.allclose(stored[:-1], vectors[3:])
+
+
+def test_ivf_stays_exact_until_trained(tmp_path: Path):
+    cfg = VectorDBConfig(stage_dir=tmp_path, index_type="ivfpq", ivf_train_size=10_000, pq_m=8)
+    index = VectorIndex(cfg, 32, rebuild=True)
+    index.add_vectors(_vectors(100))
+    index.save()
+
+    index = VectorIndex(cfg, 32, rebuild=False)
+    assert not index.trained() and index.size() == 100
+    assert not index.train() # too few vectors for 256 PQ centroids
+
+    with pytest.raises(ValueError):
+        VectorIndex(VectorDBConfig(stage_dir=tmp_path, index_type="ivfpq", pq_m=5), 32, rebuild=True)
+
+
+@pytest.mark.parametrize("index_type", ["hnsw", "flat", "ivf", "ivfpq"])
+def test_mmap_is_read_only_and_matches(tmp_path: Path, index_type: str):
+    cfg = VectorDBConfig(stage_dir=tmp_path, index_type=index_type,
+        ivf_nlist=8, ivf_train_size=600, pq_m=8, pq_nbits=6)
+    vectors = _vectors(1000)
+    index = VectorIndex(cfg, 32, rebuild=True)
+    index.add_vectors(vectors)
+    index.remove_ids([7])
+    index.save()
+
+    loaded = VectorIndex(cfg, 32, rebuild=False)
+    mapped = VectorIndex(cfg, 32, rebuild=False, mmap=True)
+    assert mapped.read_only and mapped.size() == loaded.size() == 999
+    assert np.array_equal(mapped.search(vectors[:10], 5)[1], loaded.search(vectors[:10], 5)[1])
+    assert np.array_equal(mapped.vectors()[0], loaded.vectors()[0])
+    with pytest.raises(RuntimeError):
+        mapped.add_vectors(vectors[:1])
+    with pytest.raises(RuntimeError):
+        mapped.remove_ids([1])
+
+
+def test_segmented_saves(tmp_path: Path):
+    cfg = VectorDBConfig(stage_dir=tmp_path, index_type="hnsw", index_delta_ratio=0.5)
+    vectors = _vectors(1600)
+    index = VectorIndex(cfg, 32, rebuild=True)
+    index.add_vectors(vectors[:1000])
+    index.save()
+    base = index._read_manifest()["base"]["file"]
+    base_mtime = (tmp_path / base).stat().st_mtime_ns
+
+    index.add_vectors(vectors[1000:1010])
+    index.remove_ids([0, 1005])
+    index.save() # small change: delta only
+    manifest = index._read_manifest()
+    assert manifest["base"]["file"] == base and (tmp_path / base).stat().st_mtime_ns == base_mtime
+    assert [d["size"] for d in manifest["deltas"]] == [12]
+
+    for mmap in (False, True):
+        reopened = VectorIndex(cfg, 32, rebuild=False, mmap=mmap)
+        assert reopened.size() == 1008
+        assert reopened.vectors()[0].tolist() == [i for i in range(1, 1010) if i != 1005]
+        _, ids = reopened.search(vectors[[0, 1003, 1005]], 1)
+        assert ids[1, 0] == 1003 and not {0, 1005} & set(ids.ravel())
+        assert np.allclose(reopened.mean([1003, 1004]), vectors[1003:1005].mean(axis=0))
+    assert reopened._next_id == 1010
+
+    index.add_vectors(vectors[1010:1600])
+    index.save(wait=True) # deltas past half the base: merged
+    manifest = index._read_manifest()
+    assert manifest["deltas"] == [] and manifest["base"]["size"] == 1600 # HNSW tombstones kept
+    assert sorted(p.name for p in tmp_path.glob("hnsw.*")) == sorted(
+        [manifest["base"]["file"], manifest["base"]["deleted"], "hnsw.manifest.json"])
+    assert VectorIndex(cfg, 32, rebuild=False).size() == 1598
+
+
+@pytest.mark.parametrize("index_type", ["hnsw", "flat", "ivf"])
+def test_removals_do_not_scan_the_index(tmp_path: Path, index_type: str, monkeypatch):
+    cfg = VectorDBConfig(stage_dir=tmp_path, index_type=index_type, ivf_nlist=4, ivf_train_size=200)
+    index = VectorIndex(cfg, 32, rebuild=True)
+    index.add_vectors(_vectors(400))
+    index.save()
+    index.add_vectors(_vectors(20, seed=1))
+
+    def scan(self):
+        raise AssertionError("remove_ids / segment replay listed every id")
+    monkeypatch.setattr(VectorIndex, "_ids", scan)
+    # stored, tombstoned, unknown and repeated ids, from the base and the pending delta
+    assert index.remove_ids([3, 3, 405, 9999]) == 2
+    assert index.remove_ids([3, 7]) == 1
+    index.save()
+
+    mapped = VectorIndex(cfg, 32, rebuild=False, mmap=True)
+    assert mapped.size() == index.size() == 417
+    assert {3, 7, 405}.isdisjoint(mapped.search(_vectors(400)[[3, 7]], 5)[1].ravel().tolist())
+    monkeypatch.undo()
+    assert VectorIndex(cfg, 32, rebuild=False).vectors()[0].tolist() == sorted(set(range(420)) - {3, 7, 405})
+
+
+def test_background_merge_keeps_later_deltas(tmp_path: Path, monkeypatch):
+    cfg = VectorDBConfig(stage_dir=tmp_path, index_type="flat")
+    vectors = _vectors(300)
+    index = VectorIndex(cfg, 32, rebuild=True)
+    index.add_vectors(vectors[:200])
+    index.save()
+    index.add_vectors(vectors[200:250])
+
+    serialized_on = []
+    serialize = faiss.serialize_index
+    monkeypatch.setattr(faiss, "serialize_index", lambda i: serialized_on.append(threading.current_thread()) or serialize(i))
+    index.merge(wait=False)
+    index.add_vectors(vectors[250:])
+    index.save() # a delta written while (or after) the merge runs
+    index.wait()
+    assert serialized_on and threading.current_thread() not in serialized_on # the caller never serializes
+    assert VectorIndex(cfg, 32, rebuild=False).vectors()[0].tolist() == list(range(300))
+
+
+def test_failed_save_keeps_previous_state(tmp_path: Path, monkeypatch):
+    cfg = VectorDBConfig(stage_dir=tmp_path, index_type="flat")
+    index = VectorIndex(cfg, 32, rebuild=True)
+    index.add_vectors(_vectors(100))
+    index.save()
+    index.add_vectors(_vectors(10, seed=1))
+
+    def crash(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(np, "savez", crash)
+    with pytest.raises(OSError):
+        index.save()
+    assert VectorIndex(cfg, 32, rebuild=False).size() == 100
+    assert not list(tmp_path.glob(".*.tmp*"))
+
+
+def test_single_file_index_moves_to_segments(tmp_path: Path):
+    cfg = VectorDBConfig(stage_dir=tmp_path, index_type="flat")
+    legacy = faiss.IndexIDMap2(faiss.IndexFlatL2(32))
+    legacy.add_with_ids(_vectors(50), np.arange(50, dtype=np.int64))
+    faiss.write_index(legacy, str(tmp_path / "flat.faiss"))
+
+    index = VectorIndex(cfg, 32, rebuild=False)
+    assert index.size() == 50
+    index.save()
+    assert not (tmp_path / "flat.faiss").exists() and (tmp_path / "flat.manifest.json").exists()
+    assert VectorIndex(cfg, 32, rebuild=False).vectors()[0].tolist() == list(range(50))
@@ -135,12 +135,8 @@ def _build_graph_snapshot(index: GraphIndex, index_path: Path) -> GraphSnapshot:
     entities = index.list_all_entities()
     entity_types = _fetch_entity_types(index_path)
 
-    canonicals = set()
-    for name in entities:
-        resolved = index.resolve_alias(name)
-        canonicals.add(resolved)
-    
-    filtered_entities = [name for name in entities if index.resolve_alias(name) == name]
+    canonical_of = index.resolve_aliases(entities)
+    filtered_entities = [name for name in entities if canonical_of[name] == name]
 
     nodes: List[GraphNode] = []
     adjacency: Dict[str, set[str]] = {name: set() for name in filtered_entities}